@@ -1,26 +1,74 @@
-import yfinance as yf
-from transformers import pipeline
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+from utils.model_registry import model_registry
+from utils.price_cache import price_cache
+from utils.symbol_index import symbol_index
+
 class FinRexentAgent:
-    def __init__(self):
-        self.sentiment_analyzer = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-        self.ner_pipeline = pipeline("ner", model="dbmdz/bert-large-cased-finetuned-conll03-english")
+    def __init__(self, batch_size=32, max_length=128, strict_ner=False):
+        # Pipelines come from the shared registry on first use; assign to override
+        self._sentiment_analyzer = None
+        self._ner_pipeline = None
         self.memory = [] # Simple in-memory storage for now
-
-    def analyze_news(self, news_headlines):
-        analysis_results = []
+        # Headlines are pushed through the pipelines in padded batches of this size
+        self.batch_size = batch_size
+        self.max_length = max_length
+        # strict_ner runs NER on every headline instead of only where the gazetteer finds nothing
+        self.strict_ner = strict_ner
+
+    @property
+    def sentiment_analyzer(self):
+        pipeline = getattr(self, '_sentiment_analyzer', None)
+        return pipeline if pipeline is not None else model_registry.get('sentiment')
+
+    @sentiment_analyzer.setter
+    def sentiment_analyzer(self, pipeline):
+        self._sentiment_analyzer = pipeline
+
+    @property
+    def ner_pipeline(self):
+        pipeline = getattr(self, '_ner_pipeline', None)
+        return pipeline if pipeline is not None else model_registry.get('ner')
+
+    @ner_pipeline.setter
+    def ner_pipeline(self, pipeline):
+        self._ner_pipeline = pipeline
+
+    def analyze_news(self, news_headlines, batch_size=None, strict=None):
+        batch_size = batch_size or self.batch_size
+        strict = self.strict_ner if strict is None else strict
+
+        # Handle both 'headline' and 'title' fields
+        texts = []
         for news in news_headlines:
-            # Handle both 'headline' and 'title' fields
             text = news.get('headline') or news.get('title', '')
-            if not text:
-                continue
-                
-            sentiment = self.sentiment_analyzer(text)[0]
-            
-            entities = self.ner_pipeline(text)
-            company_names = self._reconstruct_company_names(entities)
-            
+            if text:
+                texts.append(text)
+        if not texts:
+            return []
+
+        # One batched forward pass per chunk instead of one per headline. The
+        # pipelines pad each batch to its longest headline; truncation keeps
+        # oversized inputs within the model's window.
+        sentiments = self.sentiment_analyzer(
+            texts, batch_size=batch_size, truncation=True, max_length=self.max_length
+        )
+
+        # Listed companies are found with the symbol gazetteer; NER only runs on
+        # headlines where it finds none (or on all of them in strict mode)
+        companies_per_text = [[] if strict else [name for name, _ in symbol_index.find_companies(text)]
+                              for text in texts]
+        ner_indexes = [i for i, names in enumerate(companies_per_text) if not names]
+        if ner_indexes:
+            ner_texts = self._clip_to_max_length([texts[i] for i in ner_indexes])
+            entities_per_text = self.ner_pipeline(ner_texts, batch_size=batch_size)
+            for i, entities in zip(ner_indexes, entities_per_text):
+                companies_per_text[i] = self._reconstruct_company_names(entities)
+
+        analysis_results = []
+        for text, sentiment, company_names in zip(texts, sentiments, companies_per_text):
             analysis_results.append({
                 'headline': text,
                 'sentiment': sentiment['label'],
@@ -29,6 +77,17 @@ class FinRexentAgent:
             })
         return analysis_results
 
+    def _clip_to_max_length(self, texts):
+        # The NER pipeline takes no truncation arguments, so cut each headline
+        # to the text of its first max_length tokens, like the sentiment pass
+        tokenizer = getattr(self.ner_pipeline, 'tokenizer', None)
+        if tokenizer is None or not getattr(tokenizer, 'is_fast', False):
+            # Every word is at least one token
+            return [' '.join(text.split()[:self.max_length]) for text in texts]
+        encodings = tokenizer(texts, truncation=True, max_length=self.max_length, return_offsets_mapping=True)
+        return [text[:max(end for _, end in offsets)] if offsets else text
+                for text, offsets in zip(texts, encodings['offset_mapping'])]
+
     def _reconstruct_company_names(self, entities):
         reconstructed_names = []
         current_name = []
@@ -51,81 +110,61 @@ class FinRexentAgent:
 
     def get_stock_data(self, ticker, period="1y"):
         try:
-            stock = yf.Ticker(ticker + ".NS") 
-            hist = stock.history(period=period)
-            return hist
+            # Served from the local price cache; only missing bars hit the network
+            return price_cache.get_history(ticker + ".NS", period=period)
         except Exception as e:
             print(f"Error fetching data for {ticker}: {e}")
             return None
 
-    def recommend_stocks(self, analyzed_news, market_trends=None):
-        recommendations = []
+    def recommend_stocks(self, analyzed_news, market_trends=None, max_workers=8):
+        # Phase 1: resolve every mention, then fetch and analyze each unique ticker once
+        mentions = []
         for news_item in analyzed_news:
             if news_item['sentiment'] == 'POSITIVE' and news_item['score'] > 0.9:
                 for company in news_item['companies']:
                     ticker = self._get_ticker_from_company_name(company)
                     if ticker:
-                        stock_data = self.get_stock_data(ticker)
-                        if stock_data is not None and not stock_data.empty:
-                            investment_suggestion = self.suggest_investment_amount(stock_data)
-                            recommendations.append({
-                                'company': company,
-                                'ticker': ticker,
-                                'headline': news_item['headline'],
-                                'reason': f"Strong positive sentiment from news: {news_item['headline']}",
-                                'investment_suggestion': investment_suggestion
-                            })
+                        mentions.append((news_item, company, ticker))
+
+        tickers = list(dict.fromkeys(ticker for _, _, ticker in mentions))
+        suggestions = {}
+        if tickers:
+            try:
+                price_cache.prefetch([ticker + ".NS" for ticker in tickers])
+            except Exception as e:
+                # get_stock_data still fetches each ticker on its own
+                print(f"Error prefetching stock data: {e}")
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as pool:
+                suggestions = dict(zip(tickers, pool.map(self._suggest_for_ticker, tickers)))
+
+        # Phase 2: join the per-ticker results back onto the news items
+        recommendations = []
+        for news_item, company, ticker in mentions:
+            if suggestions.get(ticker) is not None:
+                recommendations.append({
+                    'company': company,
+                    'ticker': ticker,
+                    'headline': news_item['headline'],
+                    'reason': f"Strong positive sentiment from news: {news_item['headline']}",
+                    'investment_suggestion': suggestions[ticker]
+                })
         return recommendations
 
-    def _get_ticker_from_company_name(self, company_name):
-        # Hardcoded mapping for common Indian companies
-        mapping = {
-            "Reliance Industries": "RELIANCE",
-            "HDFC Bank": "HDFCBANK",
-            "Axis Bank": "AXISBANK",
-            "Bharti Airtel": "BHARTIARTL",
-            "Cummins India": "CUMMINSIND",
-            "BPCL": "BPCL",
-            "IOC": "IOC",
-            "HPCL": "HINDPETRO",
-            "SAIL": "SAIL",
-            "Vedanta": "VEDL",
-            "Tata Steel": "TATASTEEL",
-            "Whirlpool": "WHIRLPOOL",
-            "Voltas": "VOLTAS",
-            "Coforge": "COFORGE",
-            "IndiGo": "INDIGO",
-            "Dr Reddy's": "DRREDDY",
-            "Carraro India": "CARRAROIND",
-            "Western Carriers": "WCL", 
-            "Om Infra": "OMINFRAL",
-            "FirstCry": "FIRSTCRY",
-            "Apar Industries": "APARINDS",
-            "Newgen Software": "NEWGEN",
-        }
-        
-        ticker = mapping.get(company_name)
-        if ticker:
-            return ticker
-
-        # Attempt to find ticker using yfinance search
+    def _suggest_for_ticker(self, ticker):
+        # A failing ticker only loses its own recommendations
         try:
-            # Try with .NS suffix first for Indian stocks
-            ticker_info = yf.Ticker(company_name + ".NS").info
-            if ticker_info and 'symbol' in ticker_info:
-                return ticker_info['symbol'].replace(".NS", "")
-        except Exception:
-            pass # Ignore error and try without .NS
+            stock_data = self.get_stock_data(ticker)
+            if stock_data is None or stock_data.empty:
+                return None
+            return self.suggest_investment_amount(stock_data)
+        except Exception as e:
+            print(f"Error analyzing {ticker}: {e}")
+            return None
 
-        try:
-            # Try without .NS suffix
-            ticker_info = yf.Ticker(company_name).info
-            if ticker_info and 'symbol' in ticker_info:
-                return ticker_info['symbol']
-        except Exception:
-            pass # Ignore error and return None
-            
-        return None
+    def _get_ticker_from_company_name(self, company_name):
+        # Offline lookup in the NSE/BSE symbol index (exact, prefix, then fuzzy);
+        # names that don't resolve are cached as misses. No network calls.
+        return symbol_index.resolve(company_name)
 
     def suggest_investment_amount(self, stock_data):
         if stock_data is None or stock_data.empty:
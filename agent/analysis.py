@@ -1,10 +1,12 @@
 """
 Financial Analysis Module for FinRexent Agent
 """
+import multiprocessing
 import pandas as pd
 import numpy as np
 import yfinance as yf
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
@@ -12,6 +14,19 @@ warnings.filterwarnings('ignore')
 from utils.logger import logger
 from utils.config import config
 from utils.helpers import calculate_risk_metrics, format_currency, format_percentage
+from utils.price_cache import price_cache
+from utils.fundamentals_cache import fundamentals_cache
+from .indicators import (
+    compute_indicators, compute_panel_indicators, latest_indicators, trend_direction, trend_strength
+)
+
+# yfinance info keys read by get_stock_info; their TTLs decide when the cache refetches
+STOCK_INFO_FIELDS = [
+    'symbol', 'longName', 'sector', 'industry', 'marketCap', 'trailingPE', 'forwardPE',
+    'priceToBook', 'dividendYield', 'beta', 'debtToEquity', 'returnOnEquity', 'returnOnAssets',
+    'currentRatio', 'quickRatio', 'profitMargins', 'revenueGrowth', 'earningsGrowth',
+    'fiftyTwoWeekHigh', 'fiftyTwoWeekLow', 'fiftyDayAverage', 'twoHundredDayAverage'
+]
 
 class FinancialAnalyzer:
     """Comprehensive financial analysis for stocks"""
@@ -25,13 +40,11 @@ class FinancialAnalyzer:
         """Get stock data from Yahoo Finance"""
         try:
             # Add NSE suffix if not present
-            if not ticker.endswith(('.NS', '.BO')):
-                ticker = ticker + self.indian_markets_config['nse_suffix']
+            ticker = self._symbol(ticker)
             
-            stock = yf.Ticker(ticker)
-            data = stock.history(period=period)
+            data = price_cache.get_history(ticker, period=period)
             
-            if data.empty:
+            if data is None or data.empty:
                 logger.warning(f"No data found for ticker: {ticker}")
                 return None
             
@@ -47,8 +60,7 @@ class FinancialAnalyzer:
             if not ticker.endswith(('.NS', '.BO')):
                 ticker = ticker + self.indian_markets_config['nse_suffix']
             
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = fundamentals_cache.get_info(ticker, STOCK_INFO_FIELDS)
             
             if not info or 'symbol' not in info:
                 return None
@@ -82,76 +94,64 @@ class FinancialAnalyzer:
             logger.error(f"Error fetching stock info for {ticker}: {e}")
             return None
     
-    def calculate_technical_indicators(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Calculate technical indicators"""
+    def compute_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Compute full indicator series (one column per indicator)"""
+        if data.empty:
+            return pd.DataFrame()
+        
+        try:
+            return compute_indicators(data)
+        except Exception as e:
+            logger.error(f"Error computing indicator series: {e}")
+            return pd.DataFrame()
+    
+    def calculate_technical_indicators(self, data: pd.DataFrame,
+                                       frame: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Calculate technical indicators (latest values)
+        
+        Pass a frame from compute_indicators to reuse already computed series.
+        """
         if data.empty:
             return {}
         
         try:
-            indicators = {}
-            
-            # Moving Averages
-            indicators['sma_20'] = data['Close'].rolling(window=20).mean().iloc[-1]
-            indicators['sma_50'] = data['Close'].rolling(window=50).mean().iloc[-1]
-            indicators['sma_200'] = data['Close'].rolling(window=200).mean().iloc[-1]
-            
-            # Exponential Moving Averages
-            indicators['ema_12'] = data['Close'].ewm(span=12).mean().iloc[-1]
-            indicators['ema_26'] = data['Close'].ewm(span=26).mean().iloc[-1]
-            
-            # RSI
-            delta = data['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            indicators['rsi'] = 100 - (100 / (1 + rs.iloc[-1]))
-            
-            # MACD
-            ema_12 = data['Close'].ewm(span=12).mean()
-            ema_26 = data['Close'].ewm(span=26).mean()
-            macd_line = ema_12 - ema_26
-            signal_line = macd_line.ewm(span=9).mean()
-            indicators['macd'] = macd_line.iloc[-1]
-            indicators['macd_signal'] = signal_line.iloc[-1]
-            indicators['macd_histogram'] = indicators['macd'] - indicators['macd_signal']
-            
-            # Bollinger Bands
-            sma_20 = data['Close'].rolling(window=20).mean()
-            std_20 = data['Close'].rolling(window=20).std()
-            indicators['bb_upper'] = sma_20.iloc[-1] + (std_20.iloc[-1] * 2)
-            indicators['bb_middle'] = sma_20.iloc[-1]
-            indicators['bb_lower'] = sma_20.iloc[-1] - (std_20.iloc[-1] * 2)
-            indicators['bb_position'] = (data['Close'].iloc[-1] - indicators['bb_lower']) / (indicators['bb_upper'] - indicators['bb_lower'])
-            
-            # Volume indicators
-            indicators['volume_sma'] = data['Volume'].rolling(window=20).mean().iloc[-1]
-            indicators['volume_ratio'] = data['Volume'].iloc[-1] / indicators['volume_sma']
-            
-            # Price momentum
-            indicators['momentum_5'] = (data['Close'].iloc[-1] / data['Close'].iloc[-6]) - 1
-            indicators['momentum_10'] = (data['Close'].iloc[-1] / data['Close'].iloc[-11]) - 1
-            indicators['momentum_20'] = (data['Close'].iloc[-1] / data['Close'].iloc[-21]) - 1
-            
-            # Support and Resistance levels
-            indicators['support_level'] = data['Low'].rolling(window=20).min().iloc[-1]
-            indicators['resistance_level'] = data['High'].rolling(window=20).max().iloc[-1]
-            
-            return indicators
+            if frame is None:
+                frame = compute_indicators(data)
+            return latest_indicators(frame)
             
         except Exception as e:
             logger.error(f"Error calculating technical indicators: {e}")
             return {}
     
-    def analyze_trend(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def analyze_panel(self, close: pd.DataFrame, high: pd.DataFrame,
+                      low: pd.DataFrame, volume: pd.DataFrame) -> pd.DataFrame:
+        """Screen a whole universe at once from wide (dates x tickers) price frames
+        
+        Returns one row per ticker with the latest technical indicators and trend.
+        """
+        if close.empty:
+            return pd.DataFrame()
+        
+        try:
+            return compute_panel_indicators(close, high, low, volume)
+        except Exception as e:
+            logger.error(f"Error analyzing panel of {close.shape[1]} tickers: {e}")
+            return pd.DataFrame()
+    
+    def analyze_trend(self, data: pd.DataFrame,
+                      frame: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Analyze price trend"""
         if data.empty:
             return {}
         
         try:
             current_price = data['Close'].iloc[-1]
-            sma_20 = data['Close'].rolling(window=20).mean().iloc[-1]
-            sma_50 = data['Close'].rolling(window=50).mean().iloc[-1]
-            sma_200 = data['Close'].rolling(window=200).mean().iloc[-1]
+            if frame is not None and not frame.empty:
+                sma_20, sma_50, sma_200 = frame[['sma_20', 'sma_50', 'sma_200']].iloc[-1]
+            else:
+                sma_20 = data['Close'].rolling(window=20).mean().iloc[-1]
+                sma_50 = data['Close'].rolling(window=50).mean().iloc[-1]
+                sma_200 = data['Close'].rolling(window=200).mean().iloc[-1]
             
             # Trend analysis
             trend_analysis = {
@@ -166,30 +166,9 @@ class FinancialAnalyzer:
                 'trend_direction': 'neutral'
             }
             
-            # Calculate trend strength
-            trend_strength = 0
-            if current_price > sma_20:
-                trend_strength += 1
-            if current_price > sma_50:
-                trend_strength += 1
-            if current_price > sma_200:
-                trend_strength += 1
-            if sma_20 > sma_50:
-                trend_strength += 1
-            if sma_50 > sma_200:
-                trend_strength += 1
-            
-            trend_analysis['trend_strength'] = trend_strength
-            
-            # Determine trend direction
-            if trend_strength >= 4:
-                trend_analysis['trend_direction'] = 'strong_uptrend'
-            elif trend_strength >= 2:
-                trend_analysis['trend_direction'] = 'uptrend'
-            elif trend_strength <= 1:
-                trend_analysis['trend_direction'] = 'downtrend'
-            else:
-                trend_analysis['trend_direction'] = 'sideways'
+            # Calculate trend strength and direction
+            trend_analysis['trend_strength'] = int(trend_strength(current_price, sma_20, sma_50, sma_200))
+            trend_analysis['trend_direction'] = trend_direction(trend_analysis['trend_strength'])
             
             return trend_analysis
             
@@ -426,49 +405,134 @@ class FinancialAnalyzer:
                 'reasoning': ['Error in signal generation']
             }
     
-    def comprehensive_analysis(self, ticker: str) -> Dict[str, Any]:
+    def _build_analysis(self, ticker: str, data: pd.DataFrame,
+                        stock_info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run every analysis step on already fetched data (CPU only, no I/O)"""
+        # Indicator series are computed once and shared
+        indicator_frame = self.compute_indicators(data)
+        technical_indicators = self.calculate_technical_indicators(data, indicator_frame)
+        trend_analysis = self.analyze_trend(data, indicator_frame)
+        risk_metrics = self.calculate_risk_metrics(data)
+        fundamental_analysis = self.analyze_fundamentals(stock_info)
+        trading_signals = self.generate_trading_signals(
+            technical_indicators, trend_analysis, risk_metrics
+        )
+        
+        # Compile results
+        return {
+            'ticker': ticker,
+            'timestamp': datetime.now().isoformat(),
+            'stock_info': stock_info,
+            'technical_indicators': technical_indicators,
+            'trend_analysis': trend_analysis,
+            'risk_metrics': risk_metrics,
+            'fundamental_analysis': fundamental_analysis,
+            'trading_signals': trading_signals,
+            'summary': {
+                'current_price': trend_analysis.get('current_price', 0),
+                'trend_direction': trend_analysis.get('trend_direction', 'neutral'),
+                'overall_signal': trading_signals.get('overall_signal', 'hold'),
+                'confidence': trading_signals.get('confidence', 0.5),
+                'risk_level': 'high' if risk_metrics.get('annualized_volatility', 0) > 0.4 else 'medium' if risk_metrics.get('annualized_volatility', 0) > 0.2 else 'low'
+            }
+        }
+    
+    def _fetch_inputs(self, ticker: str, period: str) -> Tuple[Optional[pd.DataFrame], Optional[Dict[str, Any]]]:
+        """Price history and fundamentals for ticker (I/O only)"""
+        data = self.get_stock_data(ticker, period)
+        if data is None:
+            return None, None
+        return data, self.get_stock_info(ticker)
+    
+    def comprehensive_analysis(self, ticker: str, period: str = "1y") -> Dict[str, Any]:
         """Perform comprehensive analysis of a stock"""
         try:
             logger.info(f"Starting comprehensive analysis for {ticker}")
             
             # Get data
-            data = self.get_stock_data(ticker)
+            data, stock_info = self._fetch_inputs(ticker, period)
             if data is None:
                 return {'error': f'Unable to fetch data for {ticker}'}
             
-            stock_info = self.get_stock_info(ticker)
-            
-            # Perform analysis
-            technical_indicators = self.calculate_technical_indicators(data)
-            trend_analysis = self.analyze_trend(data)
-            risk_metrics = self.calculate_risk_metrics(data)
-            fundamental_analysis = self.analyze_fundamentals(stock_info)
-            trading_signals = self.generate_trading_signals(
-                technical_indicators, trend_analysis, risk_metrics
-            )
-            
-            # Compile results
-            analysis_result = {
-                'ticker': ticker,
-                'timestamp': datetime.now().isoformat(),
-                'stock_info': stock_info,
-                'technical_indicators': technical_indicators,
-                'trend_analysis': trend_analysis,
-                'risk_metrics': risk_metrics,
-                'fundamental_analysis': fundamental_analysis,
-                'trading_signals': trading_signals,
-                'summary': {
-                    'current_price': trend_analysis.get('current_price', 0),
-                    'trend_direction': trend_analysis.get('trend_direction', 'neutral'),
-                    'overall_signal': trading_signals.get('overall_signal', 'hold'),
-                    'confidence': trading_signals.get('confidence', 0.5),
-                    'risk_level': 'high' if risk_metrics.get('annualized_volatility', 0) > 0.4 else 'medium' if risk_metrics.get('annualized_volatility', 0) > 0.2 else 'low'
-                }
-            }
+            analysis_result = self._build_analysis(ticker, data, stock_info)
             
             logger.info(f"Analysis completed for {ticker}")
             return analysis_result
             
         except Exception as e:
             logger.error(f"Error in comprehensive analysis for {ticker}: {e}")
-            return {'error': f'Analysis failed for {ticker}: {str(e)}'} 
\ No newline at end of file
+            return {'error': f'Analysis failed for {ticker}: {str(e)}'}
+    
+    def analyze_many(self, tickers: List[str], max_workers: Optional[int] = None,
+                     period: str = "1y",
+                     process_pool_min_tickers: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Comprehensive analysis of many tickers, yielding (ticker, result) as each completes
+        
+        Price history for all tickers is prefetched with multi-ticker
+        downloads, fundamentals are fetched on a thread pool, and for
+        universes of at least process_pool_min_tickers the indicator math
+        runs on a process pool. A failing ticker yields an {'error': ...}
+        result without affecting the others.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return
+        
+        max_workers = max_workers or self.analysis_config['batch_max_workers']
+        if process_pool_min_tickers is None:
+            process_pool_min_tickers = self.analysis_config['process_pool_min_tickers']
+        
+        try:
+            price_cache.prefetch([self._symbol(ticker) for ticker in tickers], period=period)
+        except Exception as e:
+            # Per-ticker fetches below still work, just without the batched download
+            logger.error(f"Error prefetching price history: {e}")
+        
+        # Workers are spawned, not forked: they start on first submit, when the I/O
+        # threads are running, and a forked child could inherit a lock one of them holds
+        cpu_pool = (ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+                    if len(tickers) >= process_pool_min_tickers else None)
+        io_pool = ThreadPoolExecutor(max_workers=min(max_workers, len(tickers)))
+        try:
+            if cpu_pool is None:
+                # Small batches: each thread runs the whole analysis for its ticker
+                pending = {io_pool.submit(self.comprehensive_analysis, ticker, period): ('done', ticker)
+                           for ticker in tickers}
+            else:
+                pending = {io_pool.submit(self._fetch_inputs, ticker, period): ('fetched', ticker)
+                           for ticker in tickers}
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, ticker = pending.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        logger.error(f"Error in batch analysis for {ticker}: {e}")
+                        yield ticker, {'error': f'Analysis failed for {ticker}: {str(e)}'}
+                        continue
+                    
+                    if stage == 'done':
+                        yield ticker, value
+                    elif value[0] is None:
+                        yield ticker, {'error': f'Unable to fetch data for {ticker}'}
+                    else:
+                        data, stock_info = value
+                        pending[cpu_pool.submit(_build_analysis_task, ticker, data, stock_info)] = ('done', ticker)
+        finally:
+            io_pool.shutdown(wait=False, cancel_futures=True)
+            if cpu_pool is not None:
+                cpu_pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _symbol(self, ticker: str) -> str:
+        """Exchange-qualified symbol (NSE by default)"""
+        if ticker.endswith(('.NS', '.BO')):
+            return ticker
+        return ticker + self.indian_markets_config['nse_suffix']
+
+
+def _build_analysis_task(ticker: str, data: pd.DataFrame,
+                         stock_info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Process-pool entry point for FinancialAnalyzer._build_analysis"""
+    return FinancialAnalyzer()._build_analysis(ticker, data, stock_info)
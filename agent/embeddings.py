@@ -0,0 +1,105 @@
+"""
+Text embedders for FinRexent semantic memory
+"""
+import re
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+
+from utils.config import config
+from utils.logger import logger
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+class OllamaEmbedder:
+    """Embeddings from the Ollama server (e.g. nomic-embed-text)"""
+
+    def __init__(self, base_url: Optional[str] = None, model: str = 'nomic-embed-text',
+                 timeout: Optional[float] = None):
+        ollama_config = config.get_ollama_config()
+        self.base_url = (base_url or ollama_config['base_url']).rstrip('/')
+        self.model = model
+        self.timeout = timeout or ollama_config.get('timeout', 30)
+        self.name = f'ollama:{model}'
+        self.session = requests.Session()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """One row per text; raises on HTTP errors"""
+        response = self.session.post(f"{self.base_url}/api/embed",
+                                     json={'model': self.model, 'input': texts}, timeout=self.timeout)
+        if response.status_code == 404:
+            # Servers before /api/embed only embed one prompt per request
+            return np.array([self._embed_one(text) for text in texts], dtype=np.float32)
+        response.raise_for_status()
+        return np.array(response.json()['embeddings'], dtype=np.float32)
+
+    def _embed_one(self, text: str) -> List[float]:
+        response = self.session.post(f"{self.base_url}/api/embeddings",
+                                     json={'model': self.model, 'prompt': text}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['embedding']
+
+
+class TransformersEmbedder:
+    """Mean-pooled sentence embeddings from a local transformers model"""
+
+    def __init__(self, model: str = 'sentence-transformers/all-MiniLM-L6-v2', max_length: int = 256):
+        self.model_name = model
+        self.max_length = max_length
+        self.name = f'transformers:{model}'
+        self._tokenizer = None
+        self._model = None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        if self._model is None:
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._model = AutoModel.from_pretrained(self.model_name).eval()
+
+        encoded = self._tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                  return_tensors='pt')
+        with torch.no_grad():
+            hidden = self._model(**encoded).last_hidden_state
+        mask = encoded['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+        return ((hidden * mask).sum(1) / mask.sum(1).clamp(min=1)).numpy().astype(np.float32)
+
+
+class HashingEmbedder:
+    """Dependency-free lexical embeddings: signed feature hashing of words and word pairs
+
+    Only captures shared vocabulary, not meaning, but needs no model and
+    is deterministic; a fallback when no embedding model is available.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f'hashing:{dim}'
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD_PATTERN.findall(text.lower())
+            features = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+            for feature in features:
+                digest = zlib.crc32(feature.encode())
+                vectors[row, digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        return vectors
+
+
+def create_embedder(memory_config: Optional[Dict[str, Any]] = None):
+    """Embedder named by the memory config ('ollama', 'transformers' or 'hashing')"""
+    memory_config = memory_config or config.get_memory_config()
+    kind = memory_config.get('embedder', 'ollama')
+    if kind == 'ollama':
+        return OllamaEmbedder(model=memory_config.get('embedding_model', 'nomic-embed-text'))
+    if kind == 'transformers':
+        return TransformersEmbedder(model=memory_config.get('embedding_model',
+                                                            'sentence-transformers/all-MiniLM-L6-v2'))
+    if kind != 'hashing':
+        logger.warning(f"Unknown embedder {kind!r}; using hashing embeddings")
+    return HashingEmbedder(memory_config.get('hashing_dim', 512))
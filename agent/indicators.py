@@ -0,0 +1,299 @@
+"""
+Technical indicator engine for FinRexent
+
+Every indicator is computed as a full series into one columnar frame.
+Shared primitives (prefix sums of the close, the 12/26-day EMAs, the
+price delta) are computed once on NumPy arrays and every indicator is
+derived from them; the pandas frame is only built at the end.
+"""
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Tuple
+
+INDICATOR_COLUMNS = [
+    'sma_20', 'sma_50', 'sma_200',
+    'ema_12', 'ema_26',
+    'rsi',
+    'macd', 'macd_signal', 'macd_histogram',
+    'bb_upper', 'bb_middle', 'bb_lower', 'bb_position',
+    'volume_sma', 'volume_ratio',
+    'momentum_5', 'momentum_10', 'momentum_20',
+    'support_level', 'resistance_level',
+]
+
+
+class PrefixSums:
+    """Cumulative sums of a series; any window's mean and std then cost O(n)
+
+    Works along the last axis, so a 2-D array holds one series per row.
+    Windows containing a NaN give NaN, like pandas rolling with the
+    default min_periods. Values are centred before summing so the sum of
+    squares keeps its precision for price-sized inputs.
+    """
+
+    def __init__(self, values: np.ndarray, squares: bool = False):
+        values = np.asarray(values, dtype=float)
+        missing = np.isnan(values)
+        has_gaps = bool(missing.any())
+        if has_gaps:
+            centred = np.where(missing, 0.0, values)
+            counts = values.shape[-1] - missing.sum(axis=-1, keepdims=True)
+            offset = centred.sum(axis=-1, keepdims=True) / np.maximum(counts, 1)
+            centred = np.where(missing, 0.0, values - offset)
+        else:
+            offset = values.mean(axis=-1, keepdims=True) if values.shape[-1] else 0.0
+            centred = values - offset
+
+        self.length = values.shape[-1]
+        self.offset = offset
+        self._sums = self._prefix(centred)
+        self._squares = self._prefix(centred * centred) if squares else None
+        self._gaps = self._prefix(missing.astype(float)) if has_gaps else None
+
+    @staticmethod
+    def _prefix(values: np.ndarray) -> np.ndarray:
+        zeros = np.zeros(values.shape[:-1] + (1,))
+        return np.concatenate((zeros, np.cumsum(values, axis=-1)), axis=-1)
+
+    def _window(self, prefix: np.ndarray, window: int) -> np.ndarray:
+        """Sum of each full window, aligned to the window's last element"""
+        out = np.full(prefix.shape[:-1] + (self.length,), np.nan)
+        if self.length >= window:
+            sums = prefix[..., window:] - prefix[..., :-window]
+            if self._gaps is not None:
+                sums[(self._gaps[..., window:] - self._gaps[..., :-window]) > 0] = np.nan
+            out[..., window - 1:] = sums
+        return out
+
+    def mean(self, window: int) -> np.ndarray:
+        """Same as Series.rolling(window).mean()"""
+        return self._window(self._sums, window) / window + self.offset
+
+    def mean_std(self, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rolling mean and sample standard deviation (ddof=1)"""
+        if self._squares is None:
+            raise ValueError("PrefixSums was built without squares")
+        sums = self._window(self._sums, window)
+        mean = sums / window
+        variance = (self._window(self._squares, window) - sums * mean) / (window - 1)
+        return mean + self.offset, np.sqrt(np.maximum(variance, 0.0))
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Same as Series.rolling(window).mean(), along the last axis"""
+    return PrefixSums(values).mean(window)
+
+
+def _rolling_extreme(values: np.ndarray, window: int, ufunc: np.ufunc) -> np.ndarray:
+    """Rolling min/max in O(n) using block prefix/suffix scans (van Herk/Gil-Werman)"""
+    values = np.asarray(values, dtype=float)
+    n = values.shape[-1]
+    out = np.full(values.shape, np.nan)
+    if n < window:
+        return out
+
+    blocks = -(-n // window)
+    padded = np.full(values.shape[:-1] + (blocks * window,), np.nan)
+    padded[..., :n] = values
+    padded = padded.reshape(values.shape[:-1] + (blocks, window))
+    prefix = ufunc.accumulate(padded, axis=-1).reshape(values.shape[:-1] + (-1,))
+    suffix = ufunc.accumulate(padded[..., ::-1], axis=-1)[..., ::-1].reshape(values.shape[:-1] + (-1,))
+
+    # Window [i, i + window - 1] = suffix of i's block + prefix of the next block
+    starts = np.arange(n - window + 1)
+    out[..., window - 1:] = ufunc(suffix[..., starts], prefix[..., starts + window - 1])
+    return out
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Same as Series.rolling(window).min(), along the last axis"""
+    return _rolling_extreme(values, window, np.minimum)
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Same as Series.rolling(window).max(), along the last axis"""
+    return _rolling_extreme(values, window, np.maximum)
+
+
+def shift_ratio(values: np.ndarray, periods: int) -> np.ndarray:
+    """values / values.shift(periods) - 1, along the last axis"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] > periods:
+        out[..., periods:] = values[..., periods:] / values[..., :-periods] - 1
+    return out
+
+
+def _decayed_sums(values: np.ndarray, decay: np.ndarray) -> np.ndarray:
+    """s[t] = values[t] + decay * s[t - 1] along the last axis, without a per-element loop
+
+    Within a block of length k the recurrence has the closed form
+    decay**i * cumsum(values[j] / decay**j); only the carry between blocks
+    is propagated in Python. Blocks are kept short enough that decay**-k
+    stays far from overflow. decay broadcasts against values' leading axes.
+    """
+    shape = np.broadcast_shapes(values.shape, decay.shape)
+    n = shape[-1]
+    smallest = float(decay.min())
+    block = 64 if smallest >= 0.5 else max(1, int(-200 / np.log(smallest))) if smallest > 0 else 1
+    blocks = -(-n // block)
+
+    padded = np.zeros(shape[:-1] + (blocks * block,))
+    padded[..., :n] = values
+    padded = padded.reshape(shape[:-1] + (blocks, block))
+
+    powers = decay[..., None] ** np.arange(block)
+    local = np.cumsum(padded / powers, axis=-1) * powers
+
+    # Carry the last sum of each block into the next one
+    carry_weights = (decay[..., None] * powers)[..., 0, :]
+    for b in range(1, blocks):
+        local[..., b, :] += local[..., b - 1, -1:] * carry_weights
+    return local.reshape(shape[:-1] + (-1,))[..., :n]
+
+
+def ewm_mean(values: np.ndarray, span) -> np.ndarray:
+    """Same as Series.ewm(span=span).mean() (adjust=True), along the last axis
+
+    span may be a sequence to compute several EMAs of the same series in
+    one pass; the result then gains a leading axis, one entry per span. NaNs contribute
+    nothing but the weights keep decaying, as in pandas with
+    ignore_na=False; output is NaN until the first observation.
+    """
+    values = np.asarray(values, dtype=float)
+    span = np.asarray(span, dtype=float)
+    decay = (1 - 2 / (span + 1)).reshape(span.shape + (1,) * values.ndim)
+    observed = ~np.isnan(values)
+
+    if observed.all():
+        numerator = _decayed_sums(values, decay)
+        # Sum of decay**i for i = 0..t
+        steps = np.arange(1, values.shape[-1] + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = np.where(decay < 1, (1 - decay ** steps) / (1 - decay), steps)
+        return numerator / denominator
+
+    numerator = _decayed_sums(np.where(observed, values, 0.0), decay)
+    denominator = _decayed_sums(observed.astype(float), decay)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def indicator_arrays(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                     volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """Every indicator as an array shaped like the inputs, time along the last axis
+
+    Works for one series (1-D) or a panel of series (tickers x dates).
+    """
+    # Shared primitives: one set of prefix sums serves every close-price window
+    close_sums = PrefixSums(close, squares=True)
+    sma_20, std_20 = close_sums.mean_std(20)
+    ema_12, ema_26 = ewm_mean(close, [12, 26])
+    delta = np.diff(close, axis=-1, prepend=np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # RSI (simple moving average of gains and losses); the first delta counts as 0
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), 14)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), 14)
+        rsi = 100 - (100 / (1 + gain / loss))
+
+        # MACD
+        macd = ema_12 - ema_26
+        macd_signal = ewm_mean(macd, 9)
+
+        # Bollinger Bands
+        bb_upper = sma_20 + std_20 * 2
+        bb_lower = sma_20 - std_20 * 2
+        bb_position = (close - bb_lower) / (bb_upper - bb_lower)
+
+        volume_sma = rolling_mean(volume, 20)
+        volume_ratio = volume / volume_sma
+
+        momentum = {period: shift_ratio(close, period) for period in (5, 10, 20)}
+
+    return {
+        'sma_20': sma_20,
+        'sma_50': close_sums.mean(50),
+        'sma_200': close_sums.mean(200),
+        'ema_12': ema_12,
+        'ema_26': ema_26,
+        'rsi': rsi,
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_histogram': macd - macd_signal,
+        'bb_upper': bb_upper,
+        'bb_middle': sma_20,
+        'bb_lower': bb_lower,
+        'bb_position': bb_position,
+        'volume_sma': volume_sma,
+        'volume_ratio': volume_ratio,
+        'momentum_5': momentum[5],
+        'momentum_10': momentum[10],
+        'momentum_20': momentum[20],
+        'support_level': rolling_min(low, 20),
+        'resistance_level': rolling_max(high, 20),
+    }
+
+
+def compute_indicators(data: pd.DataFrame) -> pd.DataFrame:
+    """Compute all technical indicators for OHLCV data, indexed like data
+
+    Rows before an indicator's lookback window is filled are NaN.
+    """
+    # Per-column extraction; a multi-column .to_numpy() would copy via object dtype
+    columns = indicator_arrays(*(data[column].to_numpy(dtype=float)
+                                 for column in ('Close', 'High', 'Low', 'Volume')))
+    # One 2-D block instead of a column-by-column frame build
+    values = np.column_stack([columns[name] for name in INDICATOR_COLUMNS])
+    return pd.DataFrame(values, index=data.index, columns=INDICATOR_COLUMNS)
+
+
+def trend_strength(close, sma_20, sma_50, sma_200):
+    """Count of bullish moving-average conditions (0-5); works on scalars or arrays
+
+    NaN comparisons count as not bullish.
+    """
+    conditions = (close > sma_20, close > sma_50, close > sma_200, sma_20 > sma_50, sma_50 > sma_200)
+    return np.sum(conditions, axis=0)
+
+
+def trend_direction(strength: int) -> str:
+    """Trend label for a trend_strength score"""
+    if strength >= 4:
+        return 'strong_uptrend'
+    elif strength >= 2:
+        return 'uptrend'
+    elif strength <= 1:
+        return 'downtrend'
+    return 'sideways'
+
+
+def compute_panel_indicators(close: pd.DataFrame, high: pd.DataFrame, low: pd.DataFrame,
+                             volume: pd.DataFrame) -> pd.DataFrame:
+    """Latest indicators for a whole universe at once
+
+    Inputs are wide frames (dates x tickers) with the same index and
+    columns; tickers with a shorter history are NaN before their first
+    bar. Returns one row per ticker: the last date's indicator values,
+    current_price, trend_strength and trend_direction.
+    """
+    tickers = close.columns
+    arrays = [frame.reindex(index=close.index, columns=tickers).to_numpy(dtype=float).T
+              for frame in (close, high, low, volume)]
+    series = indicator_arrays(*arrays)
+
+    latest = {name: series[name][:, -1] for name in INDICATOR_COLUMNS}
+    current_price = arrays[0][:, -1]
+    strength = trend_strength(current_price, latest['sma_20'], latest['sma_50'], latest['sma_200'])
+
+    result = pd.DataFrame(latest, index=pd.Index(tickers, name='ticker'), columns=INDICATOR_COLUMNS)
+    result.insert(0, 'current_price', current_price)
+    result['trend_strength'] = strength
+    result['trend_direction'] = [trend_direction(value) for value in strength]
+    return result
+
+
+def latest_indicators(frame: pd.DataFrame) -> Dict[str, Any]:
+    """Latest value of every indicator, as returned by calculate_technical_indicators"""
+    if frame.empty:
+        return {}
+    return frame.iloc[-1].to_dict()
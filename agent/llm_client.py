@@ -1,80 +1,48 @@
 """
 Ollama LLM Client for FinRexent Agent
 """
+import asyncio
+import re
 import requests
 import json
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Tuple
 from datetime import datetime
 
+import aiohttp
+
 from utils.logger import logger
 from utils.config import config
+from utils.llm_cache import LLMResponseCache, llm_cache
+from .structured_output import (
+    ALLOCATION_SCHEMA, FUNDAMENTALS_SCHEMA, RECOMMENDATION_SCHEMA, SENTIMENT_BATCH_ITEM_SCHEMA,
+    SENTIMENT_BATCH_SCHEMA, SENTIMENT_SCHEMA, JsonObjectScanner, extract_json, validate
+)
 
-class OllamaClient:
-    """Client for Ollama LLM service"""
-    
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3.1:8b"):
-        self.base_url = base_url.rstrip('/')
-        self.model = model
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json'
-        })
-        
-        # Load configuration
-        ollama_config = config.get_ollama_config()
-        self.timeout = ollama_config.get('timeout', 30)
-        self.max_tokens = ollama_config.get('max_tokens', 2048)
-        self.temperature = ollama_config.get('temperature', 0.7)
-    
-    def generate(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
-        """Generate response from Ollama"""
-        try:
-            payload = {
-                'model': self.model,
-                'prompt': prompt,
-                'stream': False,
-                'options': {
-                    'temperature': self.temperature,
-                    'num_predict': self.max_tokens
-                }
-            }
-            
-            if system_prompt:
-                payload['system'] = system_prompt
-            
-            start_time = time.time()
-            
-            response = self.session.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
-            
-            response_time = time.time() - start_time
-            
-            if response.status_code == 200:
-                result = response.json()
-                generated_text = result.get('response', '')
-                
-                logger.log_llm_request(
-                    model=self.model,
-                    prompt_length=len(prompt),
-                    response_time=response_time
-                )
-                
-                return generated_text
-            else:
-                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error generating response from Ollama: {str(e)}")
-            return None
+# Rough sizing for batched prompts: ~4 characters per token, and the
+# tokens one result entry takes in the response
+CHARS_PER_TOKEN = 4
+SENTIMENT_RESULT_TOKENS = 80
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _tokens_per_second(result: Dict[str, Any]) -> Optional[float]:
+    """Generation speed from the eval_count/eval_duration stats Ollama reports on completion"""
+    eval_count, eval_duration = result.get('eval_count'), result.get('eval_duration')
+    if eval_count and eval_duration:
+        return eval_count / (eval_duration / 1e9)
+    return None
+
+
+class OllamaPrompts:
+    """Prompt builders and response parsers shared by the sync and async clients"""
     
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        """Analyze sentiment of text using LLM"""
-        prompt = f"""
+    @staticmethod
+    def _sentiment_prompt(text: str) -> str:
+        return f"""
         Analyze the sentiment of the following financial news text. 
         Provide a sentiment score between -1 (very negative) and 1 (very positive) 
         and explain your reasoning.
@@ -89,29 +57,19 @@ class OllamaClient:
             "reasoning": "explanation"
         }}
         """
-        
-        response = self.generate(prompt)
+    
+    @staticmethod
+    def _parse_sentiment(response: Optional[str]) -> Dict[str, Any]:
         if response:
-            try:
-                # Try to extract JSON from response
-                import re
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
-                else:
-                    return {
-                        'sentiment': 'neutral',
-                        'score': 0.0,
-                        'confidence': 0.5,
-                        'reasoning': response
-                    }
-            except json.JSONDecodeError:
-                return {
-                    'sentiment': 'neutral',
-                    'score': 0.0,
-                    'confidence': 0.5,
-                    'reasoning': response
-                }
+            parsed = extract_json(response, SENTIMENT_SCHEMA)
+            if parsed is not None:
+                return parsed
+            return {
+                'sentiment': 'neutral',
+                'score': 0.0,
+                'confidence': 0.5,
+                'reasoning': response
+            }
         
         return {
             'sentiment': 'neutral',
@@ -120,9 +78,46 @@ class OllamaClient:
             'reasoning': 'Unable to analyze'
         }
     
-    def extract_stock_mentions(self, text: str) -> List[str]:
-        """Extract stock tickers mentioned in text"""
-        prompt = f"""
+    @staticmethod
+    def _sentiment_batch_prompt(texts: List[str]) -> str:
+        items = "\n".join(f"        [{number}] {' '.join(text.split())}"
+                          for number, text in enumerate(texts, 1))
+        return f"""
+        Analyze the sentiment of each of the following financial news texts.
+        For each text provide a sentiment score between -1 (very negative) and 1 (very positive)
+        and explain your reasoning briefly.
+        
+        Texts:
+{items}
+        
+        Respond in JSON format with one entry per text, using the text's number as "id":
+        {{
+            "results": [
+                {{"id": 1, "sentiment": "positive/negative/neutral", "score": 0.0, "confidence": 0.0, "reasoning": "explanation"}}
+            ]
+        }}
+        """
+    
+    @staticmethod
+    def _parse_sentiment_batch(response: Optional[str], count: int) -> Dict[int, Dict[str, Any]]:
+        """Valid results of a batched sentiment response by item number (1-based)"""
+        parsed = extract_json(response, SENTIMENT_BATCH_SCHEMA)
+        results = {}
+        for entry in parsed['results'] if parsed is not None else []:
+            if validate(entry, SENTIMENT_BATCH_ITEM_SCHEMA) or not 1 <= entry['id'] <= count:
+                continue
+            confidence = entry.get('confidence')
+            results[entry['id']] = {
+                'sentiment': entry['sentiment'],
+                'score': float(entry['score']),
+                'confidence': float(confidence) if confidence is not None else 0.5,
+                'reasoning': entry.get('reasoning', '')
+            }
+        return results
+    
+    @staticmethod
+    def _stock_mentions_prompt(text: str) -> str:
+        return f"""
         Extract all Indian stock tickers (NSE format with .NS suffix) mentioned in the following text.
         Return only the ticker symbols, one per line.
         
@@ -133,20 +128,20 @@ class OllamaClient:
         HDFCBANK.NS
         TCS.NS
         """
-        
-        response = self.generate(prompt)
+    
+    @staticmethod
+    def _parse_stock_mentions(response: Optional[str]) -> List[str]:
         if response:
             # Extract ticker symbols
-            import re
             ticker_pattern = r'\b[A-Z]{2,5}\.NS\b'
             tickers = re.findall(ticker_pattern, response.upper())
             return list(set(tickers))
         
         return []
     
-    def analyze_stock_fundamentals(self, stock_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze stock fundamentals using LLM"""
-        prompt = f"""
+    @staticmethod
+    def _fundamentals_prompt(stock_data: Dict[str, Any]) -> str:
+        return f"""
         Analyze the following stock fundamental data and provide investment insights:
         
         Stock: {stock_data.get('symbol', 'Unknown')}
@@ -168,16 +163,12 @@ class OllamaClient:
             "reasoning": "detailed explanation"
         }}
         """
-        
-        response = self.generate(prompt)
-        if response:
-            try:
-                import re
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
-            except json.JSONDecodeError:
-                pass
+    
+    @staticmethod
+    def _parse_fundamentals(response: Optional[str]) -> Dict[str, Any]:
+        parsed = extract_json(response, FUNDAMENTALS_SCHEMA)
+        if parsed is not None:
+            return parsed
         
         return {
             'strengths': [],
@@ -189,19 +180,17 @@ class OllamaClient:
             'reasoning': response or 'Unable to analyze'
         }
     
-    def generate_investment_recommendation(self, 
-                                         stock_data: Dict[str, Any],
-                                         news_data: List[Dict[str, Any]],
-                                         market_conditions: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate comprehensive investment recommendation"""
-        
+    @staticmethod
+    def _recommendation_prompt(stock_data: Dict[str, Any],
+                               news_data: List[Dict[str, Any]],
+                               market_conditions: Dict[str, Any]) -> str:
         # Prepare context
         news_summary = "\n".join([
             f"- {news['title']} (Sentiment: {news.get('sentiment', 'neutral')})"
             for news in news_data[:5]
         ])
         
-        prompt = f"""
+        return f"""
         As a financial advisor, provide a comprehensive investment recommendation for {stock_data.get('symbol', 'this stock')}.
         
         Stock Information:
@@ -233,16 +222,12 @@ class OllamaClient:
             "investment_amount_suggestion": "explanation of suggested investment amount"
         }}
         """
-        
-        response = self.generate(prompt)
-        if response:
-            try:
-                import re
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
-            except json.JSONDecodeError:
-                pass
+    
+    @staticmethod
+    def _parse_recommendation(response: Optional[str]) -> Dict[str, Any]:
+        parsed = extract_json(response, RECOMMENDATION_SCHEMA)
+        if parsed is not None:
+            return parsed
         
         return {
             'recommendation': 'hold',
@@ -256,13 +241,10 @@ class OllamaClient:
             'investment_amount_suggestion': 'Consult with financial advisor'
         }
     
-    def suggest_portfolio_allocation(self, 
-                                   available_capital: float,
-                                   risk_profile: str,
-                                   preferred_sectors: List[str]) -> Dict[str, Any]:
-        """Suggest portfolio allocation strategy"""
-        
-        prompt = f"""
+    @staticmethod
+    def _allocation_prompt(available_capital: float, risk_profile: str,
+                           preferred_sectors: List[str]) -> str:
+        return f"""
         As a portfolio manager, suggest an optimal portfolio allocation strategy:
         
         Available Capital: ₹{available_capital:,.2f}
@@ -295,16 +277,12 @@ class OllamaClient:
             "overall_strategy": "detailed explanation"
         }}
         """
-        
-        response = self.generate(prompt)
-        if response:
-            try:
-                import re
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
-            except json.JSONDecodeError:
-                pass
+    
+    @staticmethod
+    def _parse_allocation(response: Optional[str]) -> Dict[str, Any]:
+        parsed = extract_json(response, ALLOCATION_SCHEMA)
+        if parsed is not None:
+            return parsed
         
         return {
             'total_allocation': 0.0,
@@ -318,6 +296,282 @@ class OllamaClient:
             'overall_strategy': response or 'Unable to generate allocation strategy'
         }
     
+    def _payload(self, prompt: str, system_prompt: Optional[str] = None,
+                 json_response: bool = False) -> Dict[str, Any]:
+        payload = {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': False,
+            'options': {
+                # Scoring and extraction should be repeatable, which also makes them cacheable
+                'temperature': self.json_temperature if json_response else self.temperature,
+                'num_predict': self.max_tokens,
+                # The server must use the context batched prompts were sized for
+                'num_ctx': self.num_ctx
+            }
+        }
+        
+        if system_prompt:
+            payload['system'] = system_prompt
+        if json_response and self.json_format:
+            # Constrain decoding to valid JSON
+            payload['format'] = 'json'
+        return payload
+    
+    def _cached_response(self, payload: Dict[str, Any], use_cache: bool) -> Optional[str]:
+        if not use_cache or self.cache is None:
+            return None
+        return self.cache.get(payload)
+    
+    def _cache_response(self, payload: Dict[str, Any], response: Optional[str], use_cache: bool):
+        if use_cache and self.cache is not None and response:
+            self.cache.put(payload, response)
+    
+    def _discard_invalid(self, payload: Dict[str, Any], response: Optional[str], schema: Dict[str, Any]):
+        """Drop a cached response that fails schema so the next call asks the model again"""
+        if response and self.cache is not None and extract_json(response, schema) is None:
+            self.cache.discard(payload)
+
+class OllamaClient(OllamaPrompts):
+    """Client for Ollama LLM service"""
+    
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3.1:8b",
+                 cache: Optional[LLMResponseCache] = None):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.cache = cache if cache is not None else llm_cache
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Content-Type': 'application/json'
+        })
+        
+        # Load configuration
+        ollama_config = config.get_ollama_config()
+        self.timeout = ollama_config.get('timeout', 30)
+        self.max_tokens = ollama_config.get('max_tokens', 2048)
+        self.temperature = ollama_config.get('temperature', 0.7)
+        self.json_temperature = ollama_config.get('json_temperature', 0.0)
+        self.json_format = ollama_config.get('json_format', True)
+        self.num_ctx = ollama_config.get('num_ctx', 4096)
+        self.sentiment_batch_size = ollama_config.get('sentiment_batch_size', 16)
+    
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 use_cache: bool = True) -> Optional[str]:
+        """Generate response from Ollama (served from the response cache when possible)"""
+        try:
+            payload = self._payload(prompt, system_prompt)
+            cached = self._cached_response(payload, use_cache)
+            if cached is not None:
+                return cached
+            
+            start_time = time.time()
+            
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout
+            )
+            
+            response_time = time.time() - start_time
+            
+            if response.status_code == 200:
+                result = response.json()
+                generated_text = result.get('response', '')
+                
+                logger.log_llm_request(
+                    model=self.model,
+                    prompt_length=len(prompt),
+                    response_time=response_time,
+                    tokens_per_second=_tokens_per_second(result)
+                )
+                
+                self._cache_response(payload, generated_text, use_cache)
+                return generated_text
+            else:
+                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
+                return None
+                
+        except Exception as e:
+            logger.error(f"Error generating response from Ollama: {str(e)}")
+            return None
+    
+    def generate_stream(self, prompt: str, system_prompt: Optional[str] = None,
+                        stop_at_json: bool = False, use_cache: bool = True) -> Iterator[str]:
+        """Yield response chunks as Ollama streams them
+        
+        With stop_at_json the stream ends (and the connection is closed,
+        which stops generation on the server) as soon as a complete JSON
+        object has been received; the request also asks Ollama for JSON
+        output (format: json, unless ollama.json_format is off). Errors are
+        logged and end the stream. A cached response is yielded as a single
+        chunk.
+        """
+        payload = self._payload(prompt, system_prompt, json_response=stop_at_json)
+        # Truncated responses are cached apart from full ones
+        cache_payload = dict(payload, stop_at_json=True) if stop_at_json else payload
+        cached = self._cached_response(cache_payload, use_cache)
+        if cached is not None:
+            yield cached
+            return
+        
+        payload = dict(payload, stream=True)
+        scanner = JsonObjectScanner() if stop_at_json else None
+        parts = []
+        
+        start_time = time.time()
+        first_token_time = None
+        chunk_count = 0
+        final = {}
+        try:
+            with self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                   timeout=self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    logger.error(f"Ollama API error: {response.status_code} - {response.text}")
+                    return
+                
+                # chunk_size=None hands over each line as soon as it arrives
+                for line in response.iter_lines(chunk_size=None):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if 'error' in event:
+                        logger.error(f"Ollama API error: {event['error']}")
+                        return
+                    
+                    text = event.get('response', '')
+                    if text:
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                        chunk_count += 1
+                        end = scanner.feed(text) if scanner is not None else None
+                        if end is not None:
+                            parts.append(text[:end])
+                            yield text[:end]
+                            self._cache_response(cache_payload, ''.join(parts), use_cache)
+                            return
+                        parts.append(text)
+                        yield text
+                    
+                    if event.get('done'):
+                        final = event
+                        self._cache_response(cache_payload, ''.join(parts), use_cache)
+                        return
+                        
+        except Exception as e:
+            logger.error(f"Error streaming response from Ollama: {str(e)}")
+        finally:
+            if first_token_time is not None:
+                elapsed = time.time() - first_token_time
+                tokens_per_second = _tokens_per_second(final)
+                if tokens_per_second is None and elapsed > 0:
+                    # Ollama sends one token per chunk
+                    tokens_per_second = chunk_count / elapsed
+                logger.log_llm_request(
+                    model=self.model,
+                    prompt_length=len(prompt),
+                    response_time=time.time() - start_time,
+                    time_to_first_token=first_token_time - start_time,
+                    tokens_per_second=tokens_per_second
+                )
+    
+    def _generate_json(self, prompt: str, schema: Dict[str, Any]) -> Optional[str]:
+        """Streamed generation that stops once the response's JSON object is complete"""
+        response = ''.join(self.generate_stream(prompt, stop_at_json=True)) or None
+        self._discard_invalid(dict(self._payload(prompt, json_response=True), stop_at_json=True),
+                              response, schema)
+        return response
+    
+    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+        """Analyze sentiment of text using LLM"""
+        return self._parse_sentiment(self._generate_json(self._sentiment_prompt(text), SENTIMENT_SCHEMA))
+    
+    def analyze_sentiment_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Analyze sentiment of many texts, several per prompt
+        
+        Texts are packed into numbered prompts sized to the context window
+        (ollama.num_ctx) and the response token budget. Items missing or
+        invalid in a batch response are retried in one more batch, then
+        one at a time. Results are in input order, shaped like
+        analyze_sentiment's.
+        """
+        batch_size = batch_size or self.sentiment_batch_size
+        # Identical texts (syndicated headlines) are scored once
+        unique_texts = list(dict.fromkeys(texts))
+        scores: Dict[int, Dict[str, Any]] = {}
+        
+        pending = list(range(len(unique_texts)))
+        for _ in range(2):
+            pending = self._score_sentiment_batches(unique_texts, pending, batch_size, scores)
+            if len(pending) <= 1:
+                break
+        for index in pending:
+            scores[index] = self.analyze_sentiment(unique_texts[index])
+        
+        position = {text: index for index, text in enumerate(unique_texts)}
+        return [scores[position[text]] for text in texts]
+    
+    def _sentiment_batches(self, texts: List[str], indices: List[int], batch_size: int) -> List[List[int]]:
+        """Group indices into batches whose prompt and response fit the context window"""
+        overhead = _estimate_tokens(self._sentiment_batch_prompt([]))
+        max_items = max(1, min(batch_size, self.max_tokens // SENTIMENT_RESULT_TOKENS))
+        
+        batches, batch, used = [], [], overhead
+        for index in indices:
+            cost = _estimate_tokens(texts[index]) + SENTIMENT_RESULT_TOKENS
+            if batch and (len(batch) >= max_items or used + cost > self.num_ctx):
+                batches.append(batch)
+                batch, used = [], overhead
+            batch.append(index)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _score_sentiment_batches(self, texts: List[str], indices: List[int], batch_size: int,
+                                 scores: Dict[int, Dict[str, Any]]) -> List[int]:
+        """Score indices in batches into scores; return the indices that got no valid result"""
+        failed = []
+        for batch in self._sentiment_batches(texts, indices, batch_size):
+            if len(batch) == 1:
+                scores[batch[0]] = self.analyze_sentiment(texts[batch[0]])
+                continue
+            
+            prompt = self._sentiment_batch_prompt([texts[index] for index in batch])
+            results = self._parse_sentiment_batch(self._generate_json(prompt, SENTIMENT_BATCH_SCHEMA), len(batch))
+            for number, index in enumerate(batch, 1):
+                if number in results:
+                    scores[index] = results[number]
+                else:
+                    failed.append(index)
+        
+        if failed:
+            logger.warning(f"Retrying {len(failed)} of {len(indices)} texts missing from batched sentiment responses")
+        return failed
+    
+    def extract_stock_mentions(self, text: str) -> List[str]:
+        """Extract stock tickers mentioned in text"""
+        return self._parse_stock_mentions(self.generate(self._stock_mentions_prompt(text)))
+    
+    def analyze_stock_fundamentals(self, stock_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze stock fundamentals using LLM"""
+        return self._parse_fundamentals(self._generate_json(self._fundamentals_prompt(stock_data), FUNDAMENTALS_SCHEMA))
+    
+    def generate_investment_recommendation(self, 
+                                         stock_data: Dict[str, Any],
+                                         news_data: List[Dict[str, Any]],
+                                         market_conditions: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate comprehensive investment recommendation"""
+        prompt = self._recommendation_prompt(stock_data, news_data, market_conditions)
+        return self._parse_recommendation(self._generate_json(prompt, RECOMMENDATION_SCHEMA))
+    
+    def suggest_portfolio_allocation(self, 
+                                   available_capital: float,
+                                   risk_profile: str,
+                                   preferred_sectors: List[str]) -> Dict[str, Any]:
+        """Suggest portfolio allocation strategy"""
+        prompt = self._allocation_prompt(available_capital, risk_profile, preferred_sectors)
+        return self._parse_allocation(self._generate_json(prompt, ALLOCATION_SCHEMA))
+    
     def is_model_available(self) -> bool:
         """Check if the specified model is available"""
         try:
@@ -340,4 +594,130 @@ class OllamaClient:
             return []
         except Exception as e:
             logger.error(f"Error listing models: {e}")
-            return [] 
\ No newline at end of file
+            return [] 
+
+class AsyncOllamaClient(OllamaPrompts):
+    """asyncio Ollama client with pooled keep-alive connections and bounded concurrency
+    
+    At most ``max_concurrency`` requests are in flight at once, which
+    should match the server's parallel slots (OLLAMA_NUM_PARALLEL). The
+    ``*_many`` methods fan a batch out across those slots and return
+    results in input order. Use as an async context manager:
+    
+        async with AsyncOllamaClient() as client:
+            sentiments = await client.analyze_sentiment_many(texts)
+    """
+    
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: Optional[int] = None, cache: Optional[LLMResponseCache] = None):
+        ollama_config = config.get_ollama_config()
+        self.base_url = (base_url or ollama_config['base_url']).rstrip('/')
+        self.model = model or ollama_config['model']
+        self.timeout = ollama_config.get('timeout', 30)
+        self.max_tokens = ollama_config.get('max_tokens', 2048)
+        self.temperature = ollama_config.get('temperature', 0.7)
+        self.json_temperature = ollama_config.get('json_temperature', 0.0)
+        self.json_format = ollama_config.get('json_format', True)
+        self.num_ctx = ollama_config.get('num_ctx', 4096)
+        self.max_concurrency = max_concurrency or ollama_config.get('max_concurrency', 4)
+        self.cache = cache if cache is not None else llm_cache
+        
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def __aenter__(self) -> 'AsyncOllamaClient':
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # One pooled connection per slot, kept alive between requests
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'Content-Type': 'application/json'}
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                       use_cache: bool = True, json_response: bool = False) -> Optional[str]:
+        """Generate response from Ollama, or None on any failure"""
+        if self._session is None:
+            raise RuntimeError("AsyncOllamaClient must be used as an async context manager")
+        
+        try:
+            payload = self._payload(prompt, system_prompt, json_response)
+            cached = self._cached_response(payload, use_cache)
+            if cached is not None:
+                return cached
+            
+            async with self._semaphore:
+                # Timed from when a slot is free, so queueing is not counted
+                start_time = time.time()
+                async with self._session.post(f"{self.base_url}/api/generate", json=payload) as response:
+                    if response.status != 200:
+                        logger.error(f"Ollama API error: {response.status} - {await response.text()}")
+                        return None
+                    result = await response.json(content_type=None)
+            
+            logger.log_llm_request(
+                model=self.model,
+                prompt_length=len(prompt),
+                response_time=time.time() - start_time
+            )
+            generated_text = result.get('response', '')
+            self._cache_response(payload, generated_text, use_cache)
+            return generated_text
+            
+        except Exception as e:
+            logger.error(f"Error generating response from Ollama: {e!r}")
+            return None
+    
+    async def generate_many(self, prompts: Sequence[str],
+                            system_prompt: Optional[str] = None) -> List[Optional[str]]:
+        """Generate responses for many prompts concurrently, in input order"""
+        return await asyncio.gather(*(self.generate(prompt, system_prompt) for prompt in prompts))
+    
+    async def _generate_json(self, prompt: str, schema: Dict[str, Any]) -> Optional[str]:
+        response = await self.generate(prompt, json_response=True)
+        self._discard_invalid(self._payload(prompt, json_response=True), response, schema)
+        return response
+    
+    async def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+        """Analyze sentiment of text using LLM"""
+        return self._parse_sentiment(await self._generate_json(self._sentiment_prompt(text), SENTIMENT_SCHEMA))
+    
+    async def analyze_sentiment_many(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Sentiment of many texts, scored concurrently"""
+        return await asyncio.gather(*(self.analyze_sentiment(text) for text in texts))
+    
+    async def extract_stock_mentions(self, text: str) -> List[str]:
+        """Extract stock tickers mentioned in text"""
+        return self._parse_stock_mentions(await self.generate(self._stock_mentions_prompt(text)))
+    
+    async def extract_stock_mentions_many(self, texts: Sequence[str]) -> List[List[str]]:
+        """Tickers mentioned in each of many texts, extracted concurrently"""
+        return await asyncio.gather(*(self.extract_stock_mentions(text) for text in texts))
+    
+    async def analyze_stock_fundamentals(self, stock_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze stock fundamentals using LLM"""
+        return self._parse_fundamentals(await self._generate_json(self._fundamentals_prompt(stock_data),
+                                                                    FUNDAMENTALS_SCHEMA))
+    
+    async def generate_investment_recommendation(self,
+                                                 stock_data: Dict[str, Any],
+                                                 news_data: List[Dict[str, Any]],
+                                                 market_conditions: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate comprehensive investment recommendation"""
+        prompt = self._recommendation_prompt(stock_data, news_data, market_conditions)
+        return self._parse_recommendation(await self._generate_json(prompt, RECOMMENDATION_SCHEMA))
+    
+    async def generate_investment_recommendations(
+            self,
+            items: Sequence[Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Recommendations for many (stock_data, news_data, market_conditions) triples, concurrently"""
+        return await asyncio.gather(*(self.generate_investment_recommendation(*item)
+                                      for item in items))
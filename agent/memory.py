@@ -1,21 +1,42 @@
 """
 Memory Management System for FinRexent Agent
 """
-import sqlite3
 import json
 import pickle
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union
 from pathlib import Path
 import hashlib
 
+import numpy as np
+
 from utils.logger import logger
 from utils.config import config
+from utils.db import SQLiteConnectionManager
+from utils.vector_index import VectorIndex
+from .embeddings import create_embedder
+
+# Tables searchable with recall_similar, and the columns their text is built from
+MEMORY_SOURCES = {
+    'learning_data': ('data_type', 'data_content'),
+    'investment_recommendations': ('ticker', 'recommendation', 'reasoning'),
+}
+
+
+def _memory_text(source: str, row: tuple) -> str:
+    """Text embedded for a memory row (columns after the id, as in MEMORY_SOURCES)"""
+    if source == 'learning_data':
+        data_type, data_content = row
+        content = json.loads(data_content)
+        return f"{data_type}: {content if isinstance(content, str) else json.dumps(content)}"
+    ticker, recommendation, reasoning = row
+    return f"{ticker} {recommendation}: {reasoning or ''}"
 
 class MemoryManager:
     """Memory management system for storing and retrieving agent data"""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, embedder=None):
         if db_path is None:
             db_path = config.get_database_config().get('url', 'sqlite:///data/memory/agent_memory.db')
             # Convert SQLAlchemy URL to file path
@@ -24,103 +45,123 @@ class MemoryManager:
         
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Persistent per-thread connections (WAL, tuned pragmas, statement cache)
+        self._db = SQLiteConnectionManager(self.db_path)
         self._init_database()
+        
+        # Semantic recall: embedder and per-source indexes are created on first use
+        self.memory_config = config.get_memory_config()
+        self._embedder = embedder
+        self._indexes: Optional[Dict[str, VectorIndex]] = None
+        self._index_lock = threading.Lock()
+    
+    def close(self):
+        """Close all pooled database connections"""
+        self._db.close_all()
     
     def _init_database(self):
         """Initialize the memory database with required tables"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # User interactions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_interactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    user_query TEXT,
-                    agent_response TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    interaction_type TEXT,
-                    metadata TEXT
-                )
-            ''')
-            
-            # Investment recommendations table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS investment_recommendations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ticker TEXT,
-                    recommendation TEXT,
-                    confidence REAL,
-                    target_price REAL,
-                    stop_loss REAL,
-                    reasoning TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    market_conditions TEXT,
-                    news_context TEXT,
-                    user_feedback TEXT
-                )
-            ''')
-            
-            # Market analysis table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS market_analysis (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    analysis_type TEXT,
-                    data TEXT,
-                    insights TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    validity_period INTEGER
-                )
-            ''')
-            
-            # Portfolio tracking table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS portfolio_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ticker TEXT,
-                    entry_price REAL,
-                    entry_date TIMESTAMP,
-                    current_price REAL,
-                    quantity INTEGER,
-                    total_investment REAL,
-                    current_value REAL,
-                    pnl REAL,
-                    pnl_percentage REAL,
-                    recommendation_id INTEGER,
-                    status TEXT,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (recommendation_id) REFERENCES investment_recommendations (id)
-                )
-            ''')
-            
-            # Learning data table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS learning_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    data_type TEXT,
-                    data_hash TEXT UNIQUE,
-                    data_content TEXT,
-                    importance_score REAL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    access_count INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # Performance metrics table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS performance_metrics (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    metric_type TEXT,
-                    metric_value REAL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    context TEXT
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+            with self._db.transaction() as cursor:
+                # User interactions table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS user_interactions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        session_id TEXT,
+                        user_query TEXT,
+                        agent_response TEXT,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        interaction_type TEXT,
+                        metadata TEXT
+                    )
+                ''')
+
+                # Investment recommendations table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS investment_recommendations (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        ticker TEXT,
+                        recommendation TEXT,
+                        confidence REAL,
+                        target_price REAL,
+                        stop_loss REAL,
+                        reasoning TEXT,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        market_conditions TEXT,
+                        news_context TEXT,
+                        user_feedback TEXT
+                    )
+                ''')
+
+                # Market analysis table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS market_analysis (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        analysis_type TEXT,
+                        data TEXT,
+                        insights TEXT,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        validity_period INTEGER
+                    )
+                ''')
+
+                # Portfolio tracking table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS portfolio_tracking (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        ticker TEXT,
+                        entry_price REAL,
+                        entry_date TIMESTAMP,
+                        current_price REAL,
+                        quantity INTEGER,
+                        total_investment REAL,
+                        current_value REAL,
+                        pnl REAL,
+                        pnl_percentage REAL,
+                        recommendation_id INTEGER,
+                        status TEXT,
+                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (recommendation_id) REFERENCES investment_recommendations (id)
+                    )
+                ''')
+
+                # Learning data table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS learning_data (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        data_type TEXT,
+                        data_hash TEXT UNIQUE,
+                        data_content TEXT,
+                        importance_score REAL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        access_count INTEGER DEFAULT 0
+                    )
+                ''')
+
+                # Embeddings of learning data and recommendations for recall_similar
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS memory_embeddings (
+                        source TEXT NOT NULL,
+                        source_id INTEGER NOT NULL,
+                        model TEXT NOT NULL,
+                        vector BLOB NOT NULL,
+                        PRIMARY KEY (source, source_id)
+                    ) WITHOUT ROWID
+                ''')
+
+                # Performance metrics table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS performance_metrics (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        metric_type TEXT,
+                        metric_value REAL,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        context TEXT
+                    )
+                ''')
+
             logger.info("Memory database initialized successfully")
             
         except Exception as e:
@@ -134,24 +175,19 @@ class MemoryManager:
                          metadata: Optional[Dict[str, Any]] = None):
         """Store a user interaction"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO user_interactions 
-                (session_id, user_query, agent_response, interaction_type, metadata)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                session_id,
-                user_query,
-                agent_response,
-                interaction_type,
-                json.dumps(metadata) if metadata else None
-            ))
-            
-            conn.commit()
-            conn.close()
-            
+            with self._db.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO user_interactions 
+                    (session_id, user_query, agent_response, interaction_type, metadata)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (
+                    session_id,
+                    user_query,
+                    agent_response,
+                    interaction_type,
+                    json.dumps(metadata) if metadata else None
+                ))
+
         except Exception as e:
             logger.error(f"Error storing interaction: {e}")
     
@@ -166,29 +202,25 @@ class MemoryManager:
                            news_context: Optional[List[Dict[str, Any]]] = None):
         """Store an investment recommendation"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO investment_recommendations 
-                (ticker, recommendation, confidence, target_price, stop_loss, reasoning, 
-                 market_conditions, news_context)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                ticker,
-                recommendation,
-                confidence,
-                target_price,
-                stop_loss,
-                reasoning,
-                json.dumps(market_conditions) if market_conditions else None,
-                json.dumps(news_context) if news_context else None
-            ))
-            
-            recommendation_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
+            with self._db.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO investment_recommendations 
+                    (ticker, recommendation, confidence, target_price, stop_loss, reasoning, 
+                     market_conditions, news_context)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    ticker,
+                    recommendation,
+                    confidence,
+                    target_price,
+                    stop_loss,
+                    reasoning,
+                    json.dumps(market_conditions) if market_conditions else None,
+                    json.dumps(news_context) if news_context else None
+                ))
+
+                recommendation_id = cursor.lastrowid
+
             logger.info(f"Stored recommendation for {ticker} with ID {recommendation_id}")
             return recommendation_id
             
@@ -201,27 +233,24 @@ class MemoryManager:
                                  days: int = 30) -> List[Dict[str, Any]]:
         """Get recent investment recommendations"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            if ticker:
-                cursor.execute('''
-                    SELECT * FROM investment_recommendations 
-                    WHERE ticker = ? AND timestamp > ?
-                    ORDER BY timestamp DESC
-                ''', (ticker, cutoff_date.isoformat()))
-            else:
-                cursor.execute('''
-                    SELECT * FROM investment_recommendations 
-                    WHERE timestamp > ?
-                    ORDER BY timestamp DESC
-                ''', (cutoff_date.isoformat(),))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
+            with self._db.cursor() as cursor:
+                cutoff_date = datetime.now() - timedelta(days=days)
+
+                if ticker:
+                    cursor.execute('''
+                        SELECT * FROM investment_recommendations 
+                        WHERE ticker = ? AND timestamp > ?
+                        ORDER BY timestamp DESC
+                    ''', (ticker, cutoff_date.isoformat()))
+                else:
+                    cursor.execute('''
+                        SELECT * FROM investment_recommendations 
+                        WHERE timestamp > ?
+                        ORDER BY timestamp DESC
+                    ''', (cutoff_date.isoformat(),))
+
+                rows = cursor.fetchall()
+
             recommendations = []
             for row in rows:
                 recommendations.append({
@@ -251,42 +280,34 @@ class MemoryManager:
                             validity_period: int = 24):  # hours
         """Store market analysis data"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO market_analysis 
-                (analysis_type, data, insights, validity_period)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                analysis_type,
-                json.dumps(data),
-                insights,
-                validity_period
-            ))
-            
-            conn.commit()
-            conn.close()
-            
+            with self._db.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO market_analysis 
+                    (analysis_type, data, insights, validity_period)
+                    VALUES (?, ?, ?, ?)
+                ''', (
+                    analysis_type,
+                    json.dumps(data),
+                    insights,
+                    validity_period
+                ))
+
         except Exception as e:
             logger.error(f"Error storing market analysis: {e}")
     
     def get_valid_market_analysis(self, analysis_type: str) -> List[Dict[str, Any]]:
         """Get valid market analysis data"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM market_analysis 
-                WHERE analysis_type = ? AND 
-                      timestamp > datetime('now', '-' || validity_period || ' hours')
-                ORDER BY timestamp DESC
-            ''', (analysis_type,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
+            with self._db.cursor() as cursor:
+                cursor.execute('''
+                    SELECT * FROM market_analysis 
+                    WHERE analysis_type = ? AND 
+                          timestamp > datetime('now', '-' || validity_period || ' hours')
+                    ORDER BY timestamp DESC
+                ''', (analysis_type,))
+
+                rows = cursor.fetchall()
+
             analyses = []
             for row in rows:
                 analyses.append({
@@ -311,33 +332,28 @@ class MemoryManager:
                                recommendation_id: Optional[int] = None):
         """Track a portfolio position"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            total_investment = entry_price * quantity
-            
-            cursor.execute('''
-                INSERT INTO portfolio_tracking 
-                (ticker, entry_price, entry_date, quantity, total_investment, 
-                 current_price, current_value, pnl, pnl_percentage, recommendation_id, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                ticker,
-                entry_price,
-                datetime.now().isoformat(),
-                quantity,
-                total_investment,
-                entry_price,  # Initially same as entry price
-                total_investment,  # Initially same as total investment
-                0.0,  # Initial PnL
-                0.0,  # Initial PnL percentage
-                recommendation_id,
-                'active'
-            ))
-            
-            conn.commit()
-            conn.close()
-            
+            with self._db.transaction() as cursor:
+                total_investment = entry_price * quantity
+
+                cursor.execute('''
+                    INSERT INTO portfolio_tracking 
+                    (ticker, entry_price, entry_date, quantity, total_investment, 
+                     current_price, current_value, pnl, pnl_percentage, recommendation_id, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    ticker,
+                    entry_price,
+                    datetime.now().isoformat(),
+                    quantity,
+                    total_investment,
+                    entry_price,  # Initially same as entry price
+                    total_investment,  # Initially same as total investment
+                    0.0,  # Initial PnL
+                    0.0,  # Initial PnL percentage
+                    recommendation_id,
+                    'active'
+                ))
+
         except Exception as e:
             logger.error(f"Error tracking portfolio position: {e}")
     
@@ -346,65 +362,56 @@ class MemoryManager:
                                 current_price: float):
         """Update portfolio position with current price"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get current position
-            cursor.execute('''
-                SELECT entry_price, quantity, total_investment 
-                FROM portfolio_tracking 
-                WHERE ticker = ? AND status = 'active'
-                ORDER BY entry_date DESC LIMIT 1
-            ''', (ticker,))
-            
-            row = cursor.fetchone()
-            if row:
-                entry_price, quantity, total_investment = row
-                current_value = current_price * quantity
-                pnl = current_value - total_investment
-                pnl_percentage = (pnl / total_investment) * 100 if total_investment > 0 else 0
-                
+            with self._db.transaction() as cursor:
+                # Get current position
                 cursor.execute('''
-                    UPDATE portfolio_tracking 
-                    SET current_price = ?, current_value = ?, pnl = ?, 
-                        pnl_percentage = ?, last_updated = ?
+                    SELECT entry_price, quantity, total_investment 
+                    FROM portfolio_tracking 
                     WHERE ticker = ? AND status = 'active'
-                ''', (
-                    current_price,
-                    current_value,
-                    pnl,
-                    pnl_percentage,
-                    datetime.now().isoformat(),
-                    ticker
-                ))
-                
-                conn.commit()
-                
+                    ORDER BY entry_date DESC LIMIT 1
+                ''', (ticker,))
+
+                row = cursor.fetchone()
+                if row:
+                    entry_price, quantity, total_investment = row
+                    current_value = current_price * quantity
+                    pnl = current_value - total_investment
+                    pnl_percentage = (pnl / total_investment) * 100 if total_investment > 0 else 0
+
+                    cursor.execute('''
+                        UPDATE portfolio_tracking 
+                        SET current_price = ?, current_value = ?, pnl = ?, 
+                            pnl_percentage = ?, last_updated = ?
+                        WHERE ticker = ? AND status = 'active'
+                    ''', (
+                        current_price,
+                        current_value,
+                        pnl,
+                        pnl_percentage,
+                        datetime.now().isoformat(),
+                        ticker
+                    ))
+
         except Exception as e:
             logger.error(f"Error updating portfolio position: {e}")
-        finally:
-            conn.close()
     
     def get_portfolio_summary(self) -> Dict[str, Any]:
         """Get portfolio summary"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as total_positions,
-                    SUM(total_investment) as total_invested,
-                    SUM(current_value) as total_current_value,
-                    SUM(pnl) as total_pnl,
-                    AVG(pnl_percentage) as avg_pnl_percentage
-                FROM portfolio_tracking 
-                WHERE status = 'active'
-            ''')
-            
-            row = cursor.fetchone()
-            conn.close()
-            
+            with self._db.cursor() as cursor:
+                cursor.execute('''
+                    SELECT 
+                        COUNT(*) as total_positions,
+                        SUM(total_investment) as total_invested,
+                        SUM(current_value) as total_current_value,
+                        SUM(pnl) as total_pnl,
+                        AVG(pnl_percentage) as avg_pnl_percentage
+                    FROM portfolio_tracking 
+                    WHERE status = 'active'
+                ''')
+
+                row = cursor.fetchone()
+
             if row:
                 return {
                     'total_positions': row[0],
@@ -430,35 +437,30 @@ class MemoryManager:
             data_str = json.dumps(data_content, sort_keys=True)
             data_hash = hashlib.md5(data_str.encode()).hexdigest()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if data already exists
-            cursor.execute('''
-                SELECT id, access_count FROM learning_data 
-                WHERE data_hash = ?
-            ''', (data_hash,))
-            
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update access count and last accessed time
+            with self._db.transaction() as cursor:
+                # Check if data already exists
                 cursor.execute('''
-                    UPDATE learning_data 
-                    SET access_count = access_count + 1, last_accessed = ?
-                    WHERE id = ?
-                ''', (datetime.now().isoformat(), existing[0]))
-            else:
-                # Insert new data
-                cursor.execute('''
-                    INSERT INTO learning_data 
-                    (data_type, data_hash, data_content, importance_score)
-                    VALUES (?, ?, ?, ?)
-                ''', (data_type, data_hash, data_str, importance_score))
-            
-            conn.commit()
-            conn.close()
-            
+                    SELECT id, access_count FROM learning_data 
+                    WHERE data_hash = ?
+                ''', (data_hash,))
+
+                existing = cursor.fetchone()
+
+                if existing:
+                    # Update access count and last accessed time
+                    cursor.execute('''
+                        UPDATE learning_data 
+                        SET access_count = access_count + 1, last_accessed = ?
+                        WHERE id = ?
+                    ''', (datetime.now().isoformat(), existing[0]))
+                else:
+                    # Insert new data
+                    cursor.execute('''
+                        INSERT INTO learning_data 
+                        (data_type, data_hash, data_content, importance_score)
+                        VALUES (?, ?, ?, ?)
+                    ''', (data_type, data_hash, data_str, importance_score))
+
         except Exception as e:
             logger.error(f"Error storing learning data: {e}")
     
@@ -467,20 +469,17 @@ class MemoryManager:
                          limit: int = 10) -> List[Dict[str, Any]]:
         """Get learning data by type"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT data_content, importance_score, access_count, created_at
-                FROM learning_data 
-                WHERE data_type = ?
-                ORDER BY importance_score DESC, access_count DESC
-                LIMIT ?
-            ''', (data_type, limit))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
+            with self._db.cursor() as cursor:
+                cursor.execute('''
+                    SELECT data_content, importance_score, access_count, created_at
+                    FROM learning_data 
+                    WHERE data_type = ?
+                    ORDER BY importance_score DESC, access_count DESC
+                    LIMIT ?
+                ''', (data_type, limit))
+
+                rows = cursor.fetchall()
+
             data = []
             for row in rows:
                 data.append({
@@ -496,28 +495,124 @@ class MemoryManager:
             logger.error(f"Error retrieving learning data: {e}")
             return []
     
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = create_embedder(self.memory_config)
+        return self._embedder
+    
+    def _load_indexes(self) -> Dict[str, VectorIndex]:
+        """Per-source indexes over the stored embeddings of the current model"""
+        indexes = {source: VectorIndex(ann_min_size=self.memory_config['ann_min_size'],
+                                       nprobe=self.memory_config['ann_nprobe'])
+                   for source in MEMORY_SOURCES}
+        with self._db.cursor() as cursor:
+            cursor.execute('SELECT source, source_id, vector FROM memory_embeddings WHERE model = ?',
+                           (self.embedder.name,))
+            rows = cursor.fetchall()
+        for source in MEMORY_SOURCES:
+            ids = [source_id for row_source, source_id, _ in rows if row_source == source]
+            if ids:
+                vectors = np.vstack([np.frombuffer(vector, dtype=np.float32)
+                                     for row_source, _, vector in rows if row_source == source])
+                indexes[source].add(ids, vectors)
+        return indexes
+    
+    def _embed_new_memories(self):
+        """Embed rows stored since the last sync (or under another embedding model)"""
+        model = self.embedder.name
+        batch_size = self.memory_config['embed_batch_size']
+        for source, columns in MEMORY_SOURCES.items():
+            with self._db.cursor() as cursor:
+                cursor.execute(f'''
+                    SELECT t.id, {', '.join(f't.{column}' for column in columns)}
+                    FROM {source} t
+                    LEFT JOIN memory_embeddings e
+                        ON e.source = ? AND e.source_id = t.id AND e.model = ?
+                    WHERE e.source_id IS NULL
+                ''', (source, model))
+                rows = cursor.fetchall()
+
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                vectors = self.embedder.embed([_memory_text(source, row[1:]) for row in batch])
+                with self._db.transaction() as cursor:
+                    cursor.executemany('''
+                        INSERT OR REPLACE INTO memory_embeddings (source, source_id, model, vector)
+                        VALUES (?, ?, ?, ?)
+                    ''', [(source, row[0], model, np.asarray(vector, dtype=np.float32).tobytes())
+                          for row, vector in zip(batch, vectors)])
+                self._indexes[source].add([row[0] for row in batch], vectors)
+    
+    def _fetch_memories(self, source: str, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        placeholders = ','.join('?' * len(ids))
+        with self._db.cursor() as cursor:
+            if source == 'learning_data':
+                cursor.execute(f'''
+                    SELECT id, data_type, data_content, importance_score, access_count, created_at
+                    FROM learning_data WHERE id IN ({placeholders})
+                ''', ids)
+                return {row[0]: {'data_type': row[1], 'content': json.loads(row[2]),
+                                 'importance_score': row[3], 'access_count': row[4], 'created_at': row[5]}
+                        for row in cursor.fetchall()}
+            cursor.execute(f'''
+                SELECT id, ticker, recommendation, confidence, target_price, stop_loss, reasoning, timestamp
+                FROM investment_recommendations WHERE id IN ({placeholders})
+            ''', ids)
+            return {row[0]: {'ticker': row[1], 'recommendation': row[2], 'confidence': row[3],
+                             'target_price': row[4], 'stop_loss': row[5], 'reasoning': row[6],
+                             'timestamp': row[7]}
+                    for row in cursor.fetchall()}
+
+    def recall_similar(self,
+                       text: str,
+                       k: int = 5,
+                       sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """The k stored memories most similar in meaning to text, best first
+        
+        Searches learning data and past recommendations (or just the given
+        sources). Each result has 'source', 'id', 'score' (cosine
+        similarity) and the row's fields.
+        """
+        sources = sources or list(MEMORY_SOURCES)
+        try:
+            with self._index_lock:
+                if self._indexes is None:
+                    self._indexes = self._load_indexes()
+                self._embed_new_memories()
+                query = self.embedder.embed([text])[0]
+                hits = sorted(((score, source, source_id)
+                               for source in sources
+                               for source_id, score in self._indexes[source].search(query, k)),
+                              key=lambda hit: -hit[0])[:k]
+            
+            rows = {source: self._fetch_memories(source, [source_id for _, hit_source, source_id in hits
+                                                          if hit_source == source])
+                    for source in {source for _, source, _ in hits}}
+            return [dict(rows[source][source_id], source=source, id=source_id, score=score)
+                    for score, source, source_id in hits if source_id in rows[source]]
+            
+        except Exception as e:
+            logger.error(f"Error recalling similar memories: {e}")
+            return []
+    
     def store_performance_metric(self,
                                metric_type: str,
                                metric_value: float,
                                context: Optional[Dict[str, Any]] = None):
         """Store performance metric"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO performance_metrics 
-                (metric_type, metric_value, context)
-                VALUES (?, ?, ?)
-            ''', (
-                metric_type,
-                metric_value,
-                json.dumps(context) if context else None
-            ))
-            
-            conn.commit()
-            conn.close()
-            
+            with self._db.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO performance_metrics 
+                    (metric_type, metric_value, context)
+                    VALUES (?, ?, ?)
+                ''', (
+                    metric_type,
+                    metric_value,
+                    json.dumps(context) if context else None
+                ))
+
         except Exception as e:
             logger.error(f"Error storing performance metric: {e}")
     
@@ -526,21 +621,18 @@ class MemoryManager:
                               days: int = 30) -> List[Dict[str, Any]]:
         """Get performance metrics"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            cursor.execute('''
-                SELECT metric_value, timestamp, context
-                FROM performance_metrics 
-                WHERE metric_type = ? AND timestamp > ?
-                ORDER BY timestamp DESC
-            ''', (metric_type, cutoff_date.isoformat()))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
+            with self._db.cursor() as cursor:
+                cutoff_date = datetime.now() - timedelta(days=days)
+
+                cursor.execute('''
+                    SELECT metric_value, timestamp, context
+                    FROM performance_metrics 
+                    WHERE metric_type = ? AND timestamp > ?
+                    ORDER BY timestamp DESC
+                ''', (metric_type, cutoff_date.isoformat()))
+
+                rows = cursor.fetchall()
+
             metrics = []
             for row in rows:
                 metrics.append({
@@ -558,32 +650,27 @@ class MemoryManager:
     def cleanup_old_data(self, days: int = 90):
         """Clean up old data to prevent database bloat"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            # Clean up old interactions
-            cursor.execute('''
-                DELETE FROM user_interactions 
-                WHERE timestamp < ?
-            ''', (cutoff_date.isoformat(),))
-            
-            # Clean up old market analysis
-            cursor.execute('''
-                DELETE FROM market_analysis 
-                WHERE timestamp < ?
-            ''', (cutoff_date.isoformat(),))
-            
-            # Clean up old performance metrics
-            cursor.execute('''
-                DELETE FROM performance_metrics 
-                WHERE timestamp < ?
-            ''', (cutoff_date.isoformat(),))
-            
-            conn.commit()
-            conn.close()
-            
+            with self._db.transaction() as cursor:
+                cutoff_date = datetime.now() - timedelta(days=days)
+
+                # Clean up old interactions
+                cursor.execute('''
+                    DELETE FROM user_interactions 
+                    WHERE timestamp < ?
+                ''', (cutoff_date.isoformat(),))
+
+                # Clean up old market analysis
+                cursor.execute('''
+                    DELETE FROM market_analysis 
+                    WHERE timestamp < ?
+                ''', (cutoff_date.isoformat(),))
+
+                # Clean up old performance metrics
+                cursor.execute('''
+                    DELETE FROM performance_metrics 
+                    WHERE timestamp < ?
+                ''', (cutoff_date.isoformat(),))
+
             logger.info(f"Cleaned up data older than {days} days")
             
         except Exception as e:
@@ -592,28 +679,25 @@ class MemoryManager:
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get memory usage statistics"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            stats = {}
-            
-            # Count records in each table
-            tables = ['user_interactions', 'investment_recommendations', 
-                     'market_analysis', 'portfolio_tracking', 
-                     'learning_data', 'performance_metrics']
-            
-            for table in tables:
-                cursor.execute(f'SELECT COUNT(*) FROM {table}')
-                stats[f'{table}_count'] = cursor.fetchone()[0]
-            
-            # Get database size
-            cursor.execute('PRAGMA page_count')
-            page_count = cursor.fetchone()[0]
-            cursor.execute('PRAGMA page_size')
-            page_size = cursor.fetchone()[0]
-            stats['database_size_mb'] = (page_count * page_size) / (1024 * 1024)
-            
-            conn.close()
+            with self._db.cursor() as cursor:
+                stats = {}
+
+                # Count records in each table
+                tables = ['user_interactions', 'investment_recommendations', 
+                         'market_analysis', 'portfolio_tracking', 
+                         'learning_data', 'memory_embeddings', 'performance_metrics']
+
+                for table in tables:
+                    cursor.execute(f'SELECT COUNT(*) FROM {table}')
+                    stats[f'{table}_count'] = cursor.fetchone()[0]
+
+                # Get database size
+                cursor.execute('PRAGMA page_count')
+                page_count = cursor.fetchone()[0]
+                cursor.execute('PRAGMA page_size')
+                page_size = cursor.fetchone()[0]
+                stats['database_size_mb'] = (page_count * page_size) / (1024 * 1024)
+
             return stats
             
         except Exception as e:
@@ -0,0 +1,216 @@
+"""
+Structured (JSON) output helpers for LLM responses
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from utils.logger import logger
+
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'number': (int, float),
+    'integer': int,
+    'boolean': bool,
+}
+
+
+class JsonObjectScanner:
+    """Incrementally finds the first complete JSON object in streamed text
+
+    Text before the object is skipped and braces inside strings (including
+    escaped quotes) are not counted. A balanced {...} span that does not
+    parse, such as braces in surrounding prose, is skipped and scanning
+    resumes just after its opening brace.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.value: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def complete(self) -> bool:
+        return self.value is not None
+
+    def feed(self, chunk: str) -> Optional[int]:
+        """Consume chunk; return the offset in it just past the object's closing brace once found"""
+        if self.value is not None:
+            return 0
+        consumed = len(self.buffer)
+        self.buffer += chunk
+        end = self._scan()
+        return end - consumed if end is not None else None
+
+    def _scan(self) -> Optional[int]:
+        buffer = self.buffer
+        pos = self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            pos += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '{':
+                if self._depth == 0:
+                    self._start = pos - 1
+                self._depth += 1
+            elif self._depth == 0:
+                # Prose before the object starts
+                continue
+            elif char == '"':
+                self._in_string = True
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        value = json.loads(buffer[self._start:pos])
+                    except ValueError:
+                        value = None
+                    if isinstance(value, dict):
+                        self.value = value
+                        self._pos = pos
+                        return pos
+                    # Not an object after all; look for one starting later
+                    pos = self._start + 1
+        self._pos = pos
+        return None
+
+
+def _canonical_enum(value: Any, schema: Dict[str, Any]) -> Any:
+    """The enum member a string matches ignoring case and surrounding space, else value unchanged"""
+    if isinstance(value, str) and 'enum' in schema and value not in schema['enum']:
+        folded = value.strip().lower()
+        for member in schema['enum']:
+            if isinstance(member, str) and member.lower() == folded:
+                return member
+    return value
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = '$') -> List[str]:
+    """Errors found checking value against a JSON Schema subset
+
+    Supports type, enum, minimum/maximum, required, properties and items.
+    Enum strings match ignoring case and surrounding whitespace (models
+    answer "Positive" or " BUY"); inside objects and arrays they are
+    rewritten to the enum's own spelling so callers can compare directly.
+    """
+    errors = []
+    value = _canonical_enum(value, schema)
+    expected = schema.get('type')
+    if expected is not None:
+        # bool is an int subclass but not a JSON number
+        if not isinstance(value, _JSON_TYPES[expected]) or (isinstance(value, bool) and expected != 'boolean'):
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+
+    if 'enum' in schema and value not in schema['enum']:
+        errors.append(f"{path}: {value!r} not one of {schema['enum']}")
+    if 'minimum' in schema and value < schema['minimum']:
+        errors.append(f"{path}: {value} below minimum {schema['minimum']}")
+    if 'maximum' in schema and value > schema['maximum']:
+        errors.append(f"{path}: {value} above maximum {schema['maximum']}")
+
+    if isinstance(value, dict):
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}: missing {key!r}")
+        for key, subschema in schema.get('properties', {}).items():
+            if key in value and value[key] is not None:
+                value[key] = _canonical_enum(value[key], subschema)
+                errors.extend(validate(value[key], subschema, f"{path}.{key}"))
+    elif isinstance(value, list) and 'items' in schema:
+        for index, item in enumerate(value):
+            value[index] = _canonical_enum(item, schema['items'])
+            errors.extend(validate(value[index], schema['items'], f"{path}[{index}]"))
+    return errors
+
+
+def extract_json(text: Optional[str], schema: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """First complete JSON object in text, or None if there is none or it fails schema"""
+    if not text:
+        return None
+    scanner = JsonObjectScanner()
+    scanner.feed(text)
+    if scanner.value is None:
+        return None
+    if schema is not None:
+        errors = validate(scanner.value, schema)
+        if errors:
+            logger.debug(f"LLM response failed schema validation: {'; '.join(errors[:3])}")
+            return None
+    return scanner.value
+
+
+SENTIMENT_SCHEMA = {
+    'type': 'object',
+    'required': ['sentiment', 'score'],
+    'properties': {
+        'sentiment': {'type': 'string', 'enum': ['positive', 'negative', 'neutral']},
+        'score': {'type': 'number', 'minimum': -1, 'maximum': 1},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'reasoning': {'type': 'string'},
+    },
+}
+
+SENTIMENT_BATCH_ITEM_SCHEMA = dict(
+    SENTIMENT_SCHEMA,
+    required=['id', 'sentiment', 'score'],
+    properties=dict(SENTIMENT_SCHEMA['properties'], id={'type': 'integer'}),
+)
+
+SENTIMENT_BATCH_SCHEMA = {
+    'type': 'object',
+    'required': ['results'],
+    # Entries are checked one by one so a bad entry does not discard the batch
+    'properties': {'results': {'type': 'array'}},
+}
+
+FUNDAMENTALS_SCHEMA = {
+    'type': 'object',
+    'required': ['investment_rating'],
+    'properties': {
+        'strengths': {'type': 'array'},
+        'weaknesses': {'type': 'array'},
+        'opportunities': {'type': 'array'},
+        'threats': {'type': 'array'},
+        'investment_rating': {'type': 'string', 'enum': ['buy', 'hold', 'sell']},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'reasoning': {'type': 'string'},
+    },
+}
+
+RECOMMENDATION_SCHEMA = {
+    'type': 'object',
+    'required': ['recommendation', 'confidence'],
+    'properties': {
+        'recommendation': {'type': 'string', 'enum': ['buy', 'hold', 'sell']},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'target_price': {'type': 'number'},
+        'stop_loss': {'type': 'number'},
+        'time_horizon': {'type': 'string', 'enum': ['short', 'medium', 'long']},
+        'risk_level': {'type': 'string', 'enum': ['low', 'medium', 'high']},
+        'reasoning': {'type': 'string'},
+        'key_factors': {'type': 'array'},
+    },
+}
+
+ALLOCATION_SCHEMA = {
+    'type': 'object',
+    'required': ['sector_allocation', 'recommended_stocks'],
+    'properties': {
+        'total_allocation': {'type': 'number'},
+        'sector_allocation': {'type': 'object'},
+        'risk_management': {'type': 'object'},
+        'recommended_stocks': {'type': 'array', 'items': {'type': 'object', 'required': ['ticker']}},
+        'overall_strategy': {'type': 'string'},
+    },
+}
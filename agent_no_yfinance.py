@@ -5,20 +5,22 @@ import os
 from datetime import datetime
 import pandas as pd
 import numpy as np
-from transformers import pipeline
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from utils.model_registry import model_registry
+
 class FinRexentAgentNoYFinance:
     def __init__(self):
         """Initialize the FinRexent agent without yfinance dependency"""
-        self.sentiment_analyzer = pipeline(
-            "sentiment-analysis", 
-            model="cardiffnlp/twitter-roberta-base-sentiment-latest"
-        )
         print("Agent initialized successfully!")
     
+    @property
+    def sentiment_analyzer(self):
+        """Shared RoBERTa pipeline, loaded on first use"""
+        return model_registry.get('twitter_sentiment')
+    
     def analyze_news(self, news_list):
         """Analyze news sentiment without using yfinance"""
         analyzed_news = []
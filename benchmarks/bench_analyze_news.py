@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-headline vs batched transformer inference in FinRexentAgent.analyze_news
+
+Also times the default mode, where NER only runs on headlines in which the
+symbol gazetteer finds no listed company.
+
+Usage:
+    python benchmarks/bench_analyze_news.py --headlines 400 --batch-size 32 --threads 16
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.agent import FinRexentAgent
+
+SAMPLE_HEADLINES = [
+    'Reliance Industries reports record profits, stock soars!',
+    'HDFC Bank faces legal issues, shares plummet.',
+    'Market remains stable amidst global uncertainties.',
+    'Bharti Airtel launches new 5G services, stock gains.',
+    'Tata Steel cuts output as demand in Europe weakens',
+    'Infosys signs multi-year cloud deal with European retailer',
+    'Nifty 50 ends flat as FIIs book profits in banking stocks',
+    'SEBI tightens disclosure norms for small cap IPOs',
+]
+
+
+def analyze_one_by_one(agent, news):
+    """Reference implementation: one forward pass per headline per pipeline"""
+    results = []
+    for item in news:
+        text = item['title']
+        sentiment = agent.sentiment_analyzer(text)[0]
+        entities = agent.ner_pipeline(text)
+        results.append({
+            'headline': text,
+            'sentiment': sentiment['label'],
+            'score': sentiment['score'],
+            'companies': list(set(agent._reconstruct_company_names(entities)))
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--headlines', type=int, default=400)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    import torch
+    torch.set_num_threads(args.threads)
+
+    news = [{'title': SAMPLE_HEADLINES[i % len(SAMPLE_HEADLINES)] + f' ({i})'}
+            for i in range(args.headlines)]
+
+    agent = FinRexentAgent(batch_size=args.batch_size)
+    # Warm up both pipelines so model loading is not timed
+    agent.analyze_news(news[:args.batch_size], strict=True)
+
+    start = time.perf_counter()
+    sequential = analyze_one_by_one(agent, news)
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = agent.analyze_news(news, strict=True)
+    batched_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    agent.analyze_news(news)
+    gazetteer_time = time.perf_counter() - start
+
+    labels_match = all(a['sentiment'] == b['sentiment'] and a['companies'] == b['companies']
+                       for a, b in zip(sequential, batched))
+
+    print(f"Headlines:        {len(news)}  (threads={args.threads}, batch_size={args.batch_size})")
+    print(f"Per-headline:     {sequential_time:.2f}s  ({len(news) / sequential_time:.1f} headlines/sec)")
+    print(f"Batched:          {batched_time:.2f}s  ({len(news) / batched_time:.1f} headlines/sec)")
+    print(f"Speedup:          {sequential_time / batched_time:.2f}x")
+    print(f"Gazetteer + NER:  {gazetteer_time:.2f}s  ({len(news) / gazetteer_time:.1f} headlines/sec)")
+    print(f"Identical labels: {labels_match}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-indicator rolling computations vs the shared indicator engine
+
+The "separate" path mirrors how calculate_technical_indicators and
+analyze_trend used to work: each indicator recomputed its own rolling
+windows and EMAs, and analyze_trend recomputed the SMAs.
+
+Usage:
+    python benchmarks/bench_indicators.py --tickers 500 --days 252
+
+The panel timing runs the same indicators for every ticker at once on
+wide (dates x tickers) arrays, as FinancialAnalyzer.analyze_panel does.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.indicators import compute_indicators, compute_panel_indicators, latest_indicators
+
+
+def separate_indicators(data):
+    """Indicators as previously computed, one rolling pass per use"""
+    close = data['Close']
+    indicators = {
+        'sma_20': close.rolling(window=20).mean().iloc[-1],
+        'sma_50': close.rolling(window=50).mean().iloc[-1],
+        'sma_200': close.rolling(window=200).mean().iloc[-1],
+        'ema_12': close.ewm(span=12).mean().iloc[-1],
+        'ema_26': close.ewm(span=26).mean().iloc[-1],
+    }
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    indicators['rsi'] = 100 - (100 / (1 + (gain / loss).iloc[-1]))
+    macd_line = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+    signal_line = macd_line.ewm(span=9).mean()
+    indicators['macd'] = macd_line.iloc[-1]
+    indicators['macd_signal'] = signal_line.iloc[-1]
+    sma_20 = close.rolling(window=20).mean()
+    std_20 = close.rolling(window=20).std()
+    indicators['bb_upper'] = sma_20.iloc[-1] + std_20.iloc[-1] * 2
+    indicators['bb_lower'] = sma_20.iloc[-1] - std_20.iloc[-1] * 2
+    indicators['volume_sma'] = data['Volume'].rolling(window=20).mean().iloc[-1]
+    indicators['support_level'] = data['Low'].rolling(window=20).min().iloc[-1]
+    indicators['resistance_level'] = data['High'].rolling(window=20).max().iloc[-1]
+    # analyze_trend
+    for window in (20, 50, 200):
+        close.rolling(window=window).mean().iloc[-1]
+    return indicators
+
+
+def make_data(days, seed):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    return pd.DataFrame({
+        'Close': close,
+        'High': close * (1 + rng.uniform(0, 0.02, days)),
+        'Low': close * (1 - rng.uniform(0, 0.02, days)),
+        'Volume': rng.integers(100000, 500000, days),
+    }, index=pd.date_range(end='2024-12-31', periods=days))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--days', type=int, default=252)
+    args = parser.parse_args()
+
+    datasets = [make_data(args.days, seed) for seed in range(args.tickers)]
+
+    start = time.perf_counter()
+    for data in datasets:
+        separate_indicators(data)
+    separate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in datasets:
+        latest_indicators(compute_indicators(data))
+    engine_time = time.perf_counter() - start
+
+    panel = {field: pd.DataFrame({seed: data[field] for seed, data in enumerate(datasets)})
+             for field in ('Close', 'High', 'Low', 'Volume')}
+    start = time.perf_counter()
+    compute_panel_indicators(panel['Close'], panel['High'], panel['Low'], panel['Volume'])
+    panel_time = time.perf_counter() - start
+
+    print(f"Tickers:   {args.tickers} x {args.days} days")
+    print(f"Separate:  {separate_time:.3f}s  ({separate_time / args.tickers * 1000:.2f} ms/ticker)")
+    print(f"Engine:    {engine_time:.3f}s  ({engine_time / args.tickers * 1000:.2f} ms/ticker, full series)")
+    print(f"Panel:     {panel_time:.3f}s  (all tickers at once)")
+    print(f"Speedup:   engine {separate_time / engine_time:.2f}x, panel {separate_time / panel_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
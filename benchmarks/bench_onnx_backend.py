@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PyTorch vs ONNX Runtime (fp32 and int8) pipelines in FinRexentAgent.analyze_news
+
+Reports throughput per backend and how many sentiment labels and NER company
+lists match the PyTorch reference. Needs torch and optimum[onnxruntime].
+
+Usage:
+    python benchmarks/bench_onnx_backend.py --headlines 400 --batch-size 32 --threads 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.agent import FinRexentAgent
+from utils.config import config
+from utils.model_registry import transformers_pipeline_loader
+from utils.onnx_backend import onnx_pipeline_loader
+
+from bench_analyze_news import SAMPLE_HEADLINES
+
+
+def build_agent(batch_size, backend, threads):
+    """Agent whose pipelines come straight from one backend (bypassing the shared registry)"""
+    specs = config.get_models_config()['pipelines']
+    agent = FinRexentAgent(batch_size=batch_size)
+    for attribute, name in (('sentiment_analyzer', 'sentiment'), ('ner_pipeline', 'ner')):
+        spec = specs[name]
+        if backend == 'torch':
+            pipeline = transformers_pipeline_loader(spec['task'], spec['model'])
+        else:
+            pipeline = onnx_pipeline_loader(spec['task'], spec['model'], onnx_options={
+                'quantize': backend == 'onnx-int8', 'intra_op_threads': threads
+            })
+        setattr(agent, attribute, pipeline)
+    return agent
+
+
+def run(agent, news, batch_size):
+    agent.analyze_news(news[:batch_size], strict=True)  # warm-up
+    start = time.perf_counter()
+    results = agent.analyze_news(news, strict=True)
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--headlines', type=int, default=400)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    import torch
+    torch.set_num_threads(args.threads)
+
+    news = [{'title': SAMPLE_HEADLINES[i % len(SAMPLE_HEADLINES)] + f' ({i})'}
+            for i in range(args.headlines)]
+
+    reference, reference_time = run(build_agent(args.batch_size, 'torch', args.threads), news, args.batch_size)
+    print(f"Headlines: {len(news)}  (threads={args.threads}, batch_size={args.batch_size})")
+    print(f"{'backend':<10} {'seconds':>8} {'headlines/s':>12} {'speedup':>8} {'sentiment':>10} {'companies':>10}")
+    print(f"{'torch':<10} {reference_time:>8.2f} {len(news) / reference_time:>12.1f} {1:>7.2f}x "
+          f"{'-':>10} {'-':>10}")
+
+    for backend in ('onnx-fp32', 'onnx-int8'):
+        results, elapsed = run(build_agent(args.batch_size, backend, args.threads), news, args.batch_size)
+        sentiment_match = sum(a['sentiment'] == b['sentiment'] for a, b in zip(reference, results))
+        company_match = sum(sorted(a['companies']) == sorted(b['companies']) for a, b in zip(reference, results))
+        print(f"{backend:<10} {elapsed:>8.2f} {len(news) / elapsed:>12.1f} {reference_time / elapsed:>7.2f}x "
+              f"{sentiment_match / len(news):>10.1%} {company_match / len(news):>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Asynchronous fetch engine for the FinRexent crawler
+"""
+import asyncio
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from utils.logger import logger
+
+
+class Page(NamedTuple):
+    """A fetched page with its cache validators; body is None for 304 Not Modified"""
+    status: int
+    body: Optional[bytes]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def conditional_headers(etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since headers for a conditional GET"""
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+class AsyncCrawlEngine:
+    """Concurrent HTTP fetcher with a global limit and per-host concurrency/politeness limits
+
+    Requests to different hosts run in parallel; requests to the same host are
+    capped at ``per_host_concurrency`` in flight and spaced at least
+    ``per_host_delay`` seconds apart. A request only takes one of the
+    ``max_concurrency`` global slots once its host lets it start, so a busy
+    host cannot starve the others.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 32,
+                 per_host_concurrency: int = 2,
+                 per_host_delay: float = 1.0,
+                 timeout: float = 30,
+                 user_agent: str = 'FinRexent/1.0',
+                 max_retries: int = 1):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.max_retries = max_retries
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_next_slot: Dict[str, float] = {}
+
+    async def __aenter__(self) -> 'AsyncCrawlEngine':
+        self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                         limit_per_host=self.per_host_concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': self.user_agent}
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _wait_for_host_slot(self, host: str):
+        """Enforce the minimum spacing between request starts on one host"""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            next_slot = self._host_next_slot.get(host, now)
+            if next_slot > now:
+                await asyncio.sleep(next_slot - now)
+            self._host_next_slot[host] = max(now, next_slot) + self.per_host_delay
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """Fetch a URL body, returning None on any failure"""
+        page = await self.fetch_page(url)
+        return page.body if page is not None else None
+
+    async def fetch_page(self, url: str, etag: Optional[str] = None,
+                         last_modified: Optional[str] = None) -> Optional[Page]:
+        """Fetch a URL, conditionally if validators are given; None on any failure
+
+        A 304 response yields a Page without a body that keeps the given
+        validators unless the server sent new ones.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncCrawlEngine must be used as an async context manager")
+
+        host = urlsplit(url).netloc
+        host_semaphore = self._host_semaphores.setdefault(
+            host, asyncio.Semaphore(self.per_host_concurrency)
+        )
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with host_semaphore:
+                    await self._wait_for_host_slot(host)
+                    async with self._global_semaphore, \
+                            self._session.get(url, headers=conditional_headers(etag, last_modified)) as response:
+                        if response.status == 304:
+                            return Page(304, None, response.headers.get('ETag', etag),
+                                        response.headers.get('Last-Modified', last_modified))
+                        response.raise_for_status()
+                        return Page(response.status, await response.read(),
+                                    response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            except aiohttp.ClientResponseError as e:
+                # Client errors will not change on retry
+                if e.status < 500:
+                    logger.warning(f"Error fetching {url}: {e.status} {e.message}")
+                    return None
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+
+            if attempt < self.max_retries:
+                logger.debug(f"Retrying {url} after error: {error!r}")
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+        logger.warning(f"Error fetching {url}: {error!r}")
+        return None
+
+    async def fetch_all(self, urls: List[str]) -> List[Optional[bytes]]:
+        """Fetch many URLs concurrently; results are returned in input order"""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def fetch_pages(self, urls: List[str],
+                          validators: Optional[Dict[str, Tuple[Optional[str], Optional[str]]]] = None
+                          ) -> List[Optional[Page]]:
+        """Fetch many URLs concurrently, conditional on their (etag, last_modified) validators"""
+        validators = validators or {}
+        return await asyncio.gather(*(self.fetch_page(url, *validators.get(url, (None, None))) for url in urls))
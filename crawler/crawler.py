@@ -1,23 +1,31 @@
 """
 Enhanced Stock News Crawler for FinRexent
 """
+import asyncio
 import requests
 import json
+import re
 import time
 import sqlite3
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from bs4 import BeautifulSoup
 import feedparser
 from pathlib import Path
 
+from .async_engine import AsyncCrawlEngine, Page, conditional_headers
+from .dedup import assign_cluster
 from .firecrawl_client import FirecrawlClient, NewsScraper
-from .sources import (
-    INDIAN_NEWS_SOURCES, RSS_FEEDS, CRAWLING_CONFIG,
-    FINANCIAL_KEYWORDS, INDIAN_MARKET_KEYWORDS
-)
+from .keyword_matcher import keyword_matcher
+from .migrations import apply_migrations
+from .sources import INDIAN_NEWS_SOURCES, RSS_FEEDS, CRAWLING_CONFIG
 from utils.logger import logger
 from utils.config import config
+from utils.db import SQLiteConnectionManager
+
+TICKER_PATTERN = re.compile(r'\b[A-Z]{2,5}\.NS\b')
 
 class StockNewsCrawler:
     """Enhanced stock news crawler with multiple sources and advanced features"""
@@ -39,8 +47,16 @@ class StockNewsCrawler:
         # Setup database for storing crawled data
         self.db_path = Path("data/news/crawled_news.db")
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Foreign keys on so deleting an article cascades to its ticker and cluster rows
+        self._db = SQLiteConnectionManager(self.db_path, foreign_keys=True)
         self._init_database()
         
+        # Inside a crawl, crawl-history rows and seen entries are buffered and written with its articles
+        self._batching = False
+        self._pending_history: List[Tuple[str, str, str, int, Optional[str], Optional[str]]] = []
+        self._pending_seen: List[Tuple[str, str, str]] = []
+        self._crawl_counts = Counter()
+        
         # Session for requests
         self.session = requests.Session()
         self.session.headers.update({
@@ -50,72 +66,140 @@ class StockNewsCrawler:
     def _init_database(self):
         """Initialize SQLite database for storing crawled news"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create news table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS news_articles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    content TEXT,
-                    url TEXT UNIQUE,
-                    source TEXT,
-                    published_date TEXT,
-                    crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    sentiment_score REAL,
-                    financial_keywords TEXT,
-                    tickers TEXT,
-                    processed BOOLEAN DEFAULT FALSE
-                )
-            ''')
-            
-            # Create crawling history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS crawl_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    source TEXT,
-                    url TEXT,
-                    status TEXT,
-                    articles_found INTEGER,
-                    crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            with self._db.transaction() as cursor:
+                previous_version, version = apply_migrations(cursor)
             
-            conn.commit()
-            conn.close()
+            if previous_version != version:
+                logger.info(f"Migrated news database schema from v{previous_version} to v{version}")
             logger.info("Database initialized successfully")
             
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
     
-    def crawl_all_sources(self) -> List[Dict[str, Any]]:
+    def crawl_all_sources(self, concurrent: Optional[bool] = None) -> List[Dict[str, Any]]:
         """Crawl all configured news sources with focus on RSS feeds"""
+        if concurrent is None:
+            concurrent = self.crawl_config.get('concurrent', False)
+        
+        if concurrent:
+            return asyncio.run(self.crawl_all_sources_async())
+        
         all_news = []
+        self._crawl_counts.clear()
         
         logger.info("Starting comprehensive news crawl")
         
-        # Prioritize RSS feeds as they're more reliable
-        logger.info("Crawling RSS feeds first...")
-        rss_news = self._crawl_rss_feeds()
-        all_news.extend(rss_news)
-        logger.info(f"RSS feeds yielded {len(rss_news)} articles")
+        with self._crawl_batch():
+            # Prioritize RSS feeds as they're more reliable
+            logger.info("Crawling RSS feeds first...")
+            rss_news = self._crawl_rss_feeds()
+            all_news.extend(rss_news)
+            logger.info(f"RSS feeds yielded {len(rss_news)} articles")
+            
+            # Try traditional news sources (with error handling)
+            logger.info("Attempting to crawl traditional news sources...")
+            for source_name, source_config in self.sources.items():
+                try:
+                    logger.info(f"Crawling {source_config['name']}")
+                    news_from_source = self._crawl_source(source_name, source_config)
+                    all_news.extend(news_from_source)
+                    
+                    # Rate limiting
+                    time.sleep(self.crawl_config['request_delay'])
+                    
+                except Exception as e:
+                    logger.warning(f"Skipping {source_name} due to error: {e}")
+                    continue
+            
+            return self._finalize_crawl(all_news)
+    
+    @contextmanager
+    def _crawl_batch(self):
+        """Buffer crawl history and seen entries so they are stored with the crawl's articles
+        
+        History that was not stored with them (the crawl or the store failed)
+        is written on exit. Seen entries are dropped in that case, so the
+        unstored articles are fetched again next time.
+        """
+        self._batching = True
+        self._pending_history, self._pending_seen = [], []
+        try:
+            yield
+        finally:
+            self._batching = False
+            pending_history, self._pending_history = self._pending_history, []
+            self._pending_seen = []
+            if pending_history:
+                self._write_crawl_history(pending_history)
+    
+    async def crawl_all_sources_async(self) -> List[Dict[str, Any]]:
+        """Crawl all sources concurrently; returns the same list as the sequential crawl"""
+        logger.info("Starting concurrent news crawl")
+        start_time = time.time()
+        self._crawl_counts.clear()
         
-        # Try traditional news sources (with error handling)
-        logger.info("Attempting to crawl traditional news sources...")
-        for source_name, source_config in self.sources.items():
-            try:
-                logger.info(f"Crawling {source_config['name']}")
-                news_from_source = self._crawl_source(source_name, source_config)
-                all_news.extend(news_from_source)
+        engine = AsyncCrawlEngine(
+            max_concurrency=self.crawl_config.get('max_concurrency', 32),
+            per_host_concurrency=self.crawl_config.get('per_host_concurrency', 4),
+            per_host_delay=self.crawl_config.get('per_host_delay', self.crawl_config['request_delay']),
+            timeout=self.crawl_config['timeout'],
+            user_agent=self.crawl_config['user_agent'],
+            max_retries=self.crawl_config.get('max_retries', 1)
+        )
+        
+        with self._crawl_batch():
+            async with engine:
+                # Feeds and listing pages of every source are fetched in one wave
+                feed_items = list(self.rss_feeds.items())
+                listing_jobs = [(source_name, source_config, url)
+                                for source_name, source_config in self.sources.items()
+                                for url in source_config['news_urls']]
                 
-                # Rate limiting
-                time.sleep(self.crawl_config['request_delay'])
+                page_urls = [feed_url for _, feed_url in feed_items] + [url for _, _, url in listing_jobs]
+                pages = await engine.fetch_pages(page_urls, self._load_validators(page_urls))
+                feed_pages, listing_pages = pages[:len(feed_items)], pages[len(feed_items):]
                 
-            except Exception as e:
-                logger.warning(f"Skipping {source_name} due to error: {e}")
-                continue
-        
+                all_news = []
+                for (feed_name, feed_url), page in zip(feed_items, feed_pages):
+                    if page is None:
+                        logger.error(f"Error crawling RSS feed {feed_name}: fetch failed")
+                        self._log_crawl_history(f"RSS_{feed_name}", feed_url, 'error', 0)
+                        continue
+                    all_news.extend(self._process_feed_page(feed_name, feed_url, page))
+                logger.info(f"RSS feeds yielded {len(all_news)} articles")
+                
+                # Parse listings, then fetch every new article page in a second wave
+                source_articles = []
+                for (source_name, source_config, url), page in zip(listing_jobs, listing_pages):
+                    if page is None:
+                        self._log_crawl_history(source_name, url, 'error', 0)
+                        continue
+                    if page.body is None:
+                        self._log_not_modified(source_name, url, page)
+                        continue
+                    articles, headline_count = self._parse_listing(page.body, source_config)
+                    source_articles.extend((article, source_config) for article in self._new_articles(articles))
+                    self._log_crawl_history(source_name, url, 'success', headline_count,
+                                            page.etag, page.last_modified)
+                
+                article_urls = list(dict.fromkeys(
+                    article['url'] for article, _ in source_articles
+                    if article.get('url') and isinstance(article['url'], str)
+                ))
+                article_pages = dict(zip(article_urls, await engine.fetch_all(article_urls)))
+                
+                for article, source_config in source_articles:
+                    body = article_pages.get(article.get('url'))
+                    if body is not None:
+                        article.update(self._parse_article_content(body, source_config))
+                        self._mark_seen(article['url'], article['source'], '')
+                    all_news.append(article)
+            
+            logger.info(f"Concurrent fetch finished in {time.time() - start_time:.2f}s")
+            return self._finalize_crawl(all_news)
+    
+    def _finalize_crawl(self, all_news: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run Firecrawl (if enabled), filter and store a crawl's raw articles"""
         # Use Firecrawl for advanced scraping if available
         if self.use_firecrawl and self.news_scraper:
             try:
@@ -127,53 +211,82 @@ class StockNewsCrawler:
         # Filter and process news
         filtered_news = self._filter_financial_news(all_news)
         
-        # Store in database
-        if filtered_news:
-            self._store_news(filtered_news)
+        # Store articles and this crawl's history in one transaction
+        self._store_news(filtered_news)
         
-        logger.info(f"Crawl completed. Found {len(filtered_news)} relevant articles")
-        return filtered_news
+        if self._crawl_counts:
+            logger.info(f"Incremental crawl: {self._crawl_counts['not_modified']} pages not modified, "
+                        f"{self._crawl_counts['known']} known entries skipped")
+        
+        # One article per story goes on to analysis
+        stories = self._collapse_near_duplicates(filtered_news)
+        
+        logger.info(f"Crawl completed. Found {len(filtered_news)} relevant articles in {len(stories)} stories")
+        return stories
+    
+    def _collapse_near_duplicates(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the representative article of each story cluster, listing the others under 'duplicates'
+        
+        A cluster's representative is its first stored article; copies are
+        listed under it wherever it appears in the batch. Articles whose
+        story is represented only by an earlier crawl are dropped.
+        Clusters are assigned by store_news_batch; unstored articles are kept.
+        """
+        # Representatives are found first, so a copy listed ahead of its story still joins it
+        stories = []
+        representatives = {}
+        for article in articles:
+            cluster_id = article.get('cluster_id')
+            if cluster_id is None or cluster_id == article.get('id'):
+                article['duplicates'] = []
+                representatives[cluster_id] = article
+                stories.append(article)
+        
+        dropped = 0
+        for article in articles:
+            cluster_id = article.get('cluster_id')
+            if cluster_id is None or cluster_id == article.get('id'):
+                continue
+            if cluster_id in representatives:
+                representatives[cluster_id]['duplicates'].append(
+                    {'title': article.get('title'), 'url': article.get('url'), 'source': article.get('source')}
+                )
+            else:
+                dropped += 1
+        
+        if len(stories) < len(articles):
+            logger.info(f"Collapsed {len(articles) - len(stories)} near-duplicate articles "
+                        f"({dropped} repeating earlier stories)")
+        return stories
     
     def _crawl_source(self, source_name: str, source_config: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Crawl a specific news source"""
         news_articles = []
+        validators = self._load_validators(source_config['news_urls'])
         
         for url in source_config['news_urls']:
             try:
-                response = self.session.get(url, timeout=self.crawl_config['timeout'])
-                response.raise_for_status()
+                page = self._get_page(url, validators.get(url, (None, None)))
+                if page.body is None:
+                    self._log_not_modified(source_name, url, page)
+                    continue
                 
-                soup = BeautifulSoup(response.content, 'html.parser')
+                articles, headline_count = self._parse_listing(page.body, source_config)
                 
-                # Extract headlines using configured selectors
-                headlines = soup.select(source_config['selectors']['headlines'])
-                
-                for headline in headlines[:self.crawl_config['max_articles_per_source']]:
-                    try:
-                        article_url = headline.get('href')
-                        if article_url and isinstance(article_url, str) and not article_url.startswith('http'):
-                            article_url = source_config['base_url'] + article_url
-                        
-                        article_data = {
-                            'title': headline.get('title', headline.get_text().strip()),
-                            'url': article_url,
-                            'source': source_config['name'],
-                            'crawled_at': datetime.now().isoformat()
-                        }
-                        
-                        # Try to extract additional content
-                        if article_url and isinstance(article_url, str):
-                            article_content = self._extract_article_content(article_url, source_config)
-                            article_data.update(article_content)
-                        
-                        news_articles.append(article_data)
-                        
-                    except Exception as e:
-                        logger.warning(f"Error processing headline: {e}")
-                        continue
+                for article_data in self._new_articles(articles):
+                    # Try to extract additional content
+                    article_url = article_data['url']
+                    if article_url and isinstance(article_url, str):
+                        article_content = self._extract_article_content(article_url, source_config)
+                        article_data.update(article_content)
+                        if article_content:
+                            self._mark_seen(article_url, article_data['source'], '')
+                    
+                    news_articles.append(article_data)
                 
                 # Log crawl history
-                self._log_crawl_history(source_name, url, 'success', len(headlines))
+                self._log_crawl_history(source_name, url, 'success', headline_count,
+                                        page.etag, page.last_modified)
                 
             except Exception as e:
                 logger.error(f"Error crawling {url}: {e}")
@@ -181,13 +294,113 @@ class StockNewsCrawler:
         
         return news_articles
     
+    def _get_page(self, url: str, validators: Tuple[Optional[str], Optional[str]] = (None, None)) -> Page:
+        """GET url, conditional on its stored (etag, last_modified) validators; raises on HTTP errors"""
+        etag, last_modified = validators
+        response = self.session.get(url, timeout=self.crawl_config['timeout'],
+                                    headers=conditional_headers(etag, last_modified))
+        if response.status_code == 304:
+            return Page(304, None, response.headers.get('ETag', etag),
+                        response.headers.get('Last-Modified', last_modified))
+        response.raise_for_status()
+        return Page(response.status_code, response.content,
+                    response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    
+    def _load_validators(self, urls: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Latest (etag, last_modified) recorded in crawl history for each URL"""
+        if not self.crawl_config.get('incremental', True) or not urls:
+            return {}
+        try:
+            with self._db.cursor() as cursor:
+                placeholders = ', '.join('?' * len(urls))
+                cursor.execute(f'''
+                    SELECT url, etag, last_modified FROM crawl_history
+                    WHERE url IN ({placeholders}) AND status IN ('success', 'not_modified')
+                      AND (etag IS NOT NULL OR last_modified IS NOT NULL)
+                    ORDER BY id
+                ''', urls)
+                return {url: (etag, last_modified) for url, etag, last_modified in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Error loading crawl validators: {e}")
+            return {}
+    
+    def _seen_stamps(self, keys: List[str], chunk_size: int = 500) -> Dict[str, Optional[str]]:
+        """Map already-seen feed guids and article URLs to their recorded update stamp
+        
+        Stored article URLs never recorded as seen map to None (stamp unknown).
+        Empty when incremental crawling is off.
+        """
+        if not self.crawl_config.get('incremental', True) or not keys:
+            return {}
+        try:
+            stamps = {}
+            with self._db.cursor() as cursor:
+                for i in range(0, len(keys), chunk_size):
+                    chunk = keys[i:i + chunk_size]
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f'SELECT key, updated FROM seen_entries WHERE key IN ({placeholders})', chunk)
+                    stamps.update(cursor.fetchall())
+                stored = self._article_ids(cursor, [key for key in keys if key not in stamps])
+            return {**dict.fromkeys(stored), **stamps}
+        except Exception as e:
+            logger.error(f"Error loading seen entries: {e}")
+            return {}
+    
+    def _new_articles(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Listing stubs whose URLs have not been fetched before"""
+        known = self._seen_stamps([article['url'] for article in articles
+                                   if article.get('url') and isinstance(article['url'], str)])
+        new_articles = [article for article in articles if article.get('url') not in known]
+        self._crawl_counts['known'] += len(articles) - len(new_articles)
+        return new_articles
+    
+    def _log_not_modified(self, source: str, url: str, page: Page):
+        self._crawl_counts['not_modified'] += 1
+        self._log_crawl_history(source, url, 'not_modified', 0, page.etag, page.last_modified)
+    
+    def _parse_listing(self, html: bytes, source_config: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+        """Parse a listing page into article stubs; also returns the raw headline count"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Extract headlines using configured selectors
+        headlines = soup.select(source_config['selectors']['headlines'])
+        
+        articles = []
+        for headline in headlines[:self.crawl_config['max_articles_per_source']]:
+            try:
+                article_url = headline.get('href')
+                if article_url and isinstance(article_url, str) and not article_url.startswith('http'):
+                    article_url = source_config['base_url'] + article_url
+                
+                articles.append({
+                    'title': headline.get('title', headline.get_text().strip()),
+                    'url': article_url,
+                    'source': source_config['name'],
+                    'crawled_at': datetime.now().isoformat()
+                })
+                
+            except Exception as e:
+                logger.warning(f"Error processing headline: {e}")
+                continue
+        
+        return articles, len(headlines)
+    
     def _extract_article_content(self, url: str, source_config: Dict[str, Any]) -> Dict[str, Any]:
         """Extract article content from a specific URL"""
         try:
             response = self.session.get(url, timeout=self.crawl_config['timeout'])
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            return self._parse_article_content(response.content, source_config)
+            
+        except Exception as e:
+            logger.warning(f"Error extracting content from {url}: {e}")
+            return {}
+    
+    def _parse_article_content(self, html: bytes, source_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract content, date and author from an article page"""
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
             
             content = ""
             content_selectors = source_config['selectors'].get('content', '.content, .article-content, .post-content')
@@ -223,33 +436,65 @@ class StockNewsCrawler:
             }
             
         except Exception as e:
-            logger.warning(f"Error extracting content from {url}: {e}")
+            logger.warning(f"Error parsing article content: {e}")
             return {}
     
     def _crawl_rss_feeds(self) -> List[Dict[str, Any]]:
         """Crawl RSS feeds for news"""
         rss_news = []
         
+        validators = self._load_validators(list(self.rss_feeds.values()))
+        
         for feed_name, feed_url in self.rss_feeds.items():
             try:
                 logger.info(f"Crawling RSS feed: {feed_name}")
                 
-                feed = feedparser.parse(feed_url)
-                
-                for entry in feed.entries[:self.crawl_config['max_articles_per_source']]:
-                    article_data = {
-                        'title': entry.get('title', ''),
-                        'content': entry.get('summary', ''),
-                        'url': entry.get('link', ''),
-                        'source': f"RSS_{feed_name}",
-                        'published_date': entry.get('published', ''),
-                        'crawled_at': datetime.now().isoformat()
-                    }
-                    
-                    rss_news.append(article_data)
+                page = self._get_page(feed_url, validators.get(feed_url, (None, None)))
+                rss_news.extend(self._process_feed_page(feed_name, feed_url, page))
                 
             except Exception as e:
                 logger.error(f"Error crawling RSS feed {feed_name}: {e}")
+                self._log_crawl_history(f"RSS_{feed_name}", feed_url, 'error', 0)
+        
+        return rss_news
+    
+    def _process_feed_page(self, feed_name: str, feed_url: str, page: Page) -> List[Dict[str, Any]]:
+        """Parse a fetched feed and log it to crawl history; an unmodified feed yields nothing"""
+        if page.body is None:
+            self._log_not_modified(f"RSS_{feed_name}", feed_url, page)
+            return []
+        articles = self._parse_rss_feed(feed_name, feedparser.parse(page.body))
+        self._log_crawl_history(f"RSS_{feed_name}", feed_url, 'success', len(articles),
+                                page.etag, page.last_modified)
+        return articles
+    
+    def _parse_rss_feed(self, feed_name: str, feed: Any) -> List[Dict[str, Any]]:
+        """Convert parsed feed entries into article dicts, skipping entries seen unchanged before"""
+        rss_news = []
+        source = f"RSS_{feed_name}"
+        
+        entries = feed.entries[:self.crawl_config['max_articles_per_source']]
+        keys = [entry.get('id') or entry.get('link', '') for entry in entries]
+        known = self._seen_stamps([key for key in keys if key])
+        
+        for entry, key in zip(entries, keys):
+            stamp = entry.get('updated', entry.get('published', ''))
+            if key:
+                if key in known and known[key] in (None, stamp):
+                    self._crawl_counts['known'] += 1
+                    continue
+                self._mark_seen(key, source, stamp)
+            
+            article_data = {
+                'title': entry.get('title', ''),
+                'content': entry.get('summary', ''),
+                'url': entry.get('link', ''),
+                'source': source,
+                'published_date': entry.get('published', ''),
+                'crawled_at': datetime.now().isoformat()
+            }
+            
+            rss_news.append(article_data)
         
         return rss_news
     
@@ -278,25 +523,19 @@ class StockNewsCrawler:
         filtered_news = []
         
         for article in news_articles:
-            title = article.get('title', '').lower()
-            content = article.get('content', '').lower()
-            
-            # Check for financial keywords
-            has_financial_keywords = any(keyword in title or keyword in content 
-                                       for keyword in FINANCIAL_KEYWORDS)
-            
-            # Check for Indian market keywords
-            has_indian_keywords = any(keyword.lower() in title or keyword.lower() in content 
-                                    for keyword in INDIAN_MARKET_KEYWORDS)
-            
-            if has_financial_keywords or has_indian_keywords:
-                # Extract tickers from content
-                import re
-                ticker_pattern = r'\b[A-Z]{2,5}\.NS\b'
-                tickers = re.findall(ticker_pattern, content.upper())
+            title = article.get('title', '')
+            content = article.get('content', '')
+            
+            # One pass over the text finds financial, market and sector keywords
+            hits = keyword_matcher.scan(f"{title}\n{content}")
+            
+            if hits['financial'] or hits['market']:
+                # Extract tickers from content; most articles have none, so skip the regex scan
+                upper_content = content.upper()
+                tickers = TICKER_PATTERN.findall(upper_content) if '.NS' in upper_content else []
                 
-                article['financial_keywords'] = [kw for kw in FINANCIAL_KEYWORDS 
-                                               if kw in title or kw in content]
+                article['financial_keywords'] = hits['financial']
+                article['sectors'] = list(hits['sectors'])
                 article['tickers'] = list(set(tickers))
                 article['relevance_score'] = len(article['financial_keywords']) + len(article['tickers'])
                 
@@ -308,72 +547,256 @@ class StockNewsCrawler:
         return filtered_news
     
     def _store_news(self, news_articles: List[Dict[str, Any]]):
-        """Store news articles in database"""
+        """Store news articles in database, together with any buffered crawl history"""
+        pending_history, self._pending_history = self._pending_history, []
+        pending_seen, self._pending_seen = self._pending_seen, []
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for article in news_articles:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO news_articles 
-                    (title, content, url, source, published_date, crawled_at, 
-                     financial_keywords, tickers, processed)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    article.get('title', ''),
-                    article.get('content', ''),
-                    article.get('url', ''),
-                    article.get('source', ''),
-                    article.get('published_date', ''),
-                    article.get('crawled_at', ''),
-                    json.dumps(article.get('financial_keywords', [])),
-                    json.dumps(article.get('tickers', [])),
-                    False
-                ))
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"Stored {len(news_articles)} articles in database")
-            
+            stats = self._store_batch(news_articles, pending_history, pending_seen)
         except Exception as e:
             logger.error(f"Error storing news in database: {e}")
+            # Left for _crawl_batch to write on its own
+            self._pending_history = pending_history + self._pending_history
+            return
+        if stats['inserted'] or stats['replaced']:
+            logger.info(f"Stored {stats['inserted'] + stats['replaced']} articles in database "
+                        f"({stats['inserted']} new, {stats['replaced']} replaced, {stats['skipped']} skipped)")
     
-    def _log_crawl_history(self, source: str, url: str, status: str, articles_found: int):
-        """Log crawling history"""
+    def store_news_batch(self,
+                         news_articles: List[Dict[str, Any]],
+                         crawl_history: Optional[List[Tuple]] = None,
+                         seen_entries: Optional[List[Tuple[str, str, str]]] = None) -> Dict[str, int]:
+        """Bulk-write articles, crawl-history rows and seen entries in a single transaction
+        
+        Crawl-history rows are (source, url, status, articles_found), optionally
+        followed by the page's etag and last_modified. Seen entries are
+        (key, source, updated) tuples.
+        
+        Articles are upserted on URL. Rows without a title or URL, and earlier
+        copies of a URL repeated within the batch, are skipped. Each stored
+        article is given its row 'id' and near-duplicate story 'cluster_id'.
+        Returns counts of inserted, replaced and skipped articles.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            return self._store_batch(news_articles, crawl_history, seen_entries)
+        except Exception as e:
+            logger.error(f"Error storing news in database: {e}")
+            return {'inserted': 0, 'replaced': 0, 'skipped': len(news_articles)}
+    
+    def _store_batch(self,
+                     news_articles: List[Dict[str, Any]],
+                     crawl_history: Optional[List[Tuple]] = None,
+                     seen_entries: Optional[List[Tuple[str, str, str]]] = None) -> Dict[str, int]:
+        """store_news_batch without error handling; raises if the transaction fails"""
+        stats = {'inserted': 0, 'replaced': 0, 'skipped': 0}
+        
+        # Last occurrence of a URL within the batch wins
+        rows_by_url: Dict[str, tuple] = {}
+        tickers_by_url: Dict[str, set] = {}
+        for article in news_articles:
+            url = article.get('url')
+            if not url or not isinstance(url, str) or not article.get('title'):
+                stats['skipped'] += 1
+                continue
+            if url in rows_by_url:
+                stats['skipped'] += 1
+            rows_by_url[url] = (
+                article.get('title', ''),
+                article.get('content', ''),
+                url,
+                article.get('source', ''),
+                article.get('published_date', ''),
+                article.get('crawled_at', ''),
+                json.dumps(article.get('financial_keywords', [])),
+                json.dumps(article.get('tickers', [])),
+                article.get('relevance_score', 0),
+                False
+            )
+            tickers_by_url[url] = {ticker.strip().upper() for ticker in article.get('tickers', []) if ticker}
+        
+        with self._db.transaction() as cursor:
+            existing = self._article_ids(cursor, list(rows_by_url))
+            stats['replaced'] = len(existing)
+            stats['inserted'] = len(rows_by_url) - len(existing)
+            
+            # Upsert keeps the row id stable for existing URLs
+            cursor.executemany('''
+                INSERT INTO news_articles 
+                (title, content, url, source, published_date, crawled_at, 
+                 financial_keywords, tickers, relevance_score, processed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    content = excluded.content,
+                    source = excluded.source,
+                    published_date = excluded.published_date,
+                    crawled_at = excluded.crawled_at,
+                    sentiment_score = NULL,
+                    financial_keywords = excluded.financial_keywords,
+                    tickers = excluded.tickers,
+                    relevance_score = excluded.relevance_score,
+                    processed = excluded.processed
+            ''', rows_by_url.values())
+            
+            # Keep the normalized ticker index in step with the JSON column
+            cursor.executemany('DELETE FROM article_tickers WHERE article_id = ?',
+                               ((article_id,) for article_id in existing.values()))
+            article_ids = self._article_ids(cursor, list(rows_by_url))
+            cursor.executemany('INSERT OR IGNORE INTO article_tickers (article_id, ticker) VALUES (?, ?)',
+                               ((article_ids[url], ticker)
+                                for url, tickers in tickers_by_url.items() if url in article_ids
+                                for ticker in tickers))
+            
+            # Near-duplicate clusters, in batch order so a story's first copy represents it
+            since = (datetime.now() - timedelta(hours=self.crawl_config['dedup_window_hours'])).isoformat()
+            cluster_ids = {url: assign_cluster(cursor, article_ids[url], row[0], row[1],
+                                               self.crawl_config['dedup_max_distance'], since)
+                           for url, row in rows_by_url.items() if url in article_ids}
+            
+            if crawl_history:
+                self._insert_crawl_history(cursor, crawl_history)
+            
+            if seen_entries:
+                cursor.executemany('''
+                    INSERT INTO seen_entries (key, source, updated) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        source = excluded.source,
+                        updated = excluded.updated,
+                        seen_at = CURRENT_TIMESTAMP
+                ''', seen_entries)
+        
+        for article in news_articles:
+            url = article.get('url')
+            if url in cluster_ids:
+                article['id'] = article_ids[url]
+                article['cluster_id'] = cluster_ids[url]
+        return stats
+    
+    @staticmethod
+    def _article_ids(cursor: sqlite3.Cursor, urls: List[str], chunk_size: int = 500) -> Dict[str, int]:
+        """Map each of urls already stored in news_articles to its row id"""
+        article_ids = {}
+        for i in range(0, len(urls), chunk_size):
+            chunk = urls[i:i + chunk_size]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f'SELECT url, id FROM news_articles WHERE url IN ({placeholders})', chunk)
+            article_ids.update(cursor.fetchall())
+        return article_ids
+    
+    @staticmethod
+    def _insert_crawl_history(cursor: sqlite3.Cursor, rows: List[Tuple]):
+        cursor.executemany('''
+            INSERT INTO crawl_history (source, url, status, articles_found, etag, last_modified)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (tuple(row) + (None,) * (6 - len(row)) for row in rows))
+    
+    def _write_crawl_history(self, rows: List[Tuple]):
+        try:
+            with self._db.transaction() as cursor:
+                self._insert_crawl_history(cursor, rows)
+        except Exception as e:
+            logger.error(f"Error logging crawl history: {e}")
+    
+    def _log_crawl_history(self, source: str, url: str, status: str, articles_found: int,
+                           etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Log crawling history (during a crawl, written with its articles)"""
+        row = (source, url, status, articles_found, etag, last_modified)
+        if self._batching:
+            self._pending_history.append(row)
+        else:
+            self._write_crawl_history([row])
+    
+    def _mark_seen(self, key: str, source: str, updated: str):
+        """Record a fetched entry as seen once the crawl's articles are stored"""
+        # Outside a crawl batch nothing stores the articles, so they must not count as seen
+        if self._batching:
+            self._pending_seen.append((key, source, updated))
+    
+    def search_news(self,
+                    query: str,
+                    since: Optional[Union[datetime, str]] = None,
+                    limit: int = 20,
+                    raw: bool = False) -> List[Dict[str, Any]]:
+        """Full-text search over stored article titles and content, ranked by BM25
+        
+        Plain queries match articles containing every term (stemmed). Pass
+        raw=True to use FTS5 query syntax (phrases, OR, NEAR, prefix*).
+        """
+        match_query = query if raw else self._fts_query(query)
+        if not match_query:
+            return []
+        
+        if isinstance(since, datetime):
+            since = since.isoformat()
+        
+        try:
+            with self._db.cursor() as cursor:
+                # bm25() is lower-is-better; title matches weigh more than body matches
+                cursor.execute(f'''
+                    SELECT a.title, a.content, a.url, a.source, a.published_date, 
+                           a.financial_keywords, a.tickers, a.relevance_score,
+                           bm25(news_fts, 5.0, 1.0) AS rank
+                    FROM news_fts 
+                    JOIN news_articles a ON a.id = news_fts.rowid
+                    WHERE news_fts MATCH ? {'AND a.crawled_at > ?' if since else ''}
+                    ORDER BY rank
+                    LIMIT ?
+                ''', (match_query, *([since] if since else []), limit))
+                
+                rows = cursor.fetchall()
             
-            cursor.execute('''
-                INSERT INTO crawl_history (source, url, status, articles_found)
-                VALUES (?, ?, ?, ?)
-            ''', (source, url, status, articles_found))
+            news_articles = []
+            for row in rows:
+                news_articles.append({
+                    'title': row[0],
+                    'content': row[1],
+                    'url': row[2],
+                    'source': row[3],
+                    'published_date': row[4],
+                    'financial_keywords': json.loads(row[5]) if row[5] else [],
+                    'tickers': json.loads(row[6]) if row[6] else [],
+                    'relevance_score': row[7] or 0,
+                    'search_score': -row[8]
+                })
             
-            conn.commit()
-            conn.close()
+            return news_articles
             
         except Exception as e:
-            logger.error(f"Error logging crawl history: {e}")
+            logger.error(f"Error searching news for {query!r}: {e}")
+            return []
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """Quote each term so user input cannot break FTS5 query syntax"""
+        terms = query.split()
+        return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+    
+    @staticmethod
+    def _ticker_variants(ticker: str) -> List[str]:
+        """Exchange-qualified forms of a ticker as stored in article_tickers"""
+        ticker = ticker.strip().upper()
+        if ticker.endswith(('.NS', '.BO')):
+            return [ticker]
+        return [ticker, f'{ticker}.NS', f'{ticker}.BO']
     
     def get_recent_news(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Get recent news from database"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             cutoff_time = datetime.now() - timedelta(hours=hours)
             
-            cursor.execute('''
-                SELECT title, content, url, source, published_date, 
-                       financial_keywords, tickers, relevance_score
-                FROM news_articles 
-                WHERE crawled_at > ? AND processed = FALSE
-                ORDER BY relevance_score DESC
-            ''', (cutoff_time.isoformat(),))
+            with self._db.cursor() as cursor:
+                # One article per near-duplicate story cluster
+                cursor.execute('''
+                    SELECT title, content, url, source, published_date, 
+                           financial_keywords, tickers, relevance_score
+                    FROM news_articles 
+                    LEFT JOIN article_simhash s ON s.article_id = news_articles.id
+                    WHERE crawled_at > ? AND processed = FALSE
+                      AND (s.cluster_id IS NULL OR s.cluster_id = news_articles.id)
+                    ORDER BY relevance_score DESC
+                ''', (cutoff_time.isoformat(),))
             
-            rows = cursor.fetchall()
-            conn.close()
+                rows = cursor.fetchall()
             
             news_articles = []
             for row in rows:
@@ -397,21 +820,22 @@ class StockNewsCrawler:
     def get_news_by_ticker(self, ticker: str, hours: int = 24) -> List[Dict[str, Any]]:
         """Get news articles mentioning a specific ticker"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             cutoff_time = datetime.now() - timedelta(hours=hours)
             
-            cursor.execute('''
-                SELECT title, content, url, source, published_date, 
-                       financial_keywords, tickers, relevance_score
-                FROM news_articles 
-                WHERE crawled_at > ? AND tickers LIKE ?
-                ORDER BY relevance_score DESC
-            ''', (cutoff_time.isoformat(), f'%{ticker}%'))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            with self._db.cursor() as cursor:
+                # Index seek on article_tickers; a bare symbol also matches its .NS/.BO forms
+                symbols = self._ticker_variants(ticker)
+                placeholders = ', '.join('?' * len(symbols))
+                cursor.execute(f'''
+                    SELECT title, content, url, source, published_date, 
+                           financial_keywords, tickers, relevance_score
+                    FROM news_articles 
+                    WHERE id IN (SELECT article_id FROM article_tickers WHERE ticker IN ({placeholders}))
+                      AND crawled_at > ?
+                    ORDER BY relevance_score DESC
+                ''', (*symbols, cutoff_time.isoformat()))
+            
+                rows = cursor.fetchall()
             
             news_articles = []
             for row in rows:
@@ -0,0 +1,120 @@
+"""
+Near-duplicate news detection with SimHash
+
+Each article gets a 64-bit SimHash of its title and content word shingles;
+rewrites of one wire story differ in only a few bits. Signatures are kept
+in the news DB split into eight 8-bit bands, each indexed, so candidates
+within Hamming distance 7 are found by exact band lookups (by the
+pigeonhole principle, they share at least one band). Short articles move
+further than long web pages for the same edit, hence the looser threshold
+than the usual 3 bits; unrelated texts sit around 32 bits apart. Matching articles
+share a story cluster whose id is the id of its first article.
+"""
+import hashlib
+import re
+import sqlite3
+from typing import Optional
+
+import numpy as np
+
+SIMHASH_BITS = 64
+BANDS = 8
+BAND_BITS = SIMHASH_BITS // BANDS
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash of text's word shingles (unsigned)"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0
+    shingles = [' '.join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little')
+         for shingle in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    # Each bit is set if most shingle hashes have it set
+    majority = (2 * bits.sum(axis=0, dtype=np.int64) > len(shingles)).astype(np.uint8)
+    return int(np.packbits(majority, bitorder='little').view('<u8')[0])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count('1')
+
+
+def _bands(signature: int):
+    mask = (1 << BAND_BITS) - 1
+    return tuple((signature >> (BAND_BITS * band)) & mask for band in range(BANDS))
+
+
+def _to_signed(signature: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return signature - (1 << SIMHASH_BITS) if signature >= 1 << (SIMHASH_BITS - 1) else signature
+
+
+def create_simhash_table(cursor: sqlite3.Cursor):
+    """article_simhash table with one index per band"""
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS article_simhash (
+            article_id INTEGER PRIMARY KEY REFERENCES news_articles (id) ON DELETE CASCADE,
+            simhash INTEGER NOT NULL,
+            {', '.join(f'band{band} INTEGER NOT NULL' for band in range(BANDS))},
+            cluster_id INTEGER NOT NULL
+        )
+    ''')
+    for band in range(BANDS):
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_article_simhash_band{band} ON article_simhash (band{band})')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_article_simhash_cluster ON article_simhash (cluster_id)')
+
+
+def assign_cluster(cursor: sqlite3.Cursor,
+                   article_id: int,
+                   title: str,
+                   content: Optional[str],
+                   max_distance: int = 7,
+                   since: Optional[str] = None) -> int:
+    """Record an article's signature and return its story cluster id
+
+    The article joins the cluster of the closest stored article (crawled
+    after since, if given) within max_distance bits, at most BANDS - 1;
+    otherwise it starts its own cluster. Re-storing an unchanged article
+    keeps its cluster.
+    """
+    signature = simhash(f"{title}\n{content or ''}")
+    signed = _to_signed(signature)
+    bands = _bands(signature)
+
+    cursor.execute('SELECT simhash, cluster_id FROM article_simhash WHERE article_id = ?', (article_id,))
+    existing = cursor.fetchone()
+    if existing is not None and existing[0] == signed:
+        return existing[1]
+
+    band_match = ' OR '.join(f's.band{band} = ?' for band in range(BANDS))
+    query = f'''
+        SELECT s.article_id, s.simhash, s.cluster_id
+        FROM article_simhash s JOIN news_articles a ON a.id = s.article_id
+        WHERE ({band_match}) AND s.article_id != ?
+    '''
+    params = [*bands, article_id]
+    if since is not None:
+        query += ' AND a.crawled_at > ?'
+        params.append(since)
+    cursor.execute(query, params)
+
+    cluster_id = article_id
+    best = None
+    for candidate_id, candidate_hash, candidate_cluster in cursor.fetchall():
+        distance = hamming_distance(signature, candidate_hash)
+        if distance <= max_distance and (best is None or (distance, candidate_id) < best):
+            best = (distance, candidate_id)
+            cluster_id = candidate_cluster
+
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO article_simhash
+        (article_id, simhash, {', '.join(f'band{band}' for band in range(BANDS))}, cluster_id)
+        VALUES (?, ?, {', '.join('?' * BANDS)}, ?)
+    ''', (article_id, signed, *bands, cluster_id))
+    return cluster_id
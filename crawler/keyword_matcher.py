@@ -0,0 +1,148 @@
+"""
+Precompiled keyword matcher for financial news filtering
+"""
+import re
+import string
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .sources import FINANCIAL_KEYWORDS, INDIAN_MARKET_KEYWORDS, SECTOR_KEYWORDS
+
+# Punctuation and whitespace become a single kind of word separator; str.translate runs at C speed
+_SEPARATORS = str.maketrans({char: ' ' for char in string.punctuation + string.whitespace +
+                             '\u00a0\u2018\u2019\u201c\u201d\u2013\u2014\u2026\u20b9'})
+
+# (order, category, keyword, exact form for case-sensitive keywords)
+Payload = Tuple[int, str, str, Optional[str]]
+
+
+def _words(text: str) -> List[str]:
+    return text.translate(_SEPARATORS).split()
+
+
+def _plurals(word: str) -> List[str]:
+    """Regular plural of a keyword's last word ("stock" -> "stocks", "equity" -> "equities")"""
+    if word.isupper():
+        return [word + 's']  # IPOs, FIIs
+    if word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        return [word + 'es']
+    if word.endswith('y') and word[-2:-1] not in 'aeiou':
+        return [word[:-1] + 'ies']
+    return [word + 's']
+
+
+def _trie_pattern(forms: Iterable[str]) -> str:
+    """Alternation of forms nested as a character trie, so each position is
+    checked one character at a time instead of once per form"""
+    trie: Dict[str, dict] = {}
+    for form in forms:
+        node = trie
+        for char in form:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def pattern(node: Dict[str, dict]) -> str:
+        # Words of a phrase may be separated by several separators ("market, cap")
+        branches = [(' +' if char == ' ' else re.escape(char)) + pattern(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        group = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f'(?:{group})?' if '' in node else group
+
+    return pattern(trie)
+
+
+class KeywordMatcher:
+    """Finds financial, Indian-market and sector keywords in a single pass over the text
+
+    Punctuation is mapped to spaces with str.translate, and one precompiled
+    regular expression (the keywords and their plural forms, nested as a
+    character trie) is run over the lowercased text, so the scan happens in
+    C without splitting the text into words. Matches always fall on word
+    boundaries ("stock" matches "stocks" but not "livestock"); a phrase
+    also counts as every keyword it contains ("Bank Nifty" -> "bank",
+    "Nifty").
+    Matching is case-insensitive, except that short all-caps acronyms
+    (IT, AI, NSE, IPO, ...) must appear in capitals so that words like
+    "it" or "ai" in running text do not count.
+    """
+
+    ACRONYM_MAX_LENGTH = 4
+
+    def __init__(self,
+                 financial_keywords: Optional[List[str]] = None,
+                 market_keywords: Optional[List[str]] = None,
+                 sector_keywords: Optional[Dict[str, List[str]]] = None):
+        self.financial_keywords = list(financial_keywords if financial_keywords is not None else FINANCIAL_KEYWORDS)
+        self.market_keywords = list(market_keywords if market_keywords is not None else INDIAN_MARKET_KEYWORDS)
+        self.sector_keywords = dict(sector_keywords if sector_keywords is not None else SECTOR_KEYWORDS)
+
+        self._forms: Dict[str, List[Payload]] = {}  # lowercase form -> keywords it matches
+        self._order = 0
+        for keyword in self.financial_keywords:
+            self._add('financial', keyword)
+        for keyword in self.market_keywords:
+            self._add('market', keyword)
+        for sector, keywords in self.sector_keywords.items():
+            for keyword in keywords:
+                self._add(sector, keyword)
+
+        # A phrase's hit also reports the keywords inside it
+        for form in [form for form in self._forms if ' ' in form]:
+            words = form.split()
+            for start in range(len(words)):
+                for end in range(start + 1, len(words) + 1):
+                    inner = ' '.join(words[start:end])
+                    if inner != form and inner in self._forms:
+                        self._forms[form] = self._forms[form] + self._forms[inner]
+
+        # The lookahead yields the longest form at every word start, including overlapping ones
+        self._pattern = re.compile(f' (?=({_trie_pattern(self._forms)}) )')
+
+    def _add(self, category: str, keyword: str):
+        words = _words(keyword)
+        if not words:
+            return
+        case_sensitive = keyword.isupper() and len(keyword) <= self.ACRONYM_MAX_LENGTH
+        variants = [words]
+        if words[-1].isalpha() and (case_sensitive or words[-1].islower()):
+            variants += [words[:-1] + [plural] for plural in _plurals(words[-1])]
+        for variant in variants:
+            form = ' '.join(variant)
+            self._forms.setdefault(form.lower(), []).append(
+                (self._order, category, keyword, form if case_sensitive else None))
+        self._order += 1
+
+    def scan(self, text: str) -> Dict[str, Any]:
+        """Return keyword hits in text
+
+        Result keys: 'financial' and 'market' (lists of keywords, in the
+        order of the source lists) and 'sectors' (sector -> keywords hit).
+        """
+        hits = {}
+        if text:
+            exact_text = None
+            for form in self._pattern.findall(f' {text.lower().translate(_SEPARATORS)} '):
+                payloads = self._forms.get(form) or self._forms[' '.join(form.split())]
+                for payload in payloads:
+                    exact = payload[3]
+                    if exact is not None:
+                        if exact_text is None:
+                            # Every word is padded by separators, so ' IT ' finds the word IT
+                            exact_text = f' {text.translate(_SEPARATORS)} '
+                        if f' {exact} ' not in exact_text:
+                            continue
+                    hits[payload[0]] = payload
+
+        result: Dict[str, Any] = {'financial': [], 'market': [], 'sectors': {}}
+        for order in sorted(hits):
+            _, category, keyword, _ = hits[order]
+            if category in ('financial', 'market'):
+                result[category].append(keyword)
+            else:
+                result['sectors'].setdefault(category, []).append(keyword)
+        return result
+
+
+# Shared matcher built from crawler.sources
+keyword_matcher = KeywordMatcher()
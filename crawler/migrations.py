@@ -0,0 +1,164 @@
+"""
+Versioned schema migrations for the crawled news database
+
+The schema version is stored in SQLite's ``PRAGMA user_version``. Each
+migration runs once, in order, inside the caller's transaction.
+"""
+import json
+import sqlite3
+from typing import Callable, List, Tuple
+
+from .dedup import assign_cluster, create_simhash_table
+
+
+def _v1_base_tables(cursor: sqlite3.Cursor):
+    """News and crawl-history tables"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news_articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT,
+            url TEXT UNIQUE,
+            source TEXT,
+            published_date TEXT,
+            crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sentiment_score REAL,
+            financial_keywords TEXT,
+            tickers TEXT,
+            processed BOOLEAN DEFAULT FALSE
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT,
+            url TEXT,
+            status TEXT,
+            articles_found INTEGER,
+            crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _v2_relevance_and_time_indexes(cursor: sqlite3.Cursor):
+    """relevance_score column plus indexes for the recent-news queries"""
+    cursor.execute('PRAGMA table_info(news_articles)')
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'relevance_score' not in columns:
+        cursor.execute('ALTER TABLE news_articles ADD COLUMN relevance_score REAL DEFAULT 0')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_news_crawled_at ON news_articles (crawled_at)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_news_processed_crawled_at
+        ON news_articles (processed, crawled_at)
+    ''')
+
+
+def _v3_article_tickers(cursor: sqlite3.Cursor):
+    """Normalized article/ticker join table, backfilled from the JSON column"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_tickers (
+            article_id INTEGER NOT NULL REFERENCES news_articles (id) ON DELETE CASCADE,
+            ticker TEXT NOT NULL,
+            PRIMARY KEY (ticker, article_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_article_tickers_article ON article_tickers (article_id)')
+
+    cursor.execute("SELECT id, tickers FROM news_articles WHERE tickers IS NOT NULL AND tickers != '[]'")
+    rows = []
+    for article_id, tickers_json in cursor.fetchall():
+        try:
+            tickers = json.loads(tickers_json)
+        except (TypeError, ValueError):
+            continue
+        rows.extend((article_id, ticker.strip().upper()) for ticker in tickers if ticker)
+    cursor.executemany('INSERT OR IGNORE INTO article_tickers (article_id, ticker) VALUES (?, ?)', rows)
+
+
+def _v4_full_text_index(cursor: sqlite3.Cursor):
+    """FTS5 index over news_articles title/content, kept in sync by triggers"""
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+            title, content,
+            content='news_articles', content_rowid='id',
+            tokenize='porter unicode61'
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS news_articles_fts_insert AFTER INSERT ON news_articles BEGIN
+            INSERT INTO news_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS news_articles_fts_delete AFTER DELETE ON news_articles BEGIN
+            INSERT INTO news_fts (news_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS news_articles_fts_update AFTER UPDATE OF title, content ON news_articles BEGIN
+            INSERT INTO news_fts (news_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO news_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    ''')
+
+    # Index the rows that existed before the triggers
+    cursor.execute("INSERT INTO news_fts (news_fts) VALUES ('rebuild')")
+
+
+def _v5_near_duplicate_index(cursor: sqlite3.Cursor):
+    """SimHash signature index and story clusters, backfilled in article order"""
+    create_simhash_table(cursor)
+    cursor.execute('SELECT id, title, content FROM news_articles ORDER BY id')
+    for article_id, title, content in cursor.fetchall():
+        assign_cluster(cursor, article_id, title or '', content)
+
+
+def _v6_incremental_crawl_state(cursor: sqlite3.Cursor):
+    """HTTP cache validators on crawl history and the log of seen feed entries and article URLs"""
+    cursor.execute('PRAGMA table_info(crawl_history)')
+    columns = {row[1] for row in cursor.fetchall()}
+    for column in ('etag', 'last_modified'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE crawl_history ADD COLUMN {column} TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_crawl_history_url ON crawl_history (url, id)')
+
+    # key is a feed entry's guid or an article URL; updated is the entry's update stamp
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS seen_entries (
+            key TEXT PRIMARY KEY,
+            source TEXT,
+            updated TEXT,
+            seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+
+
+MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Cursor], None]]] = [
+    (1, _v1_base_tables),
+    (2, _v2_relevance_and_time_indexes),
+    (3, _v3_article_tickers),
+    (4, _v4_full_text_index),
+    (5, _v5_near_duplicate_index),
+    (6, _v6_incremental_crawl_state),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def apply_migrations(cursor: sqlite3.Cursor) -> Tuple[int, int]:
+    """Bring the schema up to date; returns (previous_version, current_version)"""
+    cursor.execute('PRAGMA user_version')
+    previous_version = cursor.fetchone()[0]
+
+    for version, migration in MIGRATIONS:
+        if version > previous_version:
+            migration(cursor)
+            # PRAGMA does not accept bound parameters; version is an int constant
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+
+    return previous_version, max(previous_version, SCHEMA_VERSION)
@@ -291,7 +291,14 @@ CRAWLING_CONFIG = {
     'timeout': 30,
     'max_retries': 3,
     'user_agent': 'FinRexent/1.0 (Financial News Crawler)',
-    'respect_robots_txt': True
+    'respect_robots_txt': True,
+    'concurrent': True,  # use the asyncio engine in crawl_all_sources
+    'max_concurrency': 32,  # requests in flight across all hosts
+    'per_host_concurrency': 4,  # requests in flight per host
+    # per_host_delay (seconds between request starts on one host) defaults to request_delay
+    'dedup_max_distance': 7,  # SimHash bits two copies of one story may differ by
+    'dedup_window_hours': 72,  # only cluster with stories crawled this recently
+    'incremental': True  # conditional GETs; skip feed entries and articles already seen
 }
 
 # Content Filtering Keywords
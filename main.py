@@ -1,5 +1,6 @@
 from crawler.crawler import StockNewsCrawler
 from agent.agent import FinRexentAgent
+from agent.analysis import FinancialAnalyzer
 import pandas as pd
 import sys
 
@@ -123,24 +124,25 @@ def main():
     print("6. Fetching stock data for demonstration...")
     test_tickers = ['RELIANCE', 'HDFCBANK', 'TCS', 'INFY', 'TATAMOTORS']
     
-    for ticker in test_tickers:
+    # Price history for all tickers is downloaded in one batch and results
+    # are printed as each ticker's analysis completes
+    for ticker, analysis in FinancialAnalyzer().analyze_many(test_tickers, period="6mo"):
         print(f"\n--- {ticker} Stock Analysis ---")
-        stock_data = agent.get_stock_data(ticker, period="6mo")
         
-        if stock_data is not None and not stock_data.empty:
-            latest_price = stock_data['Close'].iloc[-1]
+        if 'error' not in analysis:
+            # Served from the price cache filled by analyze_many
+            stock_data = agent.get_stock_data(ticker, period="6mo")
+            trend_analysis = analysis['trend_analysis']
+            
+            latest_price = trend_analysis['current_price']
             price_change = stock_data['Close'].iloc[-1] - stock_data['Close'].iloc[-2]
             price_change_pct = (price_change / stock_data['Close'].iloc[-2]) * 100
             
             print(f"Current Price: ₹{latest_price:.2f}")
             print(f"Daily Change: ₹{price_change:.2f} ({price_change_pct:+.2f}%)")
             
-            # Calculate technical indicators
-            stock_data['SMA_20'] = stock_data['Close'].rolling(window=20).mean()
-            stock_data['SMA_50'] = stock_data['Close'].rolling(window=50).mean()
-            
-            sma_20 = stock_data['SMA_20'].iloc[-1]
-            sma_50 = stock_data['SMA_50'].iloc[-1]
+            sma_20 = trend_analysis['sma_20']
+            sma_50 = trend_analysis['sma_50']
             
             print(f"20-day SMA: ₹{sma_20:.2f}")
             print(f"50-day SMA: ₹{sma_50:.2f}")
@@ -154,6 +156,8 @@ def main():
                 trend = "🟡 Mixed (Between SMAs)"
             
             print(f"Trend: {trend}")
+            print(f"Signal: {analysis['summary']['overall_signal']} "
+                  f"(confidence {analysis['summary']['confidence']:.0%})")
             
             # Investment suggestion
             suggestion = agent.suggest_investment_amount(stock_data)
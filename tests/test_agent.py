@@ -24,6 +24,45 @@ def test_technical_indicators(analyzer, dummy_stock_data):
     assert 'rsi' in indicators
     assert 0 <= indicators['rsi'] <= 100
 
+def test_indicator_frame_matches_pandas(analyzer, dummy_stock_data):
+    data = dummy_stock_data.astype(float)
+    data.iloc[30, data.columns.get_loc('Close')] = np.nan
+    frame = analyzer.compute_indicators(data)
+    close = data['Close']
+
+    assert len(frame) == len(data)
+    expected = {
+        'sma_50': close.rolling(window=50).mean(),
+        'ema_26': close.ewm(span=26).mean(),
+        'bb_upper': close.rolling(window=20).mean() + close.rolling(window=20).std() * 2,
+        'momentum_10': close / close.shift(10) - 1,
+        'support_level': data['Low'].rolling(window=20).min(),
+    }
+    for column, series in expected.items():
+        pd.testing.assert_series_equal(frame[column], series, check_names=False, rtol=1e-9)
+
+    indicators = analyzer.calculate_technical_indicators(data, frame)
+    assert indicators['sma_20'] == frame['sma_20'].iloc[-1]
+    assert analyzer.analyze_trend(data, frame)['sma_200'] == frame['sma_200'].iloc[-1]
+
+def test_analyze_panel_matches_per_ticker(analyzer, dummy_stock_data):
+    full = dummy_stock_data.astype(float)
+    listed_later = full.iloc[60:] * 0.5
+    panel = {field: pd.DataFrame({'AAA': full[field], 'BBB': listed_later[field]})
+             for field in ('Close', 'High', 'Low', 'Volume')}
+
+    result = analyzer.analyze_panel(panel['Close'], panel['High'], panel['Low'], panel['Volume'])
+
+    assert list(result.index) == ['AAA', 'BBB']
+    for ticker, data in (('AAA', full), ('BBB', listed_later)):
+        expected = analyzer.calculate_technical_indicators(data)
+        row = result.loc[ticker]
+        for name, value in expected.items():
+            assert row[name] == pytest.approx(value, rel=1e-9, nan_ok=True)
+        trend = analyzer.analyze_trend(data)
+        assert row['trend_strength'] == trend['trend_strength']
+        assert row['trend_direction'] == trend['trend_direction']
+
 def test_trend_analysis(analyzer, dummy_stock_data):
     trend = analyzer.analyze_trend(dummy_stock_data)
     assert 'trend_direction' in trend
@@ -58,4 +97,656 @@ def test_memory_manager():
     mem.store_recommendation('RELIANCE', 'buy', 0.9, 3000, 2800, 'Strong uptrend', {'trend': 'up'}, [{'title': 'Reliance surges'}])
     recs = mem.get_recent_recommendations('RELIANCE', days=1)
     assert recs
-    mem.cleanup_old_data(days=0)  # Clean up test data 
\ No newline at end of file
+    mem.cleanup_old_data(days=0)  # Clean up test data 
+
+def test_analyze_news_batched():
+    # Pipelines load lazily, so the agent imports without transformers
+    import re
+    from agent.agent import FinRexentAgent
+
+    calls, ner_texts = [], []
+
+    def fake_sentiment(texts, **kwargs):
+        calls.append(('sentiment', kwargs.get('batch_size')))
+        return [{'label': 'POSITIVE' if 'soars' in t else 'NEGATIVE', 'score': 0.95} for t in texts]
+
+    def fake_ner(texts, **kwargs):
+        calls.append(('ner', kwargs.get('batch_size')))
+        ner_texts.extend(texts)
+        return [[{'entity': 'B-ORG', 'word': t.split()[0]}] for t in texts]
+
+    agent = FinRexentAgent.__new__(FinRexentAgent)
+    agent.sentiment_analyzer = fake_sentiment
+    agent.ner_pipeline = fake_ner
+    agent.batch_size = 8
+    agent.max_length = 128
+    agent.strict_ner = False
+
+    news = [{'headline': 'Reliance soars'}, {'title': ''}, {'title': 'Infosys slides'}]
+    results = agent.analyze_news(news, batch_size=4, strict=True)
+
+    assert calls == [('sentiment', 4), ('ner', 4)]
+    assert [r['headline'] for r in results] == ['Reliance soars', 'Infosys slides']
+    assert results[0]['sentiment'] == 'POSITIVE' and results[0]['companies'] == ['Reliance']
+    assert results[1]['sentiment'] == 'NEGATIVE' and results[1]['companies'] == ['Infosys']
+
+    # By default NER only sees headlines naming no listed company
+    calls.clear()
+    ner_texts.clear()
+    news = [{'title': 'Tata Steel soars'}, {'title': 'Acme Widgets slides'}]
+    results = agent.analyze_news(news, batch_size=4)
+    assert ner_texts == ['Acme Widgets slides']
+    assert results[0]['companies'] == ['Tata Steel'] and results[1]['companies'] == ['Acme']
+
+    # Over-long headlines reach NER cut to max_length tokens, as sentiment truncates them
+    class FakeTokenizer:
+        is_fast = True
+
+        def __call__(self, texts, truncation, max_length, return_offsets_mapping):
+            # Whitespace tokens plus [CLS]/[SEP]
+            offsets = [[(0, 0)] + [m.span() for m in re.finditer(r'\S+', t)][:max_length - 2] + [(0, 0)]
+                       for t in texts]
+            return {'offset_mapping': offsets}
+
+    news = [{'title': 'Acme Widgets slides after a very long headline'}]
+    ner_texts.clear()
+    agent.max_length = 4
+    agent.analyze_news(news)
+    assert ner_texts == ['Acme Widgets slides after']
+    ner_texts.clear()
+    fake_ner.tokenizer = FakeTokenizer()
+    agent.analyze_news(news)
+    assert ner_texts == ['Acme Widgets']
+
+
+def test_recommend_stocks_fetches_each_ticker_once(monkeypatch):
+    from agent.agent import FinRexentAgent
+    from utils.price_cache import price_cache
+
+    prefetched, fetched = [], []
+    monkeypatch.setattr(price_cache, 'prefetch', lambda symbols, **kwargs: prefetched.append(list(symbols)))
+
+    def fake_stock_data(ticker, period='1y'):
+        fetched.append(ticker)
+        if ticker == 'TCS':
+            return None
+        if ticker == 'INFY':
+            return pd.DataFrame({'Open': [1.0]})  # no 'Close' column
+        return pd.DataFrame({'Close': np.linspace(100, 200, 60)})
+
+    agent = FinRexentAgent()
+    agent.get_stock_data = fake_stock_data
+
+    news = [{'headline': f'Reliance Industries soars {i}', 'sentiment': 'POSITIVE', 'score': 0.95,
+             'companies': ['Reliance Industries']} for i in range(5)]
+    news += [{'headline': 'RIL and TCS soar', 'sentiment': 'POSITIVE', 'score': 0.95, 'companies': ['RIL', 'TCS']},
+             {'headline': 'Infosys soars', 'sentiment': 'POSITIVE', 'score': 0.99, 'companies': ['Infosys']},
+             {'headline': 'Wipro slides', 'sentiment': 'NEGATIVE', 'score': 0.99, 'companies': ['Wipro']}]
+    recommendations = agent.recommend_stocks(news)
+
+    # A ticker whose analysis raises is dropped without losing the others
+    assert prefetched == [['RELIANCE.NS', 'TCS.NS', 'INFY.NS']]
+    assert sorted(fetched) == ['INFY', 'RELIANCE', 'TCS']
+    assert [(r['company'], r['ticker']) for r in recommendations] == \
+        [('Reliance Industries', 'RELIANCE')] * 5 + [('RIL', 'RELIANCE')]
+    assert recommendations[-1]['headline'] == 'RIL and TCS soar'
+    assert 'upward trend' in recommendations[0]['investment_suggestion']
+
+
+def test_memory_manager_concurrent_writes(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    mem = MemoryManager(db_path=str(tmp_path / 'memory.db'))
+
+    def work(worker_id):
+        for i in range(25):
+            mem.store_interaction(f'session-{worker_id}', f'query {i}', 'response', 'query')
+            mem.store_performance_metric('latency', float(i), {'worker': worker_id})
+        return mem.get_memory_stats()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(8)))
+
+    stats = mem.get_memory_stats()
+    assert stats['user_interactions_count'] == 200
+    assert stats['performance_metrics_count'] == 200
+    journal_mode = mem._db.connection.execute('PRAGMA journal_mode').fetchone()[0]
+    assert journal_mode == 'wal'
+    mem.close()
+
+def test_memory_tracks_position_for_unknown_recommendation(tmp_path):
+    mem = MemoryManager(db_path=str(tmp_path / 'memory.db'))
+    mem.track_portfolio_position('RELIANCE', 100.0, 10, recommendation_id=42)
+    with mem._db.cursor() as cursor:
+        cursor.execute('SELECT ticker, recommendation_id FROM portfolio_tracking')
+        assert cursor.fetchall() == [('RELIANCE', 42)]
+    mem.close()
+
+def test_price_cache_hits_and_incremental_topup(tmp_path):
+    from utils.price_cache import PriceHistoryCache
+
+    today = pd.Timestamp.now().normalize()
+    dates = pd.date_range(end=today, periods=400, freq='D', tz='Asia/Kolkata')
+    bars = pd.DataFrame({'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': np.arange(400, dtype=float),
+                         'Volume': 100.0, 'Dividends': 0.0, 'Stock Splits': 0.0}, index=dates)
+    calls = []
+
+    def fetcher(symbol, start, end, interval):
+        calls.append(start)
+        visible = bars[bars.index < dates[-1]] if len(calls) == 1 else bars
+        if start is not None:
+            visible = visible[visible.index.tz_convert('UTC').tz_localize(None) >= start]
+        return visible.copy()
+
+    cache = PriceHistoryCache(cache_dir=tmp_path, max_age=3600, fetcher=fetcher)
+    first = cache.get_history('TCS.NS', period='1y')
+    assert first.index[-1] == dates[-2]
+    first['Close'] = -1  # callers get their own copy
+
+    second = cache.get_history('TCS.NS', period='6mo')
+    assert len(calls) == 1
+    assert (second['Close'] >= 0).all()
+    assert second.index.tz is not None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    # Stale cache: only bars from the last cached day onward are requested
+    cache.max_age = 0
+    third = cache.get_history('TCS.NS', period='1y')
+    assert len(calls) == 2
+    assert calls[1] >= dates[-3].tz_convert('UTC').tz_localize(None)
+    assert third.index[-1] == dates[-1]
+    assert cache.stats()['topups'] == 1
+
+def test_fundamentals_cache_field_ttls(tmp_path):
+    from utils.fundamentals_cache import FundamentalsCache
+
+    calls = []
+
+    def fetcher(symbol):
+        calls.append(symbol)
+        if symbol == 'NOPE.NS':
+            return {'trailingPegRatio': None}
+        return {'symbol': symbol, 'longName': 'Tata Consultancy', 'sector': 'Technology',
+                'marketCap': 1000 + len(calls)}
+
+    db_path = tmp_path / 'fundamentals.db'
+    cache = FundamentalsCache(db_path=db_path, fetcher=fetcher)
+    assert cache.get_info('tcs.ns', ['symbol', 'marketCap', 'forwardPE'])['marketCap'] == 1001
+    assert cache.get_info('TCS.NS', ['sector', 'forwardPE'])['sector'] == 'Technology'
+    assert calls == ['TCS.NS']
+
+    # Unknown symbols are negatively cached
+    assert cache.get_info('NOPE.NS') is None
+    assert cache.get_info('NOPE.NS') is None
+    assert calls == ['TCS.NS', 'NOPE.NS']
+
+    # A new process reads from SQLite; only the short-TTL field triggers a refetch
+    later = FundamentalsCache(db_path=db_path, fetcher=fetcher, ttls={'intraday': 0})
+    assert later.get_info('TCS.NS', ['sector'])['sector'] == 'Technology'
+    assert len(calls) == 2
+    assert later.get_info('TCS.NS', ['marketCap'])['marketCap'] == 1003
+    assert later.stats() == {'hits': 1, 'misses': 0, 'refreshes': 1, 'errors': 0}
+
+def test_analyze_many_streams_and_isolates_errors(tmp_path, monkeypatch, dummy_stock_data):
+    import agent.analysis as analysis
+    from utils.price_cache import PriceHistoryCache
+    from utils.fundamentals_cache import FundamentalsCache
+
+    downloads = []
+
+    def batch_fetcher(symbols, start, interval):
+        downloads.append(list(symbols))
+        return {s: dummy_stock_data.copy() for s in symbols if s != 'NOPE.NS'}
+
+    def fetcher(symbol, start, end, interval):
+        return pd.DataFrame()
+
+    monkeypatch.setattr(analysis, 'price_cache', PriceHistoryCache(
+        cache_dir=tmp_path / 'stocks', fetcher=fetcher, batch_fetcher=batch_fetcher))
+    monkeypatch.setattr(analysis, 'fundamentals_cache', FundamentalsCache(
+        db_path=tmp_path / 'fundamentals.db', fetcher=lambda s: {'symbol': s, 'trailingPE': 20}))
+
+    analyzer = FinancialAnalyzer()
+    tickers = ['TCS', 'INFY', 'NOPE', 'TCS']
+    results = dict(analyzer.analyze_many(tickers, max_workers=2, period='1y'))
+    assert downloads == [['TCS.NS', 'INFY.NS', 'NOPE.NS']]
+    assert set(results) == {'TCS', 'INFY', 'NOPE'}
+    assert 'error' in results['NOPE']
+    assert results['TCS']['summary'] == analyzer.comprehensive_analysis('TCS')['summary']
+
+    # Indicator math on a process pool gives the same answers
+    in_processes = dict(analyzer.analyze_many(tickers, max_workers=2, process_pool_min_tickers=1))
+    assert in_processes['INFY']['technical_indicators'] == results['INFY']['technical_indicators']
+    assert 'error' in in_processes['NOPE']
+
+def test_async_ollama_client_fans_out_over_pooled_connections(tmp_path):
+    import asyncio
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from agent.llm_client import AsyncOllamaClient
+    from utils.llm_cache import LLMResponseCache
+
+    state = {'in_flight': 0, 'peak': 0, 'ports': set()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+                state['ports'].add(self.client_address[1])
+            time.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+            text = payload['prompt'].split('Text: ')[1].split('\n')[0]
+            body = json.dumps({'response': f'{{"sentiment": "positive", "score": {len(text) / 100}}}'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        async def run():
+            async with AsyncOllamaClient(base_url=f'http://127.0.0.1:{server.server_address[1]}',
+                                         max_concurrency=3,
+                                         cache=LLMResponseCache(db_path=tmp_path / 'llm.db')) as client:
+                return await client.analyze_sentiment_many(['x' * n for n in range(1, 13)])
+
+        results = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert [r['score'] for r in results] == [n / 100 for n in range(1, 13)]
+    assert state['peak'] == 3
+    assert len(state['ports']) <= 3
+
+def test_generate_stream_stops_after_json_object(tmp_path):
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from agent.llm_client import OllamaClient
+    from utils.llm_cache import LLMResponseCache
+
+    tokens = ['Sure: ', '{"sentiment": ', '"positive", "score": 0.4, ', '"reasoning": "brace } and \\"quote\\" {"', '}',
+              ' Hope this helps', '!']
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_line(self, event):
+            # Chunked NDJSON, as Ollama streams it
+            line = json.dumps(event).encode() + b'\n'
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+            self.wfile.flush()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for i, token in enumerate(tokens):
+                    if i >= 5:
+                        time.sleep(1)  # trailing tokens are slow
+                    self.send_line({'response': token, 'done': False})
+                self.send_line({'response': '', 'done': True, 'eval_count': 7, 'eval_duration': 10 ** 9})
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = OllamaClient(base_url=f'http://127.0.0.1:{server.server_address[1]}',
+                              cache=LLMResponseCache(db_path=tmp_path / 'llm.db'))
+        start = time.time()
+        chunks = list(client.generate_stream('prompt', stop_at_json=True))
+        assert time.time() - start < 0.9
+        assert json.loads(''.join(chunks[1:]))['reasoning'] == 'brace } and "quote" {'
+        assert client.analyze_sentiment('text')['sentiment'] == 'positive'
+
+        full = ''.join(client.generate_stream('prompt'))
+        assert full.endswith('Hope this helps!')
+    finally:
+        server.shutdown()
+
+def test_llm_response_cache(tmp_path):
+    from agent.llm_client import OllamaClient
+    from utils.llm_cache import LLMResponseCache
+
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, payload):
+            self.payload = payload
+
+        def json(self):
+            return {'response': f'{{"sentiment": "positive", "echo": {len(self.payload["prompt"])}}}'}
+
+    posts = []
+
+    class FakeSession:
+        def post(self, url, json, timeout):
+            posts.append(json)
+            return FakeResponse(json)
+
+    # The client samples at temperature 0.7, so caching it is opt-in
+    cache = LLMResponseCache(db_path=tmp_path / 'llm.db', max_entries=2, max_temperature=1.0)
+    client = OllamaClient(cache=cache)
+    client.session = FakeSession()
+
+    first = client.generate('Sensex rallies')
+    assert client.generate('Sensex rallies') == first
+    client.generate('Sensex rallies', system_prompt='Be brief')
+    assert len(posts) == 2
+    assert client.generate('Sensex rallies', use_cache=False) == first and len(posts) == 3
+
+    # Persistent across instances; hit rate counts cacheable lookups only
+    other = LLMResponseCache(db_path=tmp_path / 'llm.db', max_temperature=1.0)
+    assert OllamaClient(cache=other).generate('Sensex rallies') == first
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+    assert other.stats()['hits'] == 1
+    default = OllamaClient(cache=LLMResponseCache(db_path=tmp_path / 'llm.db'))
+    default.session = FakeSession()
+    assert default.generate('Sensex rallies') == first
+    assert len(posts) == 4  # temperature 0.7 is not cached by default
+
+    # LRU eviction past max_entries; the buffered hit counts before evicting
+    client.generate('Sensex rallies')
+    client.generate('Nifty slips')
+    assert len(posts) == 5 and cache.stats()['evictions'] == 1
+    client.generate('Sensex rallies')
+    assert len(posts) == 5  # recently used entry survived
+    client.generate('Sensex rallies', system_prompt='Be brief')
+    assert len(posts) == 6  # least recently used entry was evicted
+
+    # Expired and too-hot requests go to the model
+    cache.ttl = 0
+    client.generate('Nifty slips')
+    assert len(posts) == 7
+    cache.ttl, cache.max_temperature = 3600, 0.0
+    client.generate('Sensex rallies')
+    assert len(posts) == 8 and cache.stats()['bypassed'] == 1
+
+    # Running totals match the table after replacements and evictions
+    cache.max_temperature = 1.0
+    with cache._database().cursor() as cursor:
+        cursor.execute('SELECT COUNT(*), SUM(size) FROM llm_responses')
+        assert cursor.fetchone() == (cache._entries, cache._bytes) and cache._entries == 2
+
+def test_llm_cache_hits_structured_calls_with_default_config(tmp_path):
+    import json as json_lib
+    from agent.llm_client import OllamaClient
+    from utils.llm_cache import LLMResponseCache
+
+    posts = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def iter_lines(self, chunk_size=None):
+            text = '{"sentiment": "positive", "score": 0.4, "confidence": 0.8, "reasoning": "up"}'
+            yield json_lib.dumps({'response': text, 'done': True}).encode()
+
+    class FakeSession:
+        def post(self, url, json, timeout, stream=False):
+            posts.append(json)
+            return FakeResponse()
+
+    # Default ollama temperature and llm_max_temperature
+    cache = LLMResponseCache(db_path=tmp_path / 'llm.db')
+    client = OllamaClient(cache=cache)
+    client.session = FakeSession()
+
+    first = client.analyze_sentiment('Nifty climbs')
+    assert client.analyze_sentiment('Nifty climbs') == first and first['sentiment'] == 'positive'
+    assert len(posts) == 1 and posts[0]['options']['temperature'] == 0
+    assert cache.stats()['hits'] == 1 and cache.stats()['bypassed'] == 0
+
+def test_analyze_sentiment_batch_packs_and_retries(tmp_path):
+    import json as json_lib
+    import re
+    from agent.llm_client import OllamaClient
+    from utils.llm_cache import LLMResponseCache
+
+    prompts, contexts = [], []
+
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, text):
+            self.text = text
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def iter_lines(self, chunk_size=None):
+            yield json_lib.dumps({'response': self.text, 'done': True}).encode()
+
+    class FakeModel:
+        """Scores 'up' texts positive; drops 'flaky' items and garbles 'bad' ones the first time"""
+        def post(self, url, json, timeout, stream=False):
+            prompts.append(json['prompt'])
+            contexts.append(json['options']['num_ctx'])
+            items = re.findall(r'\[(\d+)\] (.*)', json['prompt'])
+            if not items:
+                return FakeResponse('{"sentiment": "neutral", "score": 0.0, "confidence": 0.9, "reasoning": "single"}')
+            first_try = len(prompts) == 1
+            results = []
+            for number, text in items:
+                if first_try and 'flaky' in text:
+                    continue
+                score = 'high' if first_try and 'bad' in text else (0.5 if 'up' in text else -0.5)
+                results.append({'id': int(number), 'sentiment': 'positive' if 'up' in text else 'negative',
+                                'score': score, 'confidence': 0.8, 'reasoning': text})
+            return FakeResponse('Here you go: ' + json_lib.dumps({'results': results}))
+
+    client = OllamaClient(cache=LLMResponseCache(db_path=tmp_path / 'llm.db'))
+    client.session = FakeModel()
+
+    texts = ['Nifty up', 'Bank flaky down', 'TCS bad down', 'Nifty up', 'Infosys up']
+    results = client.analyze_sentiment_batch(texts)
+    # One batch for the four unique texts, one retry batch for the two that failed
+    assert len(prompts) == 2 and contexts == [client.num_ctx] * 2
+    assert [r['sentiment'] for r in results] == ['positive', 'negative', 'negative', 'positive', 'positive']
+    assert results[1] == {'sentiment': 'negative', 'score': -0.5, 'confidence': 0.8, 'reasoning': 'Bank flaky down'}
+
+    # Batches are bounded by the context window
+    client.num_ctx = 400
+    batches = client._sentiment_batches(['word ' * 40] * 6, list(range(6)), 16)
+    assert len(batches) > 1 and sum(len(b) for b in batches) == 6
+
+def test_extract_json_skips_prose_braces_and_validates():
+    from agent.structured_output import JsonObjectScanner, extract_json, RECOMMENDATION_SCHEMA, SENTIMENT_SCHEMA
+
+    text = 'Note {this} first. {"sentiment": "negative", "score": -0.3, "reasoning": "a } in text"} trailing {x}'
+    assert extract_json(text, SENTIMENT_SCHEMA) == {'sentiment': 'negative', 'score': -0.3, 'reasoning': 'a } in text'}
+    assert extract_json('{"sentiment": "bullish", "score": 0.2}', SENTIMENT_SCHEMA) is None
+    # Enum values are matched ignoring case and padding, and normalized
+    assert extract_json('{"sentiment": " Positive", "score": 0.2}', SENTIMENT_SCHEMA)['sentiment'] == 'positive'
+    assert extract_json('{"recommendation": "BUY", "confidence": 0.6, "risk_level": "High"}',
+                        RECOMMENDATION_SCHEMA) == {'recommendation': 'buy', 'confidence': 0.6, 'risk_level': 'high'}
+    assert extract_json('{"sentiment": "positive", "score": true}', SENTIMENT_SCHEMA) is None
+    assert extract_json('no json here') is None
+
+    # Fed in chunks, the end offset points into the chunk holding the closing brace
+    scanner = JsonObjectScanner()
+    chunks = ['{bad} {"a": ', '{"b": "}"}', '} tail']
+    assert [scanner.feed(chunk) for chunk in chunks] == [None, None, 1]
+    assert scanner.value == {'a': {'b': '}'}}
+
+def test_memory_recall_similar(tmp_path):
+    from agent.embeddings import HashingEmbedder
+
+    mem = MemoryManager(db_path=tmp_path / 'memory.db', embedder=HashingEmbedder(256))
+    mem.store_learning_data('news_pattern', {'pattern': 'bank stocks fall when RBI hikes repo rate'})
+    mem.store_learning_data('news_pattern', {'pattern': 'IT exporters gain when the rupee weakens'})
+    mem.store_recommendation('TCS', 'buy', 0.8, 4200, 3800, 'Rupee weakness lifts IT exporters margins')
+
+    hits = mem.recall_similar('rupee weakens, IT exporters', k=2)
+    assert {(h['source'], h.get('ticker')) for h in hits} == {('learning_data', None), ('investment_recommendations', 'TCS')}
+    assert hits[0]['score'] >= hits[1]['score']
+
+    only_learning = mem.recall_similar('RBI repo rate hike hits bank stocks', k=1, sources=['learning_data'])
+    assert only_learning[0]['content'] == {'pattern': 'bank stocks fall when RBI hikes repo rate'}
+
+    # New memories are picked up, and a new process reuses stored vectors
+    mem.store_learning_data('news_pattern', {'pattern': 'monsoon deficit hurts FMCG rural demand'})
+    assert mem.recall_similar('weak monsoon rural FMCG', k=1)[0]['id'] == 3
+    reopened = MemoryManager(db_path=tmp_path / 'memory.db', embedder=HashingEmbedder(256))
+    assert reopened.recall_similar('weak monsoon rural FMCG', k=1)[0]['id'] == 3
+    assert reopened.get_memory_stats()['memory_embeddings_count'] == 4
+
+def test_vector_index_ivf_matches_exact():
+    from utils.vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    vectors = centers[rng.integers(0, 20, 2000)] + rng.normal(scale=0.1, size=(2000, 32))
+    index = VectorIndex(ann_min_size=500, nprobe=4)
+    index.add(list(range(2000)), vectors)
+    assert index._centroids is not None
+
+    queries = centers[:10] + rng.normal(scale=0.1, size=(10, 32))
+    overlap = [len({key for key, _ in index.search(q, 10)} & {key for key, _ in index.search(q, 10, exact=True)})
+               for q in queries]
+    assert sum(overlap) >= 90
+
+
+def test_symbol_index_resolves_offline(tmp_path):
+    from utils.symbol_index import SymbolIndex
+
+    (tmp_path / 'EQUITY_L.csv').write_text(
+        'SYMBOL,NAME OF COMPANY, SERIES, ISIN NUMBER\n'
+        'RELIANCE,Reliance Industries Limited,EQ,IN0000000001\n'
+        'RPOWER,Reliance Power Limited,EQ,IN0000000002\n'
+        'DRREDDY,Dr. Reddy\'s Laboratories Limited,EQ,IN0000000003\n'
+        'TCS,Tata Consultancy Services Limited,EQ,IN0000000004\n'
+        'TATASTEEL,Tata Steel Limited,EQ,IN0000000005\n'
+        'HDFCBANK,HDFC Bank Limited,EQ,IN0000000006\n'
+        'HDFCLIFE,HDFC Life Insurance Company Limited,EQ,IN0000000007\n'
+        'POWERGRID,Power Grid Corporation of India Limited,EQ,IN0000000008\n'
+    )
+    # BSE copy of an NSE listing maps back to the NSE symbol through its ISIN
+    (tmp_path / 'bse.csv').write_text(
+        'Security Code,Security Id,Security Name,Status,ISIN No\n'
+        '500325,RELIANCE,RELIANCE INDUSTRIES LTD.,Active,IN0000000001\n'
+        '500124,DRREDDYLAB,DR.REDDY\'S LAB,Active,IN0000000003\n'
+    )
+    (tmp_path / 'aliases.csv').write_text('ALIAS,SYMBOL\nRIL,RELIANCE\nReliance Group,RELIANCE\nReliance Group,RPOWER\n')
+
+    index = SymbolIndex(directory=str(tmp_path))
+    assert index.resolve('Reliance Industries') == 'RELIANCE'
+    assert index.resolve('RIL') == 'RELIANCE'
+    assert index.resolve('IN0000000003') == 'DRREDDY'
+    assert index.resolve("Dr Reddy's Lab") == 'DRREDDY'
+    assert index.match('Tata Consultancy').method == 'prefix'
+    assert index.match('Relaince Power').method == 'fuzzy'
+    # Ambiguous and unknown names don't resolve; misses are cached
+    assert index.resolve('Reliance Group') is None
+    assert index.resolve('Microsoft') is None
+    assert index.resolve('Microsoft') is None
+    assert index.stats()['unresolved'] == 2 and index.stats()['cached'] == 1
+    # Shared brand stems, generic words and partial words don't resolve either
+    for name in ('HDFC', 'Tata', 'Power', 'Insurance', 'Steel', 'Services', 'Hdfc Lif', 'Reliance Group Ltd'):
+        assert index.resolve(name) is None, name
+
+    # Gazetteer: longest capitalized match, acronyms only in capitals, ambiguous names skipped
+    assert index.find_companies("RIL and Reliance Power rise; Dr. Reddy's Laboratories flat") == [
+        ('RIL', 'RELIANCE'), ('Reliance Power', 'RPOWER'), ("Dr. Reddy's Laboratories", 'DRREDDY')]
+    assert index.find_companies('reliance power and ril rise; Reliance Group falls') == []
+    # A name that normalizes to an acronym ("ITC Limited" -> "itc") still needs capitals
+    index.add('ITC', 'ITC Limited')
+    assert index.find_companies('Itc hikes prices') == []
+    assert index.find_companies('ITC hikes prices') == [('ITC', 'ITC')]
+
+
+def test_symbol_index_covers_former_hardcoded_names():
+    from utils.symbol_index import SymbolIndex
+
+    # The mapping _get_ticker_from_company_name used before the symbol index
+    former = {
+        "Reliance Industries": "RELIANCE", "HDFC Bank": "HDFCBANK", "Axis Bank": "AXISBANK",
+        "Bharti Airtel": "BHARTIARTL", "Cummins India": "CUMMINSIND", "BPCL": "BPCL", "IOC": "IOC",
+        "HPCL": "HINDPETRO", "SAIL": "SAIL", "Vedanta": "VEDL", "Tata Steel": "TATASTEEL",
+        "Whirlpool": "WHIRLPOOL", "Voltas": "VOLTAS", "Coforge": "COFORGE", "IndiGo": "INDIGO",
+        "Dr Reddy's": "DRREDDY", "Carraro India": "CARRAROIND", "Western Carriers": "WCL",
+        "Om Infra": "OMINFRAL", "FirstCry": "FIRSTCRY", "Apar Industries": "APARINDS",
+        "Newgen Software": "NEWGEN",
+    }
+    index = SymbolIndex(directory='data/symbols')
+    assert {name: index.resolve(name) for name in former} == former
+    assert all(index.match(name).method == 'exact' for name in former)
+
+
+def test_model_registry_loads_lazily_once_and_unloads_idle():
+    import threading
+    from utils.model_registry import ModelRegistry
+
+    loads = []
+    now = [0.0]
+
+    def loader(task, model, **kwargs):
+        loads.append((task, model, kwargs))
+        return lambda texts: [task] * len(texts)
+
+    registry = ModelRegistry(specs={'sentiment': {'task': 'sentiment-analysis', 'model': 'm1'},
+                                    'ner': {'task': 'ner', 'model': 'm2', 'aggregation_strategy': 'simple'}},
+                             idle_timeout=60, loader=loader, clock=lambda: now[0])
+    assert loads == [] and registry.stats()['loaded'] == []
+
+    # Concurrent first uses share one load
+    threads = [threading.Thread(target=registry.get, args=('sentiment',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [('sentiment-analysis', 'm1', {})]
+    assert registry.get('sentiment')(['a', 'b']) == ['sentiment-analysis'] * 2
+
+    registry.warm(['ner'])
+    assert loads[-1] == ('ner', 'm2', {'aggregation_strategy': 'simple'})
+
+    now[0] = 50
+    registry.get('ner')
+    now[0] = 70
+    assert registry.unload_idle() == ['sentiment']
+    assert registry.stats()['loaded'] == ['ner']
+    registry.get('sentiment')
+    assert len(loads) == 3
+
+
+def test_model_registry_routes_onnx_backend(monkeypatch):
+    import utils.onnx_backend
+    from utils.model_registry import default_pipeline_loader
+
+    calls = []
+    monkeypatch.setattr(utils.onnx_backend, 'onnx_pipeline_loader',
+                        lambda task, model, **kwargs: calls.append((task, model, kwargs)) or 'ort')
+    assert default_pipeline_loader('ner', 'm', backend='onnx', onnx_options={'quantize': False}) == 'ort'
+    assert calls == [('ner', 'm', {'onnx_options': {'quantize': False}})]
+    assert utils.onnx_backend.export_dir('dbmdz/bert-large', 'cache').as_posix() == 'cache/dbmdz--bert-large'
@@ -24,9 +24,404 @@ def test_filter_financial_news(crawler):
     assert any('Reliance' in art['title'] for art in filtered)
     assert all('financial_keywords' in art for art in filtered)
 
+def test_keyword_matcher_word_boundaries():
+    from crawler.keyword_matcher import keyword_matcher
+
+    hits = keyword_matcher.scan('Livestock prices: IT stocks rally on NSE; it was a "bull market" for mutual fund flows.')
+    assert hits['financial'] == ['stock', 'market', 'mutual fund']
+    assert hits['market'] == ['NSE']
+    assert hits['sectors'] == {'technology': ['IT']}
+
+    # Plurals count; phrases also count as the keywords inside them
+    hits = keyword_matcher.scan('Bank Nifty ends higher as profits lift equities; FIIs buy IPOs, market, cap rises')
+    assert hits['financial'] == ['market', 'profit', 'IPO', 'market cap', 'equity']
+    assert hits['market'] == ['Nifty', 'Bank Nifty', 'FII']
+    assert hits['sectors'] == {'banking': ['bank']}
+
+    # Lowercase 'it' is a pronoun, not the IT sector
+    assert keyword_matcher.scan('it rained all day')['sectors'] == {}
+
 def test_recent_news(crawler):
     news = crawler.get_recent_news(hours=48)
     assert isinstance(news, list)
     if news:
         assert 'title' in news[0]
-        assert 'relevance_score' in news[0] 
\ No newline at end of file
+        assert 'relevance_score' in news[0] 
+
+@pytest.fixture
+def stub_news_site():
+    """Local HTTP server serving one RSS feed, one listing page and two articles"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    pages = {
+        '/rss.xml': b'''<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+            <item><title>Sensex jumps 500 points</title><link>http://example.com/rss1</link>
+            <description>Banking stock rally lifts market</description></item>
+            <item><title>Weather update</title><link>http://example.com/rss2</link>
+            <description>Rain expected</description></item></channel></rss>''',
+        '/list': b'''<html><body>
+            <h2><a href="/a1" title="Reliance profit rises">x</a></h2>
+            <h2><a href="/a2" title="Film review">y</a></h2></body></html>''',
+        '/a1': b'<div class="article-content">Reliance stock up on earnings</div><span class="date">today</span>',
+        '/a2': b'<div class="article-content">A fun movie</div>',
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            self.send_response(200 if body else 404)
+            self.end_headers()
+            self.wfile.write(body or b'')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def test_concurrent_crawl_matches_sequential(crawler, stub_news_site):
+    crawler.rss_feeds = {'stub': stub_news_site + '/rss.xml'}
+    crawler.sources = {
+        'stub': {
+            'name': 'Stub',
+            'base_url': stub_news_site,
+            'news_urls': [stub_news_site + '/list', stub_news_site + '/missing'],
+            'selectors': {'headlines': 'h2 a', 'content': '.article-content', 'date': '.date'}
+        }
+    }
+    # Both crawls fetch everything, so the second must not skip what the first stored
+    crawler.crawl_config = dict(crawler.crawl_config, request_delay=0, incremental=False)
+
+    def strip_timestamps(articles):
+        return [{k: v for k, v in a.items() if k != 'crawled_at'} for a in articles]
+
+    sequential = crawler.crawl_all_sources(concurrent=False)
+    concurrent = crawler.crawl_all_sources(concurrent=True)
+
+    assert sorted(a['title'] for a in sequential) == ['Reliance profit rises', 'Sensex jumps 500 points']
+    assert strip_timestamps(concurrent) == strip_timestamps(sequential)
+
+
+def test_async_engine_busy_host_does_not_starve_others():
+    import asyncio
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from crawler.async_engine import AsyncCrawlEngine
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/slow':
+                time.sleep(0.3)
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    # Two loopback addresses are two hosts to the engine
+    slow = [f'http://127.0.0.1:{port}/slow'] * 6
+    fast = [f'http://127.0.0.2:{port}/fast'] * 2
+
+    async def crawl():
+        start = time.monotonic()
+        finished = {}
+
+        async def fetch(url):
+            body = await engine.fetch(url)
+            finished.setdefault(url, []).append(time.monotonic() - start)
+            return body
+
+        engine = AsyncCrawlEngine(max_concurrency=2, per_host_concurrency=1, per_host_delay=0)
+        async with engine:
+            bodies = await asyncio.gather(*(fetch(url) for url in slow + fast))
+        return bodies, finished
+
+    try:
+        bodies, finished = asyncio.run(crawl())
+    finally:
+        server.shutdown()
+
+    assert bodies == [b'ok'] * 8
+    # Queued requests for the slow host hold no global slot, so the fast host is not held up
+    assert max(finished[fast[0]]) < 0.6 < max(finished[slow[0]])
+
+
+def test_crawl_history_is_written_without_a_stored_batch(tmp_path, monkeypatch, stub_news_site):
+    import sqlite3
+
+    monkeypatch.chdir(tmp_path)
+    crawler = StockNewsCrawler(use_firecrawl=False)
+    crawler.crawl_config = dict(crawler.crawl_config, request_delay=0)
+    crawler.rss_feeds = {'stub': stub_news_site + '/rss.xml'}
+    crawler.sources = {
+        'stub': {
+            'name': 'Stub',
+            'base_url': stub_news_site,
+            'news_urls': [stub_news_site + '/list', stub_news_site + '/missing'],
+            'selectors': {'headlines': 'h2 a', 'content': '.article-content', 'date': '.date'}
+        }
+    }
+
+    def history_statuses():
+        with crawler._db.cursor() as cursor:
+            cursor.execute('SELECT status FROM crawl_history ORDER BY id')
+            return [row[0] for row in cursor.fetchall()]
+
+    # Called directly, a source crawl logs its pages straight away and buffers nothing
+    crawler._crawl_source('stub', crawler.sources['stub'])
+    assert history_statuses() == ['success', 'error']
+    assert crawler._pending_history == [] and crawler._pending_seen == []
+
+    # A failed store still records the crawl, but nothing is marked as seen
+    def failing_store(*args, **kwargs):
+        raise sqlite3.OperationalError('disk I/O error')
+
+    monkeypatch.setattr(crawler, '_store_batch', failing_store)
+    crawler.crawl_all_sources(concurrent=False)
+    assert history_statuses() == ['success', 'error', 'success', 'success', 'error']
+    assert crawler._pending_history == [] and crawler._pending_seen == []
+    with crawler._db.cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM seen_entries')
+        assert cursor.fetchone()[0] == 0
+
+
+def test_store_news_batch_counts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    crawler = StockNewsCrawler(use_firecrawl=False)
+
+    first = crawler.store_news_batch([
+        {'title': 'Sensex rises', 'url': 'http://x/1'},
+        {'title': 'Nifty falls', 'url': 'http://x/2'},
+    ])
+    assert first == {'inserted': 2, 'replaced': 0, 'skipped': 0}
+
+    second = crawler.store_news_batch([
+        {'title': 'Sensex rises further', 'url': 'http://x/1'},
+        {'title': 'Bank stocks rally', 'url': 'http://x/3'},
+        {'title': 'Bank stocks rally (updated)', 'url': 'http://x/3'},
+        {'title': 'No url'},
+    ], crawl_history=[('stub', 'http://x/', 'success', 4)])
+    assert second == {'inserted': 1, 'replaced': 1, 'skipped': 2}
+
+    with crawler._db.cursor() as cursor:
+        cursor.execute('SELECT url, title FROM news_articles ORDER BY url')
+        assert cursor.fetchall() == [('http://x/1', 'Sensex rises further'),
+                                     ('http://x/2', 'Nifty falls'),
+                                     ('http://x/3', 'Bank stocks rally (updated)')]
+        cursor.execute('SELECT COUNT(*) FROM crawl_history')
+        assert cursor.fetchone()[0] == 1
+
+
+def test_schema_migration_and_ticker_index(tmp_path, monkeypatch):
+    import json
+    import sqlite3
+    from datetime import datetime
+    from crawler.migrations import SCHEMA_VERSION
+
+    # Legacy (unversioned) database without relevance_score or article_tickers
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data' / 'news').mkdir(parents=True)
+    legacy = sqlite3.connect(tmp_path / 'data' / 'news' / 'crawled_news.db')
+    legacy.execute('''CREATE TABLE news_articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, content TEXT, url TEXT UNIQUE,
+        source TEXT, published_date TEXT, crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sentiment_score REAL, financial_keywords TEXT, tickers TEXT, processed BOOLEAN DEFAULT FALSE)''')
+    legacy.execute('INSERT INTO news_articles (title, url, crawled_at, tickers) VALUES (?, ?, ?, ?)',
+                   ('Old TCS story', 'http://x/old', datetime.now().isoformat(), json.dumps(['TCS.NS'])))
+    legacy.commit()
+    legacy.close()
+
+    crawler = StockNewsCrawler(use_firecrawl=False)
+    crawler.store_news_batch([{'title': 'Reliance up', 'url': 'http://x/new', 'tickers': ['RELIANCE.NS'],
+                               'crawled_at': datetime.now().isoformat(), 'relevance_score': 3}])
+
+    with crawler._db.cursor() as cursor:
+        cursor.execute('PRAGMA user_version')
+        assert cursor.fetchone()[0] == SCHEMA_VERSION
+        cursor.execute("EXPLAIN QUERY PLAN SELECT article_id FROM article_tickers WHERE ticker IN ('TCS')")
+        assert any(row[-1].startswith('SEARCH') for row in cursor.fetchall())
+
+    assert [a['title'] for a in crawler.get_news_by_ticker('TCS')] == ['Old TCS story']
+    assert [a['title'] for a in crawler.get_news_by_ticker('RELIANCE')] == ['Reliance up']
+    assert crawler.get_news_by_ticker('REL') == []
+    assert crawler.get_recent_news(hours=1)[0]['relevance_score'] == 3
+
+    # Deleting an article cascades to its ticker rows
+    with crawler._db.transaction() as cursor:
+        cursor.execute("DELETE FROM news_articles WHERE url = 'http://x/old'")
+        cursor.execute('SELECT ticker FROM article_tickers')
+        assert [row[0] for row in cursor.fetchall()] == ['RELIANCE.NS']
+    assert crawler.get_news_by_ticker('TCS') == []
+
+
+def test_search_news_full_text(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+
+    monkeypatch.chdir(tmp_path)
+    crawler = StockNewsCrawler(use_firecrawl=False)
+    now = datetime.now()
+    crawler.store_news_batch([
+        {'title': 'Reliance profit surges', 'content': 'Quarterly earnings beat estimates',
+         'url': 'http://x/1', 'crawled_at': now.isoformat()},
+        {'title': 'Bank stocks slide', 'content': 'Reliance and HDFC among laggards',
+         'url': 'http://x/2', 'crawled_at': now.isoformat()},
+        {'title': 'Old Reliance story', 'content': 'Archived',
+         'url': 'http://x/3', 'crawled_at': (now - timedelta(days=90)).isoformat()},
+    ])
+
+    results = crawler.search_news('reliance', since=now - timedelta(days=1))
+    # Title hits rank above body-only hits; old articles are excluded
+    assert [a['url'] for a in results] == ['http://x/1', 'http://x/2']
+    assert [a['url'] for a in crawler.search_news('earning')] == ['http://x/1']
+
+    # Updates are re-indexed by the triggers
+    crawler.store_news_batch([{'title': 'Bank stocks rebound', 'content': 'HDFC leads',
+                               'url': 'http://x/2', 'crawled_at': now.isoformat()}])
+    assert [a['url'] for a in crawler.search_news('reliance', since=now - timedelta(days=1))] == ['http://x/1']
+    assert crawler.search_news('"unbalanced') == []
+
+
+def test_near_duplicate_stories_collapse(tmp_path, monkeypatch):
+    from datetime import datetime
+    from crawler.dedup import hamming_distance, simhash
+
+    monkeypatch.chdir(tmp_path)
+    crawler = StockNewsCrawler(use_firecrawl=False)
+    now = datetime.now().isoformat()
+    story = ('Reliance Industries reported a 12 percent rise in quarterly net profit on Friday, '
+             'driven by strong refining margins and growth in its retail and telecom businesses, '
+             'beating analyst estimates for the third straight quarter.')
+    articles = [
+        {'title': 'Reliance Q3 profit rises 12%', 'content': story,
+         'url': 'http://a/1', 'source': 'a', 'crawled_at': now},
+        {'title': 'Reliance Q3 profit rises 12%', 'content': story + ' Shares rose 2 percent.',
+         'url': 'http://b/1', 'source': 'b', 'crawled_at': now},
+        {'title': 'HDFC Bank cuts lending rates', 'content': 'HDFC Bank lowered its benchmark lending rate by 10 basis points.',
+         'url': 'http://a/2', 'source': 'a', 'crawled_at': now},
+    ]
+    assert hamming_distance(simhash(articles[0]['title'] + '\n' + story),
+                            simhash(articles[1]['title'] + '\n' + articles[1]['content'])) <= 7
+
+    crawler.store_news_batch(articles)
+    stories = crawler._collapse_near_duplicates(articles)
+    assert [a['url'] for a in stories] == ['http://a/1', 'http://a/2']
+    assert stories[0]['duplicates'] == [{'title': articles[1]['title'], 'url': 'http://b/1', 'source': 'b'}]
+    assert sorted(a['url'] for a in crawler.get_recent_news()) == ['http://a/1', 'http://a/2']
+
+    # A copy listed before its story joins it; re-storing keeps clusters stable
+    repeat = [dict(articles[1], url='http://c/1', source='c'), dict(articles[0])]
+    crawler.store_news_batch(repeat)
+    assert [a['url'] for a in crawler._collapse_near_duplicates(repeat)] == ['http://a/1']
+    assert repeat[1]['duplicates'] == [{'title': articles[1]['title'], 'url': 'http://c/1', 'source': 'c'}]
+
+    # A copy of a story from an earlier crawl, without the story in the batch, is dropped
+    later = [dict(articles[1], url='http://d/1', source='d')]
+    crawler.store_news_batch(later)
+    assert crawler._collapse_near_duplicates(later) == []
+
+
+def test_incremental_recrawl_uses_validators_and_skips_seen(tmp_path, monkeypatch):
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    monkeypatch.chdir(tmp_path)
+    item = '<item><guid>{0}</guid><title>{1}</title><link>http://example.com/{0}</link>' \
+           '<description>Stock market update</description></item>'
+    site = {
+        '/rss.xml': ('"v1"', None, '<rss version="2.0"><channel>' + item.format('g1', 'Sensex gains') + '</channel></rss>'),
+        '/list': (None, 'Mon, 05 Oct 2026 10:00:00 GMT',
+                  '<h2><a href="/a1" title="Reliance profit rises">x</a></h2>'),
+        '/a1': (None, None, '<div class="article-content">Reliance stock up on earnings</div>'),
+        '/a2': (None, None, '<div class="article-content">TCS stock climbs on strong earnings</div>'),
+    }
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            etag, last_modified, body = site[self.path]
+            if (etag and self.headers.get('If-None-Match') == etag) or \
+                    (last_modified and self.headers.get('If-Modified-Since') == last_modified):
+                requests_seen.append((self.path, 304))
+                self.send_response(304)
+                self.end_headers()
+                return
+            requests_seen.append((self.path, 200))
+            self.send_response(200)
+            if etag:
+                self.send_header('ETag', etag)
+            if last_modified:
+                self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        crawler = StockNewsCrawler(use_firecrawl=False)
+        crawler.rss_feeds = {'stub': base + '/rss.xml'}
+        crawler.sources = {'stub': {'name': 'Stub', 'base_url': base, 'news_urls': [base + '/list'],
+                                    'selectors': {'headlines': 'h2 a', 'content': '.article-content'}}}
+        crawler.crawl_config = dict(crawler.crawl_config, request_delay=0)
+
+        first = crawler.crawl_all_sources(concurrent=False)
+        assert sorted(a['title'] for a in first) == ['Reliance profit rises', 'Sensex gains']
+
+        # Nothing changed: both pages answer 304 and no article is fetched
+        requests_seen.clear()
+        assert crawler.crawl_all_sources(concurrent=False) == []
+        assert sorted(requests_seen) == [('/list', 304), ('/rss.xml', 304)]
+
+        # New listing entry and feed item: only the new article page is fetched
+        site['/list'] = (None, 'Mon, 05 Oct 2026 11:00:00 GMT',
+                         '<h2><a href="/a1" title="Reliance profit rises">x</a></h2>'
+                         '<h2><a href="/a2" title="TCS shares climb">y</a></h2>')
+        site['/rss.xml'] = ('"v2"', None, '<rss version="2.0"><channel>' + item.format('g1', 'Sensex gains')
+                            + item.format('g2', 'Nifty hits record') + '</channel></rss>')
+        requests_seen.clear()
+        third = crawler.crawl_all_sources(concurrent=True)
+        assert sorted(a['title'] for a in third) == ['Nifty hits record', 'TCS shares climb']
+        assert sorted(requests_seen) == [('/a2', 200), ('/list', 200), ('/rss.xml', 200)]
+    finally:
+        server.shutdown()
+
+def test_thread_connections_close_when_threads_exit(tmp_path):
+    import sqlite3
+    import threading
+    from utils.db import SQLiteConnectionManager
+
+    db = SQLiteConnectionManager(tmp_path / 'threads.db')
+    opened = []
+
+    def work():
+        with db.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        opened.append(db.connection)
+
+    for _ in range(5):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+    assert len(opened) == 5 and not db._connections
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute('SELECT 1')
+
+    # The calling thread keeps its connection until close_all()
+    conn = db.connection
+    assert db.connection is conn and db._connections == {conn}
+    db.close_all()
+    assert not db._connections
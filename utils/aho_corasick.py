@@ -0,0 +1,73 @@
+"""
+Aho-Corasick multi-pattern matching for FinRexent
+"""
+from collections import deque
+from typing import Any, Dict, Hashable, Iterator, List, Sequence, Tuple
+
+
+class AhoCorasick:
+    """Multi-pattern matcher that finds every pattern occurrence in one pass over the input
+
+    Patterns are sequences of hashable symbols: characters of a string, or
+    whole tokens when matching word sequences. Patterns are added with an
+    arbitrary payload, then the automaton is built once and can be reused
+    for any number of searches.
+    """
+
+    def __init__(self):
+        # Trie as parallel arrays: goto transitions, failure links, outputs
+        self._goto: List[Dict[Hashable, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: Sequence[Hashable], payload: Any = None):
+        """Add a pattern; payload is returned with every match of it"""
+        if not pattern:
+            raise ValueError("Pattern must be non-empty")
+        if self._built:
+            raise RuntimeError("Cannot add patterns after the automaton is built")
+
+        state = 0
+        for symbol in pattern:
+            next_state = self._goto[state].get(symbol)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][symbol] = next_state
+            state = next_state
+        self._output[state].append((len(pattern), payload))
+
+    def build(self) -> 'AhoCorasick':
+        """Compute failure links (breadth-first over the trie)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and symbol not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(symbol, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+        return self
+
+    def iter_matches(self, sequence: Sequence[Hashable]) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) for every match, as indexes into sequence"""
+        if not self._built:
+            self.build()
+
+        goto, fail, output = self._goto, self._fail, self._output
+        root = goto[0]
+        state = 0
+        for index, symbol in enumerate(sequence):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0) if state else root.get(symbol, 0)
+            if output[state]:
+                end = index + 1
+                for length, payload in output[state]:
+                    yield end - length, end, payload
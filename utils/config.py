@@ -21,12 +21,42 @@ class Config:
                 'model': 'llama3.1:8b',
                 'timeout': 30,
                 'max_tokens': 2048,
-                'temperature': 0.7
+                'temperature': 0.7,
+                'json_temperature': 0.0,  # structured (JSON) calls decode greedily, so their responses are cached
+                'max_concurrency': 4,  # in-flight requests for AsyncOllamaClient; match OLLAMA_NUM_PARALLEL
+                'json_format': True,  # send format: json for JSON prompts (needs Ollama >= 0.1.9)
+                'num_ctx': 4096,  # context length requested from the server and used to size batched prompts
+                'sentiment_batch_size': 16  # max texts per analyze_sentiment_batch prompt
             },
             'database': {
                 'url': 'sqlite:///data/finrexent.db',
                 'echo': False
             },
+            'memory': {
+                'embedder': 'ollama',  # 'ollama', 'transformers' or 'hashing'
+                'embedding_model': 'nomic-embed-text',
+                'hashing_dim': 512,
+                'embed_batch_size': 64,
+                'ann_min_size': 5000,  # memories before recall switches to the IVF index
+                'ann_nprobe': 8
+            },
+            'models': {
+                'pipelines': {  # loaded on first use by utils.model_registry
+                    'sentiment': {'task': 'sentiment-analysis',
+                                  'model': 'distilbert-base-uncased-finetuned-sst-2-english'},
+                    'ner': {'task': 'ner', 'model': 'dbmdz/bert-large-cased-finetuned-conll03-english'},
+                    'twitter_sentiment': {'task': 'sentiment-analysis',
+                                          'model': 'cardiffnlp/twitter-roberta-base-sentiment-latest'}
+                },
+                'idle_timeout': 1800,  # seconds unused before unload_idle drops a model; 0 keeps models loaded
+                'backend': 'torch',  # 'torch' or 'onnx' (ONNX Runtime, needs optimum[onnxruntime])
+                'onnx': {
+                    'dir': 'data/models/onnx',  # exported and quantized models are cached here
+                    'quantize': True,  # int8 dynamic quantization
+                    'quantization': 'avx2',  # optimum AutoQuantizationConfig preset: avx2, avx512, avx512_vnni, arm64
+                    'intra_op_threads': 0  # 0 = one per physical core
+                }
+            },
             'crawling': {
                 'interval': 3600,  # seconds
                 'max_articles': 100,
@@ -40,7 +70,9 @@ class Config:
                 'macd_slow': 26,
                 'macd_signal': 9,
                 'bollinger_period': 20,
-                'bollinger_std': 2
+                'bollinger_std': 2,
+                'batch_max_workers': 8,  # threads for analyze_many I/O
+                'process_pool_min_tickers': 100  # analyze_many moves indicator math to processes at this size
             },
             'logging': {
                 'level': 'INFO',
@@ -54,9 +86,28 @@ class Config:
                 'min_diversification': 5,  # minimum stocks in portfolio
                 'stop_loss_percentage': 0.05  # 5% stop loss
             },
+            'cache': {
+                'dir': 'data/stocks',
+                'price_max_age': 900,  # seconds before cached bars are topped up
+                'fundamentals_db': 'data/cache/fundamentals.db',
+                'fundamentals_lru_size': 256,
+                'fundamentals_ttl': {  # seconds, per field class
+                    'static': 30 * 24 * 3600,  # name, sector, industry
+                    'daily': 24 * 3600,  # ratios, margins, growth
+                    'intraday': 4 * 3600,  # market cap, PE, price-driven fields
+                    'negative': 3600  # unknown symbols
+                },
+                'llm_db': 'data/cache/llm_responses.db',
+                'llm_ttl': 7 * 24 * 3600,  # seconds
+                'llm_max_entries': 20000,
+                'llm_max_bytes': 64 * 1024 * 1024,
+                'llm_max_temperature': 0.0  # requests sampled hotter are not cached; raise to cache sampled output too
+            },
             'indian_markets': {
                 'nse_suffix': '.NS',
                 'bse_suffix': '.BO',
+                'symbol_lists_dir': 'data/symbols',  # NSE/BSE equity list CSVs and aliases.csv
+                'symbol_fuzzy_threshold': 0.5,  # trigram similarity needed for a fuzzy name match
                 'market_hours': {
                     'start': '09:15',
                     'end': '15:30',
@@ -84,6 +135,7 @@ class Config:
             'MAX_NEWS_ARTICLES': ('crawling', 'max_articles'),
             'LOG_LEVEL': ('logging', 'level'),
             'LOG_FILE': ('logging', 'file'),
+            'STOCK_CACHE_DIR': ('cache', 'dir'),
         }
         
         for env_var, config_path in env_mappings.items():
@@ -154,6 +206,14 @@ class Config:
         """Get database configuration"""
         return self.config['database']
     
+    def get_memory_config(self) -> Dict[str, Any]:
+        """Get semantic memory configuration"""
+        return self.config['memory']
+    
+    def get_models_config(self) -> Dict[str, Any]:
+        """Get NLP model registry configuration"""
+        return self.config['models']
+    
     def get_crawling_config(self) -> Dict[str, Any]:
         """Get crawling configuration"""
         return self.config['crawling']
@@ -170,6 +230,10 @@ class Config:
         """Get risk management configuration"""
         return self.config['risk']
     
+    def get_cache_config(self) -> Dict[str, Any]:
+        """Get local data cache configuration"""
+        return self.config['cache']
+    
     def get_indian_markets_config(self) -> Dict[str, Any]:
         """Get Indian markets configuration"""
         return self.config['indian_markets']
@@ -0,0 +1,130 @@
+"""
+SQLite connection management for FinRexent
+"""
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Set, Union
+
+
+class _ThreadConnection:
+    """Holder stored in the thread-local; dropped when its thread exits"""
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release(conn: sqlite3.Connection, connections: Set[sqlite3.Connection], lock: threading.Lock):
+    with lock:
+        connections.discard(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class SQLiteConnectionManager:
+    """Thread-local persistent SQLite connections with tuned pragmas
+
+    Each thread lazily opens one connection to the database and keeps it for
+    its lifetime, so connect cost, schema parsing and the prepared-statement
+    cache are paid once per thread rather than once per call. WAL journaling
+    lets readers proceed while one writer commits. A thread's connection is
+    closed when the thread exits, so short-lived worker threads do not leave
+    open handles behind. Foreign-key enforcement is opt-in per database.
+    """
+
+    def __init__(self,
+                 db_path: Union[str, Path],
+                 synchronous: str = 'NORMAL',
+                 cache_size_kb: int = 20000,
+                 busy_timeout_ms: int = 5000,
+                 cached_statements: int = 256,
+                 foreign_keys: bool = False):
+        self.db_path = Path(db_path)
+        self.synchronous = synchronous
+        self.cache_size_kb = cache_size_kb
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.foreign_keys = foreign_keys
+
+        self._local = threading.local()
+        self._connections: Set[sqlite3.Connection] = set()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection and apply pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,  # transactions are managed explicitly
+            check_same_thread=False,  # only so close_all() can run from any thread
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size=-{self.cache_size_kb}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA busy_timeout={self.busy_timeout_ms}')
+        if self.foreign_keys:
+            # Off by default in SQLite; needed for REFERENCES ... ON DELETE CASCADE to take effect
+            conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use"""
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            conn = self._connect()
+            holder = _ThreadConnection(conn)
+            # Thread-local values are released when their thread finishes
+            weakref.finalize(holder, _release, conn, self._connections, self._lock)
+            self._local.holder = holder
+            with self._lock:
+                self._connections.add(conn)
+        return holder.conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run a write transaction; commits on success, rolls back on error
+
+        BEGIN IMMEDIATE takes the write lock up front so read-then-write
+        sequences wait on busy_timeout instead of failing with SQLITE_BUSY.
+        """
+        conn = self.connection
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield cursor
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def cursor(self) -> Iterator[sqlite3.Cursor]:
+        """Cursor for read-only queries in autocommit mode"""
+        cursor = self.connection.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def close_all(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
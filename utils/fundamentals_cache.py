@@ -0,0 +1,221 @@
+"""
+Fundamentals cache for FinRexent
+
+Caches ``yf.Ticker(symbol).info`` field by field with per-field TTLs:
+names and sectors are kept for weeks, ratios for a day and price-driven
+fields (market cap, PE) for a few hours. An in-process LRU sits in front
+of a SQLite store so repeat lookups within a run cost a dict access and
+lookups across runs never hit the network while fields are fresh.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .config import config
+from .db import SQLiteConnectionManager
+from .logger import logger
+
+# Marker field recording that a symbol has no data (unknown ticker)
+MISSING_FIELD = '__missing__'
+
+# Field -> TTL class; fields not listed use 'daily'
+FIELD_TTL_CLASSES = {
+    'static': ['symbol', 'longName', 'shortName', 'sector', 'industry', 'country', 'website',
+               'exchange', 'currency', 'quoteType', 'longBusinessSummary', 'isin'],
+    'intraday': ['marketCap', 'trailingPE', 'forwardPE', 'priceToBook', 'currentPrice',
+                 'previousClose', 'regularMarketPrice', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow',
+                 'fiftyDayAverage', 'twoHundredDayAverage', 'dividendYield', 'enterpriseValue'],
+}
+
+Fetcher = Callable[[str], Optional[Dict[str, Any]]]
+
+
+def yfinance_info_fetcher(symbol: str) -> Optional[Dict[str, Any]]:
+    """Fetch the raw info dict from Yahoo Finance"""
+    import yfinance as yf
+
+    return yf.Ticker(symbol).info
+
+
+class FundamentalsCache:
+    """Per-field TTL cache for ticker fundamentals: LRU in memory, SQLite on disk
+
+    A lookup names the fields it needs; if any of them is missing or past
+    its TTL the full info dict is fetched once and every field is stored.
+    Concurrent lookups of one symbol share a single fetch. Unknown symbols
+    are remembered for the 'negative' TTL so they are not retried on every
+    call.
+    """
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 lru_size: Optional[int] = None,
+                 ttls: Optional[Dict[str, float]] = None,
+                 fetcher: Optional[Fetcher] = None):
+        cache_config = config.get_cache_config()
+        self.db_path = Path(db_path or cache_config['fundamentals_db'])
+        self.lru_size = lru_size or cache_config['fundamentals_lru_size']
+        self.ttls = dict(cache_config['fundamentals_ttl'], **(ttls or {}))
+        self.fetcher = fetcher or yfinance_info_fetcher
+
+        self._field_ttl_class = {field: ttl_class
+                                 for ttl_class, fields in FIELD_TTL_CLASSES.items()
+                                 for field in fields}
+        self._db: Optional[SQLiteConnectionManager] = None
+        self._lru: 'OrderedDict[str, Dict[str, Tuple[Any, float]]]' = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        self._stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
+
+    def _database(self) -> SQLiteConnectionManager:
+        """Open the store on first use so importing the module creates no files"""
+        if self._db is None:
+            with self._lru_lock:
+                if self._db is None:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    db = SQLiteConnectionManager(self.db_path)
+                    with db.transaction() as cursor:
+                        cursor.execute('''
+                            CREATE TABLE IF NOT EXISTS info_fields (
+                                symbol TEXT NOT NULL,
+                                field TEXT NOT NULL,
+                                value TEXT,
+                                fetched_at REAL NOT NULL,
+                                PRIMARY KEY (symbol, field)
+                            ) WITHOUT ROWID
+                        ''')
+                    self._db = db
+        return self._db
+
+    def ttl(self, field: str) -> float:
+        """Seconds a cached value of field stays fresh"""
+        if field == MISSING_FIELD:
+            return self.ttls['negative']
+        return self.ttls[self._field_ttl_class.get(field, 'daily')]
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since startup: hits, misses, refreshes, errors"""
+        with self._lru_lock:
+            return dict(self._stats)
+
+    def _count(self, stat: str):
+        with self._lru_lock:
+            self._stats[stat] += 1
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lru_lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _cached_fields(self, symbol: str) -> Optional[Dict[str, Tuple[Any, float]]]:
+        """Fields for symbol from the LRU, falling back to SQLite"""
+        with self._lru_lock:
+            fields = self._lru.get(symbol)
+            if fields is not None:
+                self._lru.move_to_end(symbol)
+                return fields
+
+        with self._database().cursor() as cursor:
+            cursor.execute('SELECT field, value, fetched_at FROM info_fields WHERE symbol = ?', (symbol,))
+            rows = cursor.fetchall()
+        if not rows:
+            return None
+        fields = {field: (json.loads(value), fetched_at) for field, value, fetched_at in rows}
+        self._remember(symbol, fields)
+        return fields
+
+    def _remember(self, symbol: str, fields: Dict[str, Tuple[Any, float]]):
+        with self._lru_lock:
+            self._lru[symbol] = fields
+            self._lru.move_to_end(symbol)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _is_fresh(self, fields: Dict[str, Tuple[Any, float]], wanted: Iterable[str], now: float) -> bool:
+        missing = fields.get(MISSING_FIELD)
+        if missing is not None:
+            return now - missing[1] <= self.ttl(MISSING_FIELD)
+        for field in wanted:
+            entry = fields.get(field)
+            if entry is None or now - entry[1] > self.ttl(field):
+                return False
+        return True
+
+    def _store(self, symbol: str, info: Optional[Dict[str, Any]], wanted: Iterable[str],
+               now: float) -> Dict[str, Tuple[Any, float]]:
+        """Replace symbol's cached fields with a fresh fetch"""
+        if not info or 'symbol' not in info:
+            fields = {MISSING_FIELD: (True, now)}
+        else:
+            fields = {field: (value, now) for field, value in info.items()}
+            # Remember fields the source does not provide so they are not refetched
+            for field in wanted:
+                fields.setdefault(field, (None, now))
+
+        with self._database().transaction() as cursor:
+            cursor.execute('DELETE FROM info_fields WHERE symbol = ?', (symbol,))
+            cursor.executemany(
+                'INSERT INTO info_fields (symbol, field, value, fetched_at) VALUES (?, ?, ?, ?)',
+                [(symbol, field, json.dumps(value, default=str), fetched_at)
+                 for field, (value, fetched_at) in fields.items()]
+            )
+        self._remember(symbol, fields)
+        return fields
+
+    @staticmethod
+    def _as_info(fields: Dict[str, Tuple[Any, float]]) -> Optional[Dict[str, Any]]:
+        if MISSING_FIELD in fields:
+            return None
+        return {field: value for field, (value, _) in fields.items() if value is not None}
+
+    def get_info(self, symbol: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Info dict for symbol (same keys as yf.Ticker(symbol).info), or None if unknown
+
+        fields lists the keys the caller needs; only their TTLs decide
+        whether to refetch. With no fields, 'symbol' must be fresh.
+        """
+        symbol = symbol.upper()
+        wanted = list(fields) if fields is not None else ['symbol']
+
+        cached = self._cached_fields(symbol)
+        if cached is not None and self._is_fresh(cached, wanted, time.time()):
+            self._count('hits')
+            return self._as_info(cached)
+
+        with self._symbol_lock(symbol):
+            # Another thread may have refreshed while we waited
+            cached = self._cached_fields(symbol)
+            now = time.time()
+            if cached is not None and self._is_fresh(cached, wanted, now):
+                self._count('hits')
+                return self._as_info(cached)
+
+            self._count('refreshes' if cached is not None else 'misses')
+            try:
+                info = self.fetcher(symbol)
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Error fetching fundamentals for {symbol}: {e}")
+                # Stale data beats no data when the source is unreachable
+                return self._as_info(cached) if cached is not None else None
+
+            return self._as_info(self._store(symbol, info, wanted, now))
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop cached fundamentals for one symbol, or for every symbol"""
+        with self._lru_lock:
+            if symbol is None:
+                self._lru.clear()
+            else:
+                self._lru.pop(symbol.upper(), None)
+        with self._database().transaction() as cursor:
+            if symbol is None:
+                cursor.execute('DELETE FROM info_fields')
+            else:
+                cursor.execute('DELETE FROM info_fields WHERE symbol = ?', (symbol.upper(),))
+
+
+# Global fundamentals cache instance
+fundamentals_cache = FundamentalsCache()
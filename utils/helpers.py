@@ -6,7 +6,8 @@ import json
 import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import yfinance as yf
+
+from .fundamentals_cache import fundamentals_cache
 
 def clean_company_name(name: str) -> str:
     """Clean and standardize company names"""
@@ -142,8 +143,10 @@ def get_stock_info(ticker: str) -> Optional[Dict[str, Any]]:
         if not ticker.endswith(('.NS', '.BO')):
             ticker = ticker + '.NS'
         
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = fundamentals_cache.get_info(ticker, [
+            'symbol', 'longName', 'sector', 'industry', 'marketCap',
+            'trailingPE', 'dividendYield', 'beta'
+        ])
         
         if not info or 'symbol' not in info:
             return None
@@ -0,0 +1,221 @@
+"""
+LLM response cache for FinRexent
+
+Ollama responses are stored in SQLite keyed by a hash of everything that
+determines the output: model, system prompt, prompt and sampling options.
+The same headline syndicated across several feeds is then scored once.
+Entries expire after a TTL and the least recently used ones are evicted
+when the store exceeds its entry or byte limit.
+
+Lookups are plain reads: hits are remembered in memory and their
+last_used times written in batches, at the latest before the next
+eviction. Only deterministic requests are cached by default; sampled
+output (temperature > 0) is cached only when ``max_temperature`` is
+raised.
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import config
+from .db import SQLiteConnectionManager
+from .logger import logger
+
+
+class LLMResponseCache:
+    """Persistent prompt -> response cache with TTL and LRU eviction
+
+    Requests whose temperature is above ``max_temperature`` bypass the
+    cache, so sampled requests get fresh samples unless the caller opts in.
+    Entry and byte totals are kept in memory per instance; eviction runs
+    only when a store pushes them past the limits.
+    """
+
+    TOUCH_BATCH = 64  # buffered last_used updates written per transaction
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 max_temperature: Optional[float] = None):
+        cache_config = config.get_cache_config()
+        self.db_path = Path(db_path or cache_config['llm_db'])
+        self.ttl = cache_config['llm_ttl'] if ttl is None else ttl
+        self.max_entries = max_entries or cache_config['llm_max_entries']
+        self.max_bytes = max_bytes or cache_config['llm_max_bytes']
+        self.max_temperature = cache_config['llm_max_temperature'] if max_temperature is None else max_temperature
+
+        self._db: Optional[SQLiteConnectionManager] = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0, 'evictions': 0}
+        self._touched: Dict[str, float] = {}  # key -> last hit, not yet written
+        self._entries = 0
+        self._bytes = 0
+
+    def _database(self) -> SQLiteConnectionManager:
+        """Open the store on first use so importing the module creates no files"""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    db = SQLiteConnectionManager(self.db_path)
+                    with db.transaction() as cursor:
+                        cursor.execute('''
+                            CREATE TABLE IF NOT EXISTS llm_responses (
+                                key TEXT PRIMARY KEY,
+                                model TEXT,
+                                response TEXT NOT NULL,
+                                size INTEGER NOT NULL,
+                                created_at REAL NOT NULL,
+                                last_used REAL NOT NULL
+                            ) WITHOUT ROWID
+                        ''')
+                        cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used '
+                                       'ON llm_responses(last_used)')
+                        cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses')
+                        self._entries, self._bytes = cursor.fetchone()
+                    self._db = db
+        return self._db
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters since startup plus hit_rate over cacheable lookups"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        """Hash of the request fields that determine the response"""
+        material = {k: v for k, v in payload.items() if k != 'stream'}
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+
+    def cacheable(self, payload: Dict[str, Any]) -> bool:
+        return payload.get('options', {}).get('temperature', 0) <= self.max_temperature
+
+    def get(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Cached response for an Ollama request payload, or None"""
+        if not self.cacheable(payload):
+            self._count('bypassed')
+            return None
+
+        key = self.key(payload)
+        now = time.time()
+        try:
+            with self._database().cursor() as cursor:
+                cursor.execute('SELECT response, created_at FROM llm_responses WHERE key = ?', (key,))
+                row = cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error reading LLM response cache: {e}")
+            row = None
+        # Expired rows are left in place; the next put of this key replaces them
+        if row is not None and now - row[1] > self.ttl:
+            row = None
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        with self._lock:
+            self._touched[key] = now
+            flush = len(self._touched) >= self.TOUCH_BATCH
+        if flush:
+            try:
+                with self._database().transaction() as cursor:
+                    self._write_touched(cursor)
+            except Exception as e:
+                logger.error(f"Error writing LLM response cache: {e}")
+        return row[0]
+
+    def _write_touched(self, cursor):
+        """Write buffered last_used times for entries hit since the last write"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            cursor.executemany('UPDATE llm_responses SET last_used = ? WHERE key = ?',
+                               [(last_used, key) for key, last_used in touched.items()])
+
+    def put(self, payload: Dict[str, Any], response: str):
+        """Store a response, evicting least recently used entries past the limits"""
+        if not response or not self.cacheable(payload):
+            return
+        key = self.key(payload)
+        size = len(response.encode())
+        now = time.time()
+        db = self._database()
+        try:
+            with db.transaction() as cursor:
+                cursor.execute('SELECT size FROM llm_responses WHERE key = ?', (key,))
+                replaced = cursor.fetchone()
+                cursor.execute(
+                    'INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, last_used) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, payload.get('model'), response, size, now, now)
+                )
+                entries = self._entries + (replaced is None)
+                total_bytes = self._bytes + size - (replaced[0] if replaced else 0)
+                evicted = 0
+                if entries > self.max_entries or total_bytes > self.max_bytes:
+                    # Recent hits must count before choosing what to evict
+                    self._write_touched(cursor)
+                    # Walks the last_used index and stops as soon as enough rows are found
+                    cursor.execute('SELECT key, size FROM llm_responses WHERE key != ? '
+                                   'ORDER BY last_used', (key,))
+                    victims = []
+                    for victim, victim_size in cursor:
+                        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                            break
+                        victims.append((victim,))
+                        entries -= 1
+                        total_bytes -= victim_size
+                    cursor.executemany('DELETE FROM llm_responses WHERE key = ?', victims)
+                    evicted = len(victims)
+        except Exception as e:
+            logger.error(f"Error writing LLM response cache: {e}")
+            return
+
+        with self._lock:
+            self._entries, self._bytes = entries, total_bytes
+
+        self._count('stores')
+        if evicted > 0:
+            self._count('evictions', evicted)
+
+    def discard(self, payload: Dict[str, Any]):
+        """Drop the cached response for one request payload"""
+        key = self.key(payload)
+        try:
+            with self._database().transaction() as cursor:
+                cursor.execute('SELECT size FROM llm_responses WHERE key = ?', (key,))
+                removed = cursor.fetchone()
+                cursor.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+        except Exception as e:
+            logger.error(f"Error writing LLM response cache: {e}")
+            return
+        with self._lock:
+            self._touched.pop(key, None)
+            if removed is not None:
+                self._entries -= 1
+                self._bytes -= removed[0]
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._database().transaction() as cursor:
+            cursor.execute('DELETE FROM llm_responses')
+        with self._lock:
+            self._touched.clear()
+            self._entries = self._bytes = 0
+
+
+# Global LLM response cache instance
+llm_cache = LLMResponseCache()
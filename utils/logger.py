@@ -80,9 +80,16 @@ class FinRexentLogger:
         """Log news crawling results"""
         self.info(f"News Crawled - {source}: {count} articles")
     
-    def log_llm_request(self, model: str, prompt_length: int, response_time: float):
+    def log_llm_request(self, model: str, prompt_length: int, response_time: float,
+                        time_to_first_token: Optional[float] = None,
+                        tokens_per_second: Optional[float] = None):
         """Log LLM request details"""
-        self.debug(f"LLM Request - Model: {model}, Prompt Length: {prompt_length}, Response Time: {response_time:.2f}s")
+        message = f"LLM Request - Model: {model}, Prompt Length: {prompt_length}, Response Time: {response_time:.2f}s"
+        if time_to_first_token is not None:
+            message += f", TTFT: {time_to_first_token:.2f}s"
+        if tokens_per_second is not None:
+            message += f", Tokens/s: {tokens_per_second:.1f}"
+        self.debug(message)
     
     def log_error_with_context(self, error: Exception, context: str):
         """Log error with additional context"""
@@ -0,0 +1,169 @@
+"""
+Process-wide registry of transformers pipelines for FinRexent
+
+Pipelines are registered by name (task + model) and built on first use,
+so importing the agent or calling non-NLP methods loads no model. Every
+agent and thread shares one instance per name. Models can be pre-warmed
+at service start and unloaded once idle for ``idle_timeout`` seconds.
+"""
+import gc
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .config import config
+from .logger import logger
+
+Loader = Callable[..., Any]
+
+
+def transformers_pipeline_loader(task: str, model: str, **kwargs) -> Any:
+    """Build a transformers pipeline (imported here so it is only paid for on first load)"""
+    from transformers import pipeline
+
+    return pipeline(task, model=model, **kwargs)
+
+
+def default_pipeline_loader(task: str, model: str, backend: Optional[str] = None, **kwargs) -> Any:
+    """Load through the spec's backend, or models.backend: 'torch' or 'onnx'"""
+    backend = backend or config.get_models_config().get('backend', 'torch')
+    if backend == 'onnx':
+        from .onnx_backend import onnx_pipeline_loader
+
+        return onnx_pipeline_loader(task, model, **kwargs)
+    if backend != 'torch':
+        logger.warning(f"Unknown model backend {backend!r}; using torch")
+    return transformers_pipeline_loader(task, model, **kwargs)
+
+
+class ModelRegistry:
+    """Lazily loaded, shared model instances keyed by name
+
+    Loads are serialized per name, so concurrent first calls build the
+    model once. Calls into a shared pipeline are not synchronized.
+    """
+
+    def __init__(self,
+                 specs: Optional[Dict[str, Dict[str, Any]]] = None,
+                 idle_timeout: Optional[float] = None,
+                 loader: Optional[Loader] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        models_config = config.get_models_config()
+        self.idle_timeout = idle_timeout if idle_timeout is not None else models_config['idle_timeout']
+        self.loader = loader or default_pipeline_loader
+        self.clock = clock
+
+        self._specs: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}
+        self._models: Dict[str, Any] = {}
+        self._last_used: Dict[str, float] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {'loads': 0, 'unloads': 0, 'load_seconds': 0.0}
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+
+        for name, spec in (specs if specs is not None else models_config['pipelines']).items():
+            spec = dict(spec)
+            self.register(name, spec.pop('task'), spec.pop('model'), **spec)
+
+    def register(self, name: str, task: str, model: str, **kwargs):
+        """Declare a pipeline; re-registering a loaded name with a new spec unloads it"""
+        with self._lock:
+            spec = (task, model, kwargs)
+            if self._specs.get(name) not in (None, spec):
+                self._models.pop(name, None)
+            self._specs[name] = spec
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """The shared instance for name, loading it on first use"""
+        with self._lock:
+            if name not in self._specs:
+                raise KeyError(f"Unknown model {name!r}")
+            self._last_used[name] = self.clock()
+            model = self._models.get(name)
+            load_lock = self._load_locks[name]
+        if model is not None:
+            return model
+
+        with load_lock:
+            model = self._models.get(name)
+            if model is None:
+                task, model_name, kwargs = self._specs[name]
+                logger.info(f"Loading {task} model {model_name}")
+                start = time.perf_counter()
+                model = self.loader(task, model_name, **kwargs)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._models[name] = model
+                    self._last_used[name] = self.clock()
+                    self._stats['loads'] += 1
+                    self._stats['load_seconds'] += elapsed
+                logger.info(f"Loaded {model_name} in {elapsed:.2f}s")
+        return model
+
+    def warm(self, names: Optional[Iterable[str]] = None):
+        """Load models ahead of the first request (all registered ones by default)"""
+        for name in list(names if names is not None else self._specs):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Error pre-loading model {name}: {e}")
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def unload(self, name: str) -> bool:
+        """Drop the shared instance; the next get() reloads it"""
+        with self._lock:
+            model = self._models.pop(name, None)
+            if model is None:
+                return False
+            self._stats['unloads'] += 1
+        del model
+        gc.collect()
+        # Return cached GPU memory if torch is in use
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info(f"Unloaded model {name}")
+        return True
+
+    def unload_idle(self, idle_timeout: Optional[float] = None) -> List[str]:
+        """Unload models not used for idle_timeout seconds; returns their names"""
+        idle_timeout = self.idle_timeout if idle_timeout is None else idle_timeout
+        if not idle_timeout:
+            return []
+        now = self.clock()
+        with self._lock:
+            idle = [name for name in self._models if now - self._last_used.get(name, now) >= idle_timeout]
+        return [name for name in idle if self.unload(name)]
+
+    def start_idle_reaper(self, interval: float = 60):
+        """Unload idle models from a background thread every interval seconds"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._stop_reaper.clear()
+
+        def reap():
+            while not self._stop_reaper.wait(interval):
+                self.unload_idle()
+
+        self._reaper = threading.Thread(target=reap, name='model-registry-reaper', daemon=True)
+        self._reaper.start()
+
+    def stop_idle_reaper(self):
+        self._stop_reaper.set()
+        if self._reaper is not None:
+            self._reaper.join()
+            self._reaper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Registered and loaded model names, load/unload counts and total load time"""
+        with self._lock:
+            return {'registered': sorted(self._specs), 'loaded': sorted(self._models), **self._stats}
+
+
+# Global model registry instance
+model_registry = ModelRegistry()
@@ -0,0 +1,85 @@
+"""
+ONNX Runtime backend for FinRexent's transformers pipelines
+
+Exports a Hugging Face model to ONNX once (cached under ``models.onnx.dir``),
+optionally applies int8 dynamic quantization, and wraps the ONNX Runtime
+session in a regular transformers pipeline so callers see the same output
+format as the PyTorch path. Requires ``optimum[onnxruntime]``.
+"""
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import config
+from .logger import logger
+
+# Pipeline task -> optimum ORTModel class name
+ORT_MODEL_CLASSES = {
+    'sentiment-analysis': 'ORTModelForSequenceClassification',
+    'text-classification': 'ORTModelForSequenceClassification',
+    'ner': 'ORTModelForTokenClassification',
+    'token-classification': 'ORTModelForTokenClassification',
+}
+
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model_quantized.onnx'
+
+
+def export_dir(model: str, base_dir: Optional[str] = None) -> Path:
+    """Cache directory for a model's ONNX export"""
+    base_dir = Path(base_dir or config.get_models_config()['onnx']['dir'])
+    return base_dir / re.sub(r'[^A-Za-z0-9._-]+', '--', model)
+
+
+def export_model(task: str, model: str, quantize: bool = True, quantization: str = 'avx2',
+                 base_dir: Optional[str] = None) -> Path:
+    """Export (and quantize) a model unless already cached; returns the ONNX file to load"""
+    import optimum.onnxruntime as ort_models
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    target = export_dir(model, base_dir)
+    if not (target / FP32_FILE).exists():
+        logger.info(f"Exporting {model} to ONNX in {target}")
+        model_class = getattr(ort_models, ORT_MODEL_CLASSES[task])
+        model_class.from_pretrained(model, export=True).save_pretrained(target)
+        AutoTokenizer.from_pretrained(model).save_pretrained(target)
+
+    if not quantize:
+        return target / FP32_FILE
+
+    if not (target / INT8_FILE).exists():
+        logger.info(f"Quantizing {model} to int8 ({quantization})")
+        # Dynamic quantization: int8 weights, activations quantized per batch at run time
+        quantization_config = getattr(AutoQuantizationConfig, quantization)(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(target, file_name=FP32_FILE).quantize(
+            save_dir=target, quantization_config=quantization_config
+        )
+    return target / INT8_FILE
+
+
+def onnx_pipeline_loader(task: str, model: str, onnx_options: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+    """transformers pipeline running model through ONNX Runtime on CPU
+
+    onnx_options override the models.onnx config (quantize, quantization,
+    intra_op_threads, dir); remaining kwargs go to the pipeline.
+    """
+    import onnxruntime
+    import optimum.onnxruntime as ort_models
+    from transformers import AutoTokenizer, pipeline
+
+    options = dict(config.get_models_config()['onnx'], **(onnx_options or {}))
+    onnx_file = export_model(task, model, options['quantize'], options['quantization'], options['dir'])
+
+    session_options = onnxruntime.SessionOptions()
+    # 0 lets ONNX Runtime use one thread per physical core
+    session_options.intra_op_num_threads = options['intra_op_threads']
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    model_class = getattr(ort_models, ORT_MODEL_CLASSES[task])
+    ort_model = model_class.from_pretrained(onnx_file.parent, file_name=onnx_file.name,
+                                            session_options=session_options,
+                                            provider='CPUExecutionProvider')
+    tokenizer = AutoTokenizer.from_pretrained(onnx_file.parent)
+    return pipeline(task, model=ort_model, tokenizer=tokenizer, **kwargs)
@@ -0,0 +1,412 @@
+"""
+On-disk price history cache for FinRexent
+
+Bars are stored per symbol and interval as NumPy arrays under
+``data/stocks/<SYMBOL>/<interval>/``:
+
+    index.npy   int64 bar timestamps (UTC nanoseconds)
+    values.npy  float64 matrix, one column per OHLCV field
+    meta.json   columns, timezone, covered range and last fetch time
+
+Reads memory-map the arrays and copy them into a new DataFrame, so
+callers can modify what they get back. When the cached bars are older
+than ``price_max_age`` seconds, only bars from the last cached one onward
+are downloaded and merged in.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import config
+from .logger import logger
+
+# fetcher(symbol, start, end, interval) -> DataFrame of bars; start=None means full history
+Fetcher = Callable[[str, Optional[pd.Timestamp], Optional[pd.Timestamp], str], pd.DataFrame]
+# batch_fetcher(symbols, start, interval) -> {symbol: DataFrame of bars}
+BatchFetcher = Callable[[List[str], Optional[pd.Timestamp], str], Dict[str, pd.DataFrame]]
+
+_PERIOD_PATTERN = re.compile(r'^(\d+)(d|wk|mo|y)$')
+
+# np.load parses .npy headers with ast.literal_eval, which CPython 3.11 can fail
+# with "AST constructor recursion depth mismatch" when run in several threads at once
+_NPY_LOAD_LOCK = threading.Lock()
+
+
+def _naive_utc_index(frame: pd.DataFrame) -> pd.DatetimeIndex:
+    return frame.index.tz_convert('UTC').tz_localize(None) if frame.index.tz is not None else frame.index
+
+
+def _naive_utc(value) -> pd.Timestamp:
+    """Timestamp as naive UTC, the form used for cache bounds"""
+    value = pd.Timestamp(value)
+    return value.tz_convert('UTC').tz_localize(None) if value.tz is not None else value
+
+
+def yfinance_fetcher(symbol: str, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp],
+                     interval: str) -> pd.DataFrame:
+    """Download bars from Yahoo Finance"""
+    import yfinance as yf
+
+    stock = yf.Ticker(symbol)
+    if start is None:
+        return stock.history(period='max', interval=interval)
+    return stock.history(start=start, end=end, interval=interval)
+
+
+def yfinance_batch_fetcher(symbols: List[str], start: Optional[pd.Timestamp],
+                           interval: str) -> Dict[str, pd.DataFrame]:
+    """Download bars for many symbols in one yf.download call"""
+    import yfinance as yf
+
+    kwargs = {'start': start} if start is not None else {'period': 'max'}
+    data = yf.download(symbols, interval=interval, group_by='ticker', actions=True,
+                       auto_adjust=True, ignore_tz=False, threads=True, progress=False, **kwargs)
+    if data is None or data.empty:
+        return {}
+
+    frames = {}
+    for symbol in symbols:
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            frame = data[symbol]
+        else:
+            frame = data
+        frame = frame.dropna(subset=['Close'])
+        if not frame.empty:
+            frames[symbol] = frame
+    return frames
+
+
+def _align_tz(frame: pd.DataFrame, tz) -> pd.DataFrame:
+    """Express frame's index in tz (naive indexes are taken to be in tz already)"""
+    if tz is None or frame.index.tz is not None and str(frame.index.tz) == str(tz):
+        return frame
+    if frame.index.tz is None:
+        return frame.tz_localize(tz)
+    return frame.tz_convert(tz)
+
+
+def period_start(period: str, now: pd.Timestamp) -> Optional[pd.Timestamp]:
+    """Earliest timestamp covered by a yfinance-style period ('1y', '6mo', 'ytd', 'max', ...)"""
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return now.normalize().replace(month=1, day=1)
+
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        # Trading days: look back far enough to cover weekends and holidays
+        return now.normalize() - pd.Timedelta(days=count * 2 + 7)
+    offset = {'wk': pd.DateOffset(weeks=count),
+              'mo': pd.DateOffset(months=count),
+              'y': pd.DateOffset(years=count)}[unit]
+    return now.normalize() - offset
+
+
+class PriceHistoryCache:
+    """Persistent OHLCV cache keyed by symbol and interval, with incremental top-ups
+
+    The first request for a symbol downloads the requested range. Later
+    requests are served from disk. Requests further back than the cached
+    range backfill the gap. Stale caches fetch only bars after the last
+    cached one. A top-up that reports a split or dividend refetches the
+    whole range, because adjusted history changes retroactively.
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_age: Optional[float] = None,
+                 fetcher: Optional[Fetcher] = None,
+                 batch_fetcher: Optional[BatchFetcher] = None):
+        cache_config = config.get_cache_config()
+        self.cache_dir = Path(cache_dir or cache_config['dir'])
+        self.max_age = cache_config['price_max_age'] if max_age is None else max_age
+        self.fetcher = fetcher or yfinance_fetcher
+        self.batch_fetcher = batch_fetcher or yfinance_batch_fetcher
+
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'topups': 0, 'backfills': 0, 'prefetched': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since startup: hits, misses, topups, backfills, prefetched, errors"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _lock(self, symbol: str, interval: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, interval), threading.Lock())
+
+    def _path(self, symbol: str, interval: str) -> Path:
+        safe_symbol = re.sub(r'[^A-Za-z0-9._^-]', '_', symbol.upper())
+        return self.cache_dir / safe_symbol / interval
+
+    def _load(self, symbol: str, interval: str) -> Optional[Tuple[Dict[str, Any], np.ndarray, np.ndarray]]:
+        """Cached (meta, index, values) memory-mapped from disk, or None"""
+        path = self._path(symbol, interval)
+        try:
+            with open(path / 'meta.json') as f:
+                meta = json.load(f)
+            with _NPY_LOAD_LOCK:
+                index = np.load(path / 'index.npy', mmap_mode='r')
+                values = np.load(path / 'values.npy', mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if len(index) != meta.get('rows') or values.shape != (len(index), len(meta['columns'])):
+            logger.warning(f"Ignoring inconsistent price cache for {symbol} ({interval})")
+            return None
+        return meta, index, values
+
+    def _save(self, symbol: str, interval: str, frame: pd.DataFrame, meta: Dict[str, Any]):
+        """Write bars atomically; meta.json is replaced last so readers never see a partial write"""
+        path = self._path(symbol, interval)
+        path.mkdir(parents=True, exist_ok=True)
+
+        index = frame.index
+        meta = dict(meta,
+                    columns=list(frame.columns),
+                    tz=str(index.tz) if index.tz is not None else None,
+                    rows=len(frame))
+        utc_index = index.tz_convert('UTC') if index.tz is not None else index
+        arrays = {
+            'index.npy': utc_index.as_unit('ns').asi8,
+            'values.npy': frame.to_numpy(dtype=float),
+        }
+        for name, array in arrays.items():
+            tmp = path / f'{name}.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, path / name)
+
+        tmp = path / 'meta.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path / 'meta.json')
+
+    @staticmethod
+    def _to_frame(meta: Dict[str, Any], index: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+        """Copy cached rows into a new DataFrame with the original timezone"""
+        dates = pd.DatetimeIndex(np.array(index, dtype='datetime64[ns]'))
+        if meta.get('tz'):
+            dates = dates.tz_localize('UTC').tz_convert(meta['tz'])
+        return pd.DataFrame(np.array(values), index=dates, columns=meta['columns'])
+
+    def _fetch(self, symbol: str, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp],
+               interval: str) -> Optional[pd.DataFrame]:
+        try:
+            data = self.fetcher(symbol, start, end, interval)
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error fetching price history for {symbol}: {e}")
+            return None
+        if data is None or data.empty:
+            return None
+        return data[~data.index.duplicated(keep='last')].sort_index()
+
+    @staticmethod
+    def _merge(cached: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+        """Combine bar sets; fresh bars replace cached bars with the same timestamp"""
+        if cached.index.tz is not None:
+            fresh = _align_tz(fresh, cached.index.tz)
+        elif fresh.index.tz is not None:
+            cached = _align_tz(cached, fresh.index.tz)
+        columns = list(cached.columns) + [c for c in fresh.columns if c not in cached.columns]
+        merged = pd.concat([cached, fresh.reindex(columns=columns)]).reindex(columns=columns)
+        return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d',
+                    start: Optional[str] = None, end: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Price history for symbol, from the cache when possible
+
+        Takes either a yfinance-style period or an explicit start/end date.
+        Returns None when no bars are available.
+        """
+        now = pd.Timestamp.now(tz='UTC')
+        want_start = _naive_utc(start) if start is not None else period_start(period, now.tz_localize(None))
+        want_end = _naive_utc(end) if end is not None else None
+
+        with self._lock(symbol, interval):
+            frame = self._refresh(symbol, interval, want_start, now)
+        if frame is None:
+            return None
+
+        frame = self._slice(frame, want_start, want_end)
+        match = _PERIOD_PATTERN.match(period) if start is None else None
+        if match and match.group(2) == 'd':
+            # yfinance counts 'Nd' periods in trading days
+            dates = frame.index.normalize().unique()
+            days = int(match.group(1))
+            if len(dates) > days:
+                frame = frame[frame.index >= dates[-days]]
+        return frame if not frame.empty else None
+
+    @staticmethod
+    def _slice(frame: pd.DataFrame, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> pd.DataFrame:
+        """Rows in [start, end); bounds are naive UTC"""
+        if start is None and end is None:
+            return frame
+        dates = _naive_utc_index(frame)
+        mask = np.ones(len(frame), dtype=bool)
+        if start is not None:
+            mask &= dates >= start
+        if end is not None:
+            mask &= dates < end
+        return frame[mask]
+
+    def _refresh(self, symbol: str, interval: str, want_start: Optional[pd.Timestamp],
+                 now: pd.Timestamp) -> Optional[pd.DataFrame]:
+        """Load cached bars, downloading only what is missing; caller holds the key's lock"""
+        cached = self._load(symbol, interval)
+        if cached is None:
+            self._count('misses')
+            data = self._fetch(symbol, want_start, None, interval)
+            if data is None:
+                return None
+            self._save(symbol, interval, data, {
+                'start': want_start.isoformat() if want_start is not None else None,
+                'fetched_at': now.timestamp(),
+            })
+            return data
+
+        meta, index, values = cached
+        frame = self._to_frame(meta, index, values)
+        changed = False
+
+        # Backfill: the request reaches further back than anything asked for so far
+        covered_from = pd.Timestamp(meta['start']) if meta.get('start') else None
+        if covered_from is not None and (want_start is None or want_start < covered_from):
+            self._count('backfills')
+            older = self._fetch(symbol, want_start, covered_from, interval)
+            if older is not None:
+                frame = self._merge(older, frame)
+            meta['start'] = want_start.isoformat() if want_start is not None else None
+            changed = True
+
+        # Top-up: fetch from the last cached bar (inclusive, it may have been partial)
+        if now.timestamp() - meta.get('fetched_at', 0) > self.max_age:
+            self._count('topups')
+            newer = self._fetch(symbol, _naive_utc(frame.index[-1]).normalize(), None, interval)
+            if newer is not None:
+                if self._has_new_actions(frame, newer):
+                    # Adjusted prices changed retroactively; replace the whole range
+                    full = self._fetch(symbol, covered_from if meta.get('start') else None, None, interval)
+                    frame = full if full is not None else self._merge(frame, newer)
+                else:
+                    frame = self._merge(frame, newer)
+            meta['fetched_at'] = now.timestamp()
+            changed = True
+        elif not changed:
+            self._count('hits')
+
+        if changed:
+            self._save(symbol, interval, frame, meta)
+        return frame
+
+    @staticmethod
+    def _has_new_actions(cached: pd.DataFrame, fresh: pd.DataFrame) -> bool:
+        """True if fresh bars after the cached ones report a dividend or split"""
+        actions = [c for c in ('Dividends', 'Stock Splits') if c in fresh.columns]
+        if not actions:
+            return False
+        newer = _naive_utc_index(fresh) > _naive_utc(cached.index[-1])
+        return bool((fresh.loc[newer, actions].fillna(0) != 0).to_numpy().any())
+
+    def put(self, symbol: str, data: pd.DataFrame, interval: str = '1d',
+            start: Optional[pd.Timestamp] = None):
+        """Store bars downloaded elsewhere, merged with what is cached
+
+        start is the beginning of the range that was requested (None for
+        full history); the cache then covers from the earlier of it and
+        the existing range.
+        """
+        if data is None or data.empty:
+            return
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        now = pd.Timestamp.now(tz='UTC')
+        with self._lock(symbol, interval):
+            cached = self._load(symbol, interval)
+            covered_from = start
+            if cached is not None:
+                meta, index, values = cached
+                data = self._merge(self._to_frame(meta, index, values), data)
+                old_start = pd.Timestamp(meta['start']) if meta.get('start') else None
+                if start is not None and (old_start is None or old_start < start):
+                    covered_from = old_start
+            self._save(symbol, interval, data, {
+                'start': covered_from.isoformat() if covered_from is not None else None,
+                'fetched_at': now.timestamp(),
+            })
+
+    def prefetch(self, symbols: Iterable[str], period: str = '1y', interval: str = '1d') -> int:
+        """Bring many symbols up to date with multi-ticker downloads; returns symbols stored
+
+        Symbols with no cache (or not covering the period) are downloaded
+        for the whole period in one request; stale ones are topped up from
+        their oldest last bar in a second request. Fresh symbols cost
+        nothing. Later get_history calls for these symbols are cache hits.
+        """
+        now = pd.Timestamp.now(tz='UTC')
+        want_start = period_start(period, now.tz_localize(None))
+
+        missing: List[str] = []
+        stale: Dict[str, pd.Timestamp] = {}
+        for symbol in dict.fromkeys(symbols):
+            cached = self._load(symbol, interval)
+            if cached is None:
+                missing.append(symbol)
+                continue
+            meta, index, _ = cached
+            covered_from = pd.Timestamp(meta['start']) if meta.get('start') else None
+            if covered_from is not None and (want_start is None or want_start < covered_from):
+                missing.append(symbol)
+            elif now.timestamp() - meta.get('fetched_at', 0) > self.max_age and len(index):
+                stale[symbol] = pd.Timestamp(int(index[-1])).normalize()
+
+        stored = 0
+        for group, start in ((missing, want_start), (list(stale), min(stale.values(), default=None))):
+            if not group:
+                continue
+            try:
+                frames = self.batch_fetcher(group, start, interval)
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Error downloading price history for {len(group)} symbols: {e}")
+                continue
+            for symbol, frame in frames.items():
+                if symbol in stale:
+                    cached = self._load(symbol, interval)
+                    if cached is not None and self._has_new_actions(self._to_frame(*cached), frame):
+                        # Adjusted history changed; let the next get_history refetch it all
+                        self.invalidate(symbol)
+                        continue
+                self.put(symbol, frame, interval, start)
+                stored += 1
+
+        with self._stats_lock:
+            self._stats['prefetched'] += stored
+        return stored
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop cached bars for one symbol, or for every symbol"""
+        target = self.cache_dir / re.sub(r'[^A-Za-z0-9._^-]', '_', symbol.upper()) if symbol else self.cache_dir
+        shutil.rmtree(target, ignore_errors=True)
+
+
+# Global price cache instance
+price_cache = PriceHistoryCache()
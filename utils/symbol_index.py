@@ -0,0 +1,348 @@
+"""
+Offline company-name to ticker resolver for FinRexent
+
+Built from the NSE/BSE equity list CSVs in a local directory (NSE's
+EQUITY_L.csv and BSE's equity list can be dropped in as downloaded) plus
+an alias file. Names are normalized with ``clean_company_name``; lookups
+try ISIN, exact name/alias/symbol, unique whole-word prefix and, for names
+that start no indexed name, trigram similarity. Ambiguous or generic names
+("HDFC", "Power") resolve to nothing rather than to a guess. Results,
+including names that do not resolve, are cached.
+The same names, compiled into an Aho-Corasick automaton over words, form
+a gazetteer that finds listed companies mentioned in free text.
+"""
+import csv
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .aho_corasick import AhoCorasick
+from .config import config
+from .helpers import clean_company_name
+from .logger import logger
+
+ISIN_PATTERN = re.compile(r'^[A-Z]{2}[A-Z0-9]{9}[0-9]$')
+# Words as normalize_company_name sees them; '&' is kept as its own token
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9'’`]+|&")
+
+# Names this short and written in capitals (ITC, SAIL, LT) only match capitalized text
+ACRONYM_MAX_LENGTH = 5
+
+# Header names used by the NSE and BSE equity lists and the alias file
+SYMBOL_COLUMNS = ('SYMBOL', 'SECURITY ID')
+NAME_COLUMNS = ('NAME OF COMPANY', 'SECURITY NAME', 'ISSUER NAME')
+ISIN_COLUMNS = ('ISIN NUMBER', 'ISIN NO', 'ISIN')
+ALIAS_COLUMN = 'ALIAS'
+
+LEGAL_SUFFIXES = {'ltd', 'limited', 'inc', 'corporation', 'corp', 'company', 'co'}
+
+
+class SymbolMatch(NamedTuple):
+    symbol: str
+    name: str
+    method: str  # 'isin', 'exact', 'prefix' or 'fuzzy'
+    score: float
+
+
+def normalize_company_name(name: str) -> str:
+    """Lowercase company name without legal suffixes or punctuation ("Dr. Reddy's Ltd." -> "dr reddys")"""
+    cleaned = clean_company_name((name or '').strip().rstrip('.'))
+    cleaned = re.sub(r"['’`]", '', cleaned.lower().replace('&', ' and '))
+    words = re.sub(r'[^a-z0-9]+', ' ', cleaned).split()
+    # Exchange lists spell suffixes in capitals ("LTD."), which clean_company_name leaves
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+
+def _is_acronym(text: str) -> bool:
+    """Whether the words of a name that survive normalization are a short all-caps acronym
+
+    Judged per source string, so "ITC Limited" counts as the acronym ITC
+    while a mixed-case alias such as "Itc" does not.
+    """
+    words = _TOKEN_PATTERN.findall(text)
+    while len(words) > 1 and words[-1].lower().rstrip('.') in LEGAL_SUFFIXES:
+        words.pop()
+    retained = ' '.join(words)
+    return retained.isupper() and len(retained) <= ACRONYM_MAX_LENGTH
+
+
+def _tokens(text: str) -> List[Tuple[str, int, int]]:
+    """(normalized word, start, end) for each word of text"""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        word = 'and' if match.group() == '&' else re.sub(r"['’`]", '', match.group().lower())
+        tokens.append((word, match.start(), match.end()))
+    return tokens
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolIndex:
+    """In-memory symbol master with exact, prefix and trigram lookups"""
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 fuzzy_threshold: Optional[float] = None,
+                 cache_size: int = 10000,
+                 min_prefix: int = 3,
+                 min_prefix_coverage: float = 0.6,
+                 fuzzy_margin: float = 0.1):
+        markets_config = config.get_indian_markets_config()
+        self.directory = Path(directory or markets_config['symbol_lists_dir'])
+        self.fuzzy_threshold = fuzzy_threshold or markets_config['symbol_fuzzy_threshold']
+        self.cache_size = cache_size
+        self.min_prefix = min_prefix
+        # A prefix must cover this share of the name it abbreviates ("Bharti" of "Bharti Airtel")
+        self.min_prefix_coverage = min_prefix_coverage
+        # A fuzzy match is ambiguous if another symbol scores within this margin
+        self.fuzzy_margin = fuzzy_margin
+
+        self._names: Dict[str, str] = {}  # symbol -> company name
+        self._isins: Dict[str, str] = {}  # ISIN -> symbol
+        self._keys: Dict[str, Set[str]] = {}  # normalized name/alias/symbol -> symbols
+        self._sorted_keys: Optional[List[str]] = None
+        self._trigram_index: Optional[Dict[str, List[str]]] = None
+        self._trigram_counts: Dict[str, int] = {}
+        self._mixed_case_keys: Set[str] = set()
+        self._gazetteer: Optional[AhoCorasick] = None
+        self._cache: 'OrderedDict[str, Optional[SymbolMatch]]' = OrderedDict()
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._stats = Counter()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._names)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._loaded = True
+                    self.load()
+
+    def load(self, paths: Optional[Iterable[Path]] = None) -> int:
+        """Read equity lists and alias files; returns the number of symbols indexed
+
+        Equity lists are read before alias files. A listing whose ISIN is
+        already indexed (the BSE copy of an NSE stock) only adds its name
+        as an alias of the existing symbol.
+        """
+        paths = sorted(paths if paths is not None else self.directory.glob('*.csv'))
+        lists, alias_files = [], []
+        for path in paths:
+            try:
+                with open(path, newline='', encoding='utf-8-sig') as handle:
+                    rows = [{(key or '').strip().upper(): (value or '').strip() for key, value in row.items()}
+                            for row in csv.DictReader(handle)]
+            except Exception as e:
+                logger.error(f"Error reading symbol list {path}: {e}")
+                continue
+            (alias_files if rows and ALIAS_COLUMN in rows[0] else lists).append(rows)
+
+        with self._lock:
+            self._loaded = True
+            for rows in lists:
+                for row in rows:
+                    symbol = next((row[c] for c in SYMBOL_COLUMNS if row.get(c)), None)
+                    name = next((row[c] for c in NAME_COLUMNS if row.get(c)), None)
+                    if not symbol or not name or row.get('STATUS', 'Active').lower() != 'active':
+                        continue
+                    isin = next((row[c] for c in ISIN_COLUMNS if row.get(c)), None)
+                    self.add(symbol, name, isin)
+            for rows in alias_files:
+                for row in rows:
+                    if row.get(ALIAS_COLUMN) and row.get('SYMBOL'):
+                        self.add_alias(row[ALIAS_COLUMN], row['SYMBOL'])
+
+        logger.info(f"Symbol index loaded {len(self._names)} symbols from {len(paths)} files")
+        return len(self._names)
+
+    def add(self, symbol: str, name: str, isin: Optional[str] = None, aliases: Iterable[str] = ()):
+        """Index one listing under its name, symbol and aliases"""
+        with self._lock:
+            symbol = symbol.strip().upper()
+            if isin:
+                isin = isin.strip().upper()
+                # Cross-listed stocks keep the symbol they were first indexed under
+                symbol = self._isins.setdefault(isin, symbol)
+            self._names.setdefault(symbol, name.strip())
+            for key in (name, symbol, *aliases):
+                self._index_key(key, symbol)
+
+    def add_alias(self, alias: str, symbol: str):
+        """Index an extra name (short form, brand, abbreviation) for a symbol"""
+        with self._lock:
+            symbol = symbol.strip().upper()
+            self._names.setdefault(symbol, symbol)
+            self._index_key(alias, symbol)
+
+    def _index_key(self, text: str, symbol: str):
+        key = normalize_company_name(text)
+        if key:
+            self._keys.setdefault(key, set()).add(symbol)
+            if not _is_acronym(text):
+                self._mixed_case_keys.add(key)
+            self._sorted_keys = None
+            self._trigram_index = None
+            self._gazetteer = None
+            self._cache.clear()
+
+    def resolve(self, company_name: str) -> Optional[str]:
+        """Ticker symbol (without exchange suffix) for a company name, or None"""
+        match = self.match(company_name)
+        return match.symbol if match else None
+
+    def match(self, company_name: str) -> Optional[SymbolMatch]:
+        """Best unambiguous match for a company name, symbol or ISIN"""
+        self._ensure_loaded()
+        key = normalize_company_name(company_name)
+        if not key:
+            return None
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._stats['cached'] += 1
+                return self._cache[key]
+
+            match = self._match_isin(company_name) or self._match_exact(key)
+            # Ambiguous exact names stay unresolved
+            if match is None and key not in self._keys:
+                candidates = self._prefix_candidates(key)
+                symbols = set().union(*(self._keys[candidate] for candidate in candidates))
+                whole_words = [candidate for candidate in candidates if candidate[len(key)] == ' ']
+                if len(symbols) > 1:
+                    match = None  # a stem shared by several companies ("HDFC", "Tata")
+                elif whole_words:
+                    # Leading words of a name are not a typo, so they are never matched fuzzily
+                    match = self._match_prefix(key, symbols, whole_words)
+                else:
+                    match = self._match_fuzzy(key)
+            self._stats[match.method if match else 'unresolved'] += 1
+
+            # Misses are cached too, so unknown entities are not re-scanned
+            self._cache[key] = match
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return match
+
+    def _result(self, symbols: Set[str], method: str, score: float) -> Optional[SymbolMatch]:
+        if len(symbols) != 1:
+            return None
+        symbol = next(iter(symbols))
+        return SymbolMatch(symbol, self._names[symbol], method, score)
+
+    def _match_isin(self, text: str) -> Optional[SymbolMatch]:
+        isin = text.strip().upper()
+        if ISIN_PATTERN.match(isin) and isin in self._isins:
+            return self._result({self._isins[isin]}, 'isin', 1.0)
+        return None
+
+    def _match_exact(self, key: str) -> Optional[SymbolMatch]:
+        return self._result(self._keys.get(key, set()), 'exact', 1.0)
+
+    def _prefix_candidates(self, key: str, max_candidates: int = 50) -> List[str]:
+        """Indexed names starting with key"""
+        if len(key) < self.min_prefix:
+            return []
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._keys)
+        candidates = []
+        position = bisect_left(self._sorted_keys, key)
+        for candidate in self._sorted_keys[position:position + max_candidates]:
+            if not candidate.startswith(key):
+                break
+            candidates.append(candidate)
+        return candidates
+
+    def _match_prefix(self, key: str, symbols: Set[str], names: List[str]) -> Optional[SymbolMatch]:
+        """Match for key as the leading words of names, if it covers enough of the shortest"""
+        score = len(key) / min(len(name) for name in names)
+        return self._result(symbols, 'prefix', score) if score >= self.min_prefix_coverage else None
+
+    def _match_fuzzy(self, key: str) -> Optional[SymbolMatch]:
+        """Closest name by trigram Jaccard similarity, if above the threshold and unambiguous
+
+        Only names starting with the same two characters are considered, so
+        a generic word ("Pharma") does not match a name that ends with it.
+        """
+        if self._trigram_index is None:
+            index: Dict[str, List[str]] = {}
+            for candidate in self._keys:
+                trigrams = _trigrams(candidate)
+                self._trigram_counts[candidate] = len(trigrams)
+                for trigram in trigrams:
+                    index.setdefault(trigram, []).append(candidate)
+            self._trigram_index = index
+
+        query = _trigrams(key)
+        shared = Counter()
+        for trigram in query:
+            shared.update(self._trigram_index.get(trigram, ()))
+
+        symbol_scores: Dict[str, float] = {}
+        for candidate, overlap in shared.items():
+            if candidate[:2] != key[:2]:
+                continue
+            score = overlap / (len(query) + self._trigram_counts[candidate] - overlap)
+            for symbol in self._keys[candidate]:
+                symbol_scores[symbol] = max(score, symbol_scores.get(symbol, 0.0))
+        if not symbol_scores:
+            return None
+        best_score = max(symbol_scores.values())
+        if best_score < self.fuzzy_threshold:
+            return None
+        close = {symbol for symbol, score in symbol_scores.items() if score > best_score - self.fuzzy_margin}
+        return self._result(close, 'fuzzy', best_score)
+
+    def find_companies(self, text: str) -> List[Tuple[str, str]]:
+        """(name as written, symbol) for each listed company mentioned in text
+
+        Matches are whole words, longest first ("Tech Mahindra" rather than
+        "Mahindra"), and must be capitalized; acronym-only names must be
+        in capitals. Names shared by several symbols are not matched.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if self._gazetteer is None:
+                gazetteer = AhoCorasick()
+                for key, symbols in self._keys.items():
+                    # Ambiguous names are kept so they still win over the shorter names inside them
+                    symbol = next(iter(symbols)) if len(symbols) == 1 else None
+                    gazetteer.add(key.split(), (symbol, key not in self._mixed_case_keys))
+                self._gazetteer = gazetteer.build()
+            gazetteer = self._gazetteer
+
+        tokens = _tokens(text)
+        matches = sorted(gazetteer.iter_matches([word for word, _, _ in tokens]),
+                         key=lambda match: (match[0], match[0] - match[1]))
+        found, covered_to, seen = [], 0, set()
+        for start, end, (symbol, acronym) in matches:
+            if start < covered_to:
+                continue
+            surface = text[tokens[start][1]:tokens[end - 1][2]]
+            if not (surface.isupper() if acronym else surface[0].isupper() or surface[0].isdigit()):
+                continue
+            covered_to = end
+            if symbol is not None and symbol not in seen:
+                seen.add(symbol)
+                found.append((surface, symbol))
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        """Symbols indexed and lookups by outcome"""
+        with self._lock:
+            return {'symbols': len(self._names), 'keys': len(self._keys), **self._stats}
+
+
+# Global symbol index instance
+symbol_index = SymbolIndex()
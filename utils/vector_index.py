@@ -0,0 +1,140 @@
+"""
+In-memory vector index for cosine-similarity search
+
+Small stores are searched exactly with one matrix-vector product. Past
+``ann_min_size`` vectors an inverted-file (IVF) index is built: vectors are
+clustered with k-means and a query only scans the ``nprobe`` clusters whose
+centroids are closest to it.
+"""
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first"""
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class VectorIndex:
+    """Cosine-similarity index over vectors keyed by arbitrary hashable ids"""
+
+    def __init__(self, dim: Optional[int] = None, ann_min_size: int = 5000, nprobe: int = 8,
+                 seed: int = 0):
+        self.dim = dim
+        self.ann_min_size = ann_min_size
+        self.nprobe = nprobe
+        self.seed = seed
+
+        self._keys: List[Hashable] = []
+        self._positions = {}
+        self._vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._built_size = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def add(self, keys: Sequence[Hashable], vectors: np.ndarray):
+        """Add (or replace) vectors; they are normalized on the way in"""
+        vectors = normalize(np.atleast_2d(vectors))
+        if len(keys) != len(vectors):
+            raise ValueError("keys and vectors must have the same length")
+        if not len(keys):
+            return
+        if self.dim is None or not len(self._keys):
+            self.dim = vectors.shape[1]
+            self._vectors = self._vectors.reshape(0, self.dim)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+        fresh_keys, fresh_rows = [], []
+        for key, vector in zip(keys, vectors):
+            position = self._positions.get(key)
+            if position is not None:
+                self._vectors[position] = vector
+                if self._assignments is not None:
+                    self._assignments[position] = self._nearest_centroid(vector[None])[0]
+            else:
+                self._positions[key] = len(self._keys) + len(fresh_keys)
+                fresh_keys.append(key)
+                fresh_rows.append(vector)
+
+        if fresh_keys:
+            fresh = np.vstack(fresh_rows)
+            self._keys.extend(fresh_keys)
+            self._vectors = np.vstack([self._vectors, fresh])
+            if self._assignments is not None:
+                self._assignments = np.concatenate([self._assignments, self._nearest_centroid(fresh)])
+
+        # Re-cluster when the store has doubled since the last build
+        if len(self) >= self.ann_min_size and len(self) >= 2 * self._built_size:
+            self.build()
+
+    def _nearest_centroid(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1)
+
+    def build(self, iterations: int = 10, samples_per_list: int = 64):
+        """Cluster the stored vectors into sqrt(n) lists (spherical k-means)
+
+        Centroids are trained on a sample of samples_per_list vectors per
+        list; every vector is then assigned to its nearest centroid.
+        """
+        n = len(self)
+        if n == 0:
+            return
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(self.seed)
+        sample = self._vectors[rng.choice(n, min(n, nlist * samples_per_list), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = ~sums.any(axis=1)
+            # Reseed empty clusters from random vectors
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize(sums)
+        self._centroids = centroids
+        self._assignments = np.argmax(self._vectors @ centroids.T, axis=1)
+        self._built_size = n
+
+    def search(self, query: np.ndarray, k: int = 5, exact: Optional[bool] = None) -> List[Tuple[Hashable, float]]:
+        """Up to k (key, cosine similarity) pairs, most similar first
+
+        exact=None searches exhaustively below ann_min_size and through
+        the IVF lists above it.
+        """
+        if not len(self) or k <= 0:
+            return []
+        query = normalize(np.asarray(query).reshape(1, -1))[0]
+        if exact is None:
+            exact = self._centroids is None or len(self) < self.ann_min_size
+
+        if exact:
+            candidates = None
+            scores = self._vectors @ query
+        else:
+            if self._centroids is None:
+                self.build()
+            probes = _top_k(self._centroids @ query, min(self.nprobe, len(self._centroids)))
+            candidates = np.flatnonzero(np.isin(self._assignments, probes))
+            scores = self._vectors[candidates] @ query
+
+        best = _top_k(scores, k)
+        rows = candidates[best] if candidates is not None else best
+        return [(self._keys[row], float(scores[index])) for index, row in zip(best, rows)]